@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
+from typing import Optional
 import hashlib
+import hmac
+import os
 import random
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.alien_pet import AlienPet, AlienSpecies
+from app.core.repository import current_user, pet_for_user
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -21,6 +25,17 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password"""
     return hash_password(plain_password) == hashed_password
 
+# Operator endpoints (cross-user reads, full-table rebuilds) require
+# X-Admin-Token: <ADMIN_TOKEN>. Unset = those endpoints are disabled.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Dependency for operator-only endpoints"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
 # Pydantic schemas
 class UserRegister(BaseModel):
     email: EmailStr
@@ -128,7 +143,7 @@ async def login_user(
         )
     
     # Get pet info
-    pet = db.query(AlienPet).filter(AlienPet.user_id == user.id).first()
+    pet = pet_for_user(db, user.id)
     
     return {
         "message": f"✨ Welcome back, {user.username}! {pet.name if pet else 'Your pet'} awaits!",
@@ -143,14 +158,14 @@ async def login_user(
 
 @router.get("/me")
 async def get_current_user_info(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     👤 Get current user info (simplified - no real JWT auth yet)
     """
     # TODO: Implement proper JWT authentication
     # For now, return first user
-    user = db.query(User).first()
+    user = current_user(db)
     
     if not user:
         raise HTTPException(
@@ -158,7 +173,7 @@ async def get_current_user_info(
             detail="No user found. Please register first!"
         )
     
-    pet = db.query(AlienPet).filter(AlienPet.user_id == user.id).first()
+    pet = pet_for_user(db, user.id)
     
     return {
         "id": user.id,
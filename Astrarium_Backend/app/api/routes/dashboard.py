@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from app.database import get_read_db
+from app.models.skill import UserSkill
+from app.models.user import User
+from app.core.ai_service import CelestialAIOracle
+from app.core.serialization import FastJSONResponse, skill_row_to_dict
+from app.api.routes.pets import pet_response
+from app.api.routes.skills import (
+    URGENCY_ORDER,
+    decaying_entry,
+    decaying_sort_key,
+    due_entry,
+    recommendation_entry,
+)
+from app.core.repository import current_user, pet_for_user
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+def get_current_reader(db: Session = Depends(get_read_db)) -> User:
+    # TODO: Implement proper JWT authentication
+    user = current_user(db)
+    if not user:
+        raise HTTPException(status_code=401, detail="No user found. Please register first!")
+    return user
+
+@router.get("")
+async def get_dashboard(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader)
+):
+    """
+    🌌 Everything the home screen needs in one call
+
+    Combines /auth/me, /pets/my-pet, /skills/my-skills, /skills/due-today,
+    /skills/decaying and /skills/recommendations from one user fetch and
+    one pass over your skills.
+    """
+    pet = pet_for_user(db, current_user.id)
+
+    skills = db.query(
+        UserSkill.id,
+        UserSkill.skill_name,
+        UserSkill.category,
+        UserSkill.proficiency_level,
+        UserSkill.health_score,
+        UserSkill.star_power,
+        UserSkill.last_practiced,
+        UserSkill.created_at,
+        UserSkill.next_review_date,
+        UserSkill.review_interval_days,
+        UserSkill.consecutive_correct
+    ).filter(
+        UserSkill.user_id == current_user.id
+    ).order_by(UserSkill.health_score.desc()).all()
+
+    oracle = CelestialAIOracle()
+    now = datetime.utcnow()
+    skill_list, due, decaying, recommendations = [], [], [], []
+
+    for skill in skills:
+        skill_list.append(skill_row_to_dict(skill))
+
+        if skill.next_review_date is None or skill.next_review_date <= now:
+            due.append(skill)
+
+        analysis = oracle.analyze_skill_decay({
+            "last_practiced": skill.last_practiced,
+            "health_score": skill.health_score
+        })
+        if analysis["urgency"] in ["high", "critical"]:
+            decaying.append((skill, analysis))
+        recommendations.append(recommendation_entry(skill, analysis))
+
+    # Same orderings as the individual endpoints
+    due.sort(key=lambda s: (s.next_review_date is not None, s.next_review_date or now, s.id))
+    decaying = [decaying_entry(skill, analysis) for skill, analysis in sorted(decaying, key=lambda pair: decaying_sort_key(pair[0]))]
+    recommendations.sort(key=lambda x: (URGENCY_ORDER.get(x["priority"], 4), x["health_score"], x["skill_id"]))
+
+    return FastJSONResponse({
+        "user": {
+            "id": current_user.id,
+            "username": current_user.username,
+            "email": current_user.email,
+            "streak_count": current_user.streak_count,
+            "total_xp": current_user.total_xp,
+            "created_at": current_user.created_at
+        },
+        "pet": pet_response(pet).model_dump() if pet else None,
+        "pet_state": pet.get_state_description() if pet else None,
+        "skills": skill_list,
+        "due_today": {
+            "total_due": len(due),
+            "skills": [due_entry(s) for s in due]
+        },
+        "decaying": {
+            "total_decaying": len(decaying),
+            "skills": decaying
+        },
+        "recommendations": recommendations[:5]  # Top 5 recommendations
+    })
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database import get_read_db
+from app.models.user import User
+from app.core.export import parse_tables, stream_export, export_filename
+from app.core.repository import current_user
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def get_current_reader(db: Session = Depends(get_read_db)) -> User:
+    # TODO: Implement proper JWT authentication
+    user = current_user(db)
+    if not user:
+        raise HTTPException(status_code=401, detail="No user found. Please register first!")
+    return user
+
+# ------------------------------
+# Practice history export
+# ------------------------------
+@router.get("")
+async def export_history(
+    format: str = "ndjson",
+    tables: str = "answers,sessions,skills",
+    gzip: bool = True,
+    current_user: User = Depends(get_current_reader)
+):
+    """
+    📦 Download your full practice history as a gzip stream
+
+    format=ndjson mixes tables, one {"table": ...} record per line; format=csv
+    takes a single table. Tables: answers, sessions, skills (the review schedule).
+    """
+    try:
+        names = parse_tables(tables, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = export_filename(current_user.id, names, format, gzip)
+    return StreamingResponse(
+        stream_export(current_user.id, names, format, compress=gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
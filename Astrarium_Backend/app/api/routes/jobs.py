@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+from app.models.job import BackgroundJob
+from app.core.jobs import queue_stats
+from app.core.pagination import clamp_limit
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+def job_response(job: BackgroundJob) -> dict:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "key": job.key,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": job.run_after,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": job.result,
+        "last_error": job.last_error
+    }
+
+@router.get("/stats")
+async def get_queue_stats(
+    window_seconds: int = 3600,
+    db: Session = Depends(get_db)
+):
+    """
+    📊 Queue depth by status and wait/run latency per job kind
+    """
+    return queue_stats(db, window_seconds=max(60, min(window_seconds, 7 * 86400)))
+
+@router.get("/")
+async def list_jobs(
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    📋 Most recently created jobs, optionally filtered by status or kind
+    """
+    query = db.query(BackgroundJob)
+    if status:
+        query = query.filter(BackgroundJob.status == status)
+    if kind:
+        query = query.filter(BackgroundJob.kind == kind)
+    jobs = query.order_by(BackgroundJob.id.desc()).limit(clamp_limit(limit, default=50)).all()
+    return [job_response(job) for job in jobs]
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    🔎 One job's status, attempts and result
+    """
+    job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
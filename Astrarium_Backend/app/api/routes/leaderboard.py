@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models.user import User
+from app.core.leaderboard import Leaderboard, leaderboards, week_start
+from app.core.repository import current_user
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+MAX_LEADERBOARD_SIZE = 100
+
+def get_current_user(db: Session = Depends(get_db)) -> User:
+    # TODO: Implement proper JWT authentication
+    user = current_user(db)
+    if not user:
+        raise HTTPException(status_code=401, detail="No user found. Please register first!")
+    return user
+
+def leaderboard_response(db: Session, board: Leaderboard, scope: str, user_id: int, limit: int, offset: int) -> dict:
+    entries = board.top(max(1, min(limit, MAX_LEADERBOARD_SIZE)), offset=max(0, offset))
+    user_ids = [entry_user_id for _, entry_user_id, _ in entries]
+    usernames = dict(db.query(User.id, User.username).filter(User.id.in_(user_ids)).all()) if user_ids else {}
+    mine = board.rank_of(user_id)
+    return {
+        "scope": scope,
+        "total_ranked": len(board),
+        "entries": [
+            {"rank": rank, "user_id": entry_user_id, "username": usernames.get(entry_user_id), "xp": xp}
+            for rank, entry_user_id, xp in entries
+        ],
+        "me": {"rank": mine[0], "xp": mine[1]} if mine else None
+    }
+
+@router.get("/global")
+async def get_global_leaderboard(
+    limit: int = 10,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    🏆 Top stargazers by total XP, plus your own rank
+    """
+    board = leaderboards.global_board(db)
+    return leaderboard_response(db, board, "global", current_user.id, limit, offset)
+
+@router.get("/weekly")
+async def get_weekly_leaderboard(
+    limit: int = 10,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    📆 Top XP earned this week (weeks start Monday, UTC)
+    """
+    board = leaderboards.weekly_board(db)
+    response = leaderboard_response(db, board, "weekly", current_user.id, limit, offset)
+    response["week_start"] = week_start()
+    return response
+
+@router.get("/skill/{skill_name}")
+async def get_skill_leaderboard(
+    skill_name: str,
+    limit: int = 10,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    ⭐ Top XP earned practicing one skill (matched by name, case-insensitive)
+    """
+    board = leaderboards.skill_board(db, skill_name)
+    return leaderboard_response(db, board, f"skill:{skill_name}", current_user.id, limit, offset)
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.alien_pet import AlienPet, AlienSpecies
 from app.models.user import User
+from app.core.versioning import CacheValidators
+from app.core.concurrency import retry_on_conflict
+from app.core.repository import current_user, pet_for_user
 
 router = APIRouter(prefix="/pets", tags=["pets"])
 
@@ -36,24 +39,18 @@ class PetStateResponse(BaseModel):
     next_evolution_at: int
 
 def get_current_user(db: Session = Depends(get_db)) -> User:
-    user = db.query(User).first()
+    user = current_user(db)
     if not user:
         raise HTTPException(status_code=401, detail="No user found")
     return user
 
-@router.get("/my-pet", response_model=PetResponse)
-async def get_my_pet(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """
-    🌟 Get your cosmic companion
-    """
-    pet = db.query(AlienPet).filter(AlienPet.user_id == current_user.id).first()
-    
-    if not pet:
-        raise HTTPException(status_code=404, detail="No pet found. Register first to get your alien!")
-    
+def get_current_reader(db: Session = Depends(get_read_db)) -> User:
+    user = current_user(db)
+    if not user:
+        raise HTTPException(status_code=401, detail="No user found")
+    return user
+
+def pet_response(pet: AlienPet) -> PetResponse:
     return PetResponse(
         id=pet.id,
         name=pet.name,
@@ -73,20 +70,49 @@ async def get_my_pet(
         total_skills_mastered=pet.total_skills_mastered
     )
 
+@router.get("/my-pet", response_model=PetResponse)
+async def get_my_pet(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader)
+):
+    """
+    🌟 Get your cosmic companion
+    """
+    validators = CacheValidators(request, "pet", current_user.id)
+    if validators.not_modified:
+        return validators.not_modified_response()
+
+    pet = pet_for_user(db, current_user.id)
+    
+    if not pet:
+        raise HTTPException(status_code=404, detail="No pet found. Register first to get your alien!")
+
+    validators.apply(response)
+    return pet_response(pet)
+
 @router.get("/my-pet/state", response_model=PetStateResponse)
 async def get_pet_state(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader)
 ):
     """
     📖 Get a narrative description of your pet's state
     """
-    pet = db.query(AlienPet).filter(AlienPet.user_id == current_user.id).first()
+    validators = CacheValidators(request, "pet", current_user.id, variant="state")
+    if validators.not_modified:
+        return validators.not_modified_response()
+
+    pet = pet_for_user(db, current_user.id)
     
     if not pet:
         raise HTTPException(status_code=404, detail="No pet found")
     
     state = pet.get_state_description()
+    validators.apply(response)
 
     return PetStateResponse(
         narrative=state["description"],
@@ -104,18 +130,22 @@ async def interact_with_pet(
     """
     ✨ Pet your alien companion (small energy boost)
     """
-    pet = db.query(AlienPet).filter(AlienPet.user_id == current_user.id).first()
-    
-    if not pet:
-        raise HTTPException(status_code=404, detail="No pet found")
-    
-    # Small boost from petting
-    pet.energy = min(100.0, pet.energy + 2.0)
-    pet.luminosity = min(100.0, pet.luminosity + 1.0)
-    pet.last_updated = datetime.utcnow()
-    pet.update_mood()
-    
-    db.commit()
+    def write():
+        pet = pet_for_user(db, current_user.id)
+
+        if not pet:
+            raise HTTPException(status_code=404, detail="No pet found")
+
+        # Small boost from petting
+        pet.energy = min(100.0, pet.energy + 2.0)
+        pet.luminosity = min(100.0, pet.luminosity + 1.0)
+        pet.last_updated = datetime.utcnow()
+        pet.update_mood()
+
+        db.commit()
+        return pet
+
+    pet = await retry_on_conflict(db, write)
     
     return {
         "message": f"✨ {pet.name} feels your cosmic energy!",
@@ -132,16 +162,20 @@ async def update_pet_decay(
     """
     ⏰ Manually trigger decay calculation (useful for testing)
     """
-    pet = db.query(AlienPet).filter(AlienPet.user_id == current_user.id).first()
+    def write():
+        pet = pet_for_user(db, current_user.id)
 
-    if not pet:
-        raise HTTPException(status_code=404, detail="No pet found")
+        if not pet:
+            raise HTTPException(status_code=404, detail="No pet found")
+
+        # Calculate hours since last feed
+        hours_since = (datetime.utcnow() - pet.last_fed).total_seconds() / 3600
 
-    # Calculate hours since last feed
-    hours_since = (datetime.utcnow() - pet.last_fed).total_seconds() / 3600
+        pet.decay_stats(hours_since)
+        db.commit()
+        return pet, hours_since
 
-    pet.decay_stats(hours_since)
-    db.commit()
+    pet, hours_since = await retry_on_conflict(db, write)
 
     return {
         "message": f"⏰ Updated {pet.name}'s stats",
@@ -159,30 +193,29 @@ async def force_evolve_pet(
     🚀 DEBUG: Force pet to evolve to next stage (no auth required for demo)
     """
     # For debug purposes, just get the first user's pet
-    user = db.query(User).first()
+    user = current_user(db)
     if not user:
         raise HTTPException(status_code=404, detail="No user found in database")
 
-    pet = db.query(AlienPet).filter(AlienPet.user_id == user.id).first()
-
-    if not pet:
-        raise HTTPException(status_code=404, detail="No pet found")
+    def write():
+        pet = pet_for_user(db, user.id)
 
-    old_stage = pet.evolution_stage.value
-    old_level = pet.level
-    old_xp = pet.experience
+        if not pet:
+            raise HTTPException(status_code=404, detail="No pet found")
 
-    print(f"[DEBUG] Before XP gain: Level {old_level}, XP {old_xp}, Stage {old_stage}")
+        old_stage = pet.evolution_stage.value
+        old_level = pet.level
 
-    # Add moderate XP for gradual progression
-    pet.gain_experience(150)
+        # Add moderate XP for gradual progression
+        pet.gain_experience(150)
 
-    # Force check evolution to ensure sprite matches level
-    pet.check_evolution()
+        # Force check evolution to ensure sprite matches level
+        pet.check_evolution()
 
-    print(f"[DEBUG] After XP gain: Level {pet.level}, XP {pet.experience}, Stage {pet.evolution_stage.value}")
+        db.commit()
+        return pet, old_stage, old_level
 
-    db.commit()
+    pet, old_stage, old_level = await retry_on_conflict(db, write)
 
     return {
         "message": f"🚀 {pet.name} gained experience!",
@@ -1,16 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import random
 
 from app.database import get_db
+from app.api.routes.auth import require_admin
 from app.models.skill import UserSkill, PracticeSession
 from app.models.question import Question, UserAnswer
 from app.models.alien_pet import AlienPet
 from app.models.user import User
 from app.core.ai_service import CelestialAIOracle
+from app.core.question_index import question_index
+from app.core.token_ledger import over_budget, usage_summary, tokens_used_today
+from app.core.pagination import encode_cursor, decode_cursor, clamp_limit
+from app.core.serialization import FastJSONResponse
+from app.core.jobs import enqueue
+from app.core.leaderboard import leaderboards
+from app.core.answer_log import EVENT_SOURCED_ANSWERS, fold_answer, current_state, project_pending, replay_user, log_stats
+from app.core.concurrency import retry_on_conflict, xp_increment, streak_after, apply_pet_answer
+from app.core.prefetch import (
+    PREFETCH_ENABLED, PREFETCH_DAILY_TOKEN_CAP, prefetcher, generate_new_question, predict_next_skill
+)
+from app.core.difficulty import difficulty_index, TARGET_SUCCESS
+from app.models.answer_event import AnswerEvent
+from app.core.repository import current_user, pet_for_user, skill_for_user
 
 router = APIRouter(prefix="/questions", tags=["questions"])
 
@@ -20,6 +36,9 @@ router = APIRouter(prefix="/questions", tags=["questions"])
 class QuestionRequest(BaseModel):
     skill_id: int
 
+class NextQuestionRequest(BaseModel):
+    skill_id: Optional[int] = None  # Defaults to the predicted next skill
+
 class QuestionResponse(BaseModel):
     question_id: int
     question_text: str
@@ -28,6 +47,14 @@ class QuestionResponse(BaseModel):
     difficulty: str
     cosmic_reward: int
 
+class AdaptiveQuestionRequest(BaseModel):
+    skill_id: int
+    target_success: Optional[float] = None  # Defaults to ADAPTIVE_TARGET_SUCCESS
+
+class AdaptiveQuestionResponse(QuestionResponse):
+    predicted_success: float
+    attempts: int
+
 class AnswerSubmission(BaseModel):
     question_id: int
     user_answer: str
@@ -56,11 +83,64 @@ def get_current_user(
     db: Session = Depends(get_db)
 ) -> User:
     # Simple authentication - will be replaced with proper auth later
-    user = db.query(User).first()
+    user = current_user(db)
     if not user:
         raise HTTPException(status_code=401, detail="No users found")
     return user
 
+def _stored_question_response(question: Question) -> QuestionResponse:
+    return QuestionResponse(
+        question_id=question.id,
+        question_text=question.question_text,
+        question_type=question.question_type,
+        options=question.options,
+        difficulty=question.difficulty,
+        cosmic_reward=question.cosmic_reward
+    )
+
+def _least_answered_question(db: Session, skill_id: int) -> Optional[Question]:
+    """Pick a stored question for the skill, preferring ones answered least often"""
+    return db.query(Question).outerjoin(
+        UserAnswer, UserAnswer.question_id == Question.id
+    ).filter(
+        Question.skill_id == skill_id
+    ).group_by(Question.id).order_by(
+        func.count(UserAnswer.id).asc(), func.random()
+    ).first()
+
+def _new_question_response(db: Session, skill: UserSkill, user: User) -> QuestionResponse:
+    if over_budget(db, user.id):
+        # Daily LLM budget spent - serve from the stored question bank instead
+        picked = difficulty_index.select(db, skill.id)
+        stored = db.query(Question).filter(Question.id == picked[0]).first() if picked else None
+        stored = stored or _least_answered_question(db, skill.id)
+        if not stored:
+            raise HTTPException(
+                status_code=429,
+                detail="Daily AI budget reached and no stored questions exist for this skill yet. Try again tomorrow!"
+            )
+        return _stored_question_response(stored)
+
+    question = generate_new_question(db, skill, user.id)
+    response = _stored_question_response(question)
+    print(f"[DEBUG] Returning question response: question_id={response.question_id}, text={response.question_text[:50]}...")
+    return response
+
+async def _take_prefetched(db: Session, user_id: int, skill_id: Optional[int] = None) -> Optional[Question]:
+    """The question prefetched after the last answer, if it matches skill_id"""
+    question_id = await prefetcher.take(user_id, skill_id)
+    if question_id is None:
+        return None
+    return db.query(Question).filter(Question.id == question_id).first()
+
+def _schedule_prefetch(db: Session, user_id: int, graded: List):
+    """Start preparing the question most likely to be asked for after these answers"""
+    if not PREFETCH_ENABLED:
+        return
+    question, _, is_correct, _ = graded[-1]
+    answered_ids = {answered.id for answered, _, _, _ in graded}
+    prefetcher.schedule(user_id, predict_next_skill(db, user_id, question.skill_id, is_correct), answered_ids)
+
 # ------------------------------
 # Generate a new question
 # ------------------------------
@@ -70,48 +150,304 @@ async def generate_question(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    skill = db.query(UserSkill).filter(
-        UserSkill.id == request.skill_id,
-        UserSkill.user_id == current_user.id
-    ).first()
+    skill = skill_for_user(db, request.skill_id, current_user.id)
     if not skill:
         raise HTTPException(status_code=404, detail="Skill not found")
 
-    oracle = CelestialAIOracle()
-    question_data = oracle.generate_skill_question(
-        skill_name=skill.skill_name,
-        category=skill.category,
-        proficiency_level=skill.proficiency_level
-    )
+    prefetched = await _take_prefetched(db, current_user.id, skill.id)
+    if prefetched:
+        return _stored_question_response(prefetched)
+    return _new_question_response(db, skill, current_user)
 
-    question = Question(
-        skill_id=skill.id,
-        question_text=question_data["question"],
-        question_type=question_data["type"],
-        options=question_data.get("options"),
-        correct_answer=question_data["correct_answer"],
-        explanation=question_data.get("explanation"),
-        difficulty=question_data.get("difficulty", "medium"),
-        cosmic_reward=question_data.get("cosmic_reward", 10)
-    )
-    db.add(question)
-    db.commit()
-    db.refresh(question)
+@router.post("/next", response_model=QuestionResponse)
+async def next_question(
+    request: Optional[NextQuestionRequest] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    ⏭️ Get the next question to practice
 
-    response = QuestionResponse(
-        question_id=question.id,
-        question_text=question.question_text,
-        question_type=question.question_type,
-        options=question.options,
-        difficulty=question.difficulty,
-        cosmic_reward=question.cosmic_reward
+    Returns instantly when a question was prefetched after your last answer.
+    Without a skill_id, the skill is the same one the prefetch predicts: a
+    refresher after a wrong answer, else the head of /skills/due-today.
+    """
+    skill_id = request.skill_id if request else None
+    prefetched = await _take_prefetched(db, current_user.id, skill_id)
+    if prefetched:
+        return _stored_question_response(prefetched)
+
+    if skill_id is None:
+        skill_id = predict_next_skill(db, current_user.id)
+        if skill_id is None:
+            raise HTTPException(status_code=404, detail="✨ All caught up! No skills due today.")
+    skill = skill_for_user(db, skill_id, current_user.id)
+    if not skill:
+        raise HTTPException(status_code=404, detail="Skill not found")
+    return _new_question_response(db, skill, current_user)
+
+@router.get("/prefetch")
+async def get_prefetch_status(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    🔮 The speculatively prepared next question and today's prefetch spend
+    """
+    return {
+        "enabled": PREFETCH_ENABLED,
+        "slot": prefetcher.status(current_user.id),
+        "prefetch_tokens_today": tokens_used_today(db, current_user.id, operation="prefetch"),
+        "daily_token_cap": PREFETCH_DAILY_TOKEN_CAP or None,
+        "counters": dict(prefetcher.counters)
+    }
+
+@router.delete("/prefetch")
+async def cancel_prefetch(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    🛑 Drop the speculative next question and stop generating it
+    """
+    return {"cancelled": prefetcher.cancel(current_user.id)}
+
+# ------------------------------
+# Adaptive selection from stored questions
+# ------------------------------
+@router.post("/adaptive", response_model=AdaptiveQuestionResponse)
+async def adaptive_question(
+    request: AdaptiveQuestionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    🎯 The stored question you're most likely to answer right target_success of the time
+
+    Never calls the AI - ask /questions/generate when no stored question is left.
+    """
+    target = TARGET_SUCCESS if request.target_success is None else request.target_success
+    if not 0 < target < 1:
+        raise HTTPException(status_code=400, detail="target_success must be between 0 and 1")
+    skill = skill_for_user(db, request.skill_id, current_user.id)
+    if not skill:
+        raise HTTPException(status_code=404, detail="Skill not found")
+
+    picked = difficulty_index.select(db, skill.id, target)
+    if not picked:
+        raise HTTPException(status_code=404, detail="No stored question available for this skill right now")
+    question_id, success = picked
+    question = db.query(Question).filter(Question.id == question_id).first()
+    stats = difficulty_index.ladder_entry(question_id)
+    return AdaptiveQuestionResponse(
+        **_stored_question_response(question).model_dump(),
+        predicted_success=round(success, 3),
+        attempts=stats["attempts"] if stats else 0
     )
-    print(f"[DEBUG] Returning question response: question_id={response.question_id}, text={response.question_text[:50]}...")
-    return response
+
+@router.get("/difficulty/{skill_id}")
+async def get_difficulty_ladder(
+    skill_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    📶 Every stored question of a skill with its answer stats and calibrated difficulty
+    """
+    skill = skill_for_user(db, skill_id, current_user.id)
+    if not skill:
+        raise HTTPException(status_code=404, detail="Skill not found")
+    return difficulty_index.ladder(db, skill.id)
+
+@router.post("/difficulty/rebuild", dependencies=[Depends(require_admin)])
+async def rebuild_difficulty_stats(
+    background: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    🔁 Recompute per-question answer stats from every stored answer
+
+    Pass background=true to queue it and poll /jobs/{job_id} instead.
+    Operator only: send X-Admin-Token.
+    """
+    if background:
+        job = enqueue(db, "question_stats_rebuild")
+        db.commit()
+        return {"job_id": job.id, "status": job.status}
+    return difficulty_index.rebuild_stats(db)
 
 # ------------------------------
 # Submit answer
 # ------------------------------
+def _grade_answer(db: Session, question: Question, submission: AnswerSubmission, user: User, skill: UserSkill):
+    """Return (is_correct, evaluation feedback or None)"""
+    # For multiple choice, do direct comparison
+    if question.question_type == "multiple_choice":
+        return submission.user_answer.strip() == question.correct_answer.strip(), None
+
+    # For open-ended questions, use AI evaluation
+    acceptable_answers = question.options if question.options else []
+    evaluation = CelestialAIOracle().evaluate_open_ended_answer(
+        question_text=question.question_text,
+        user_answer=submission.user_answer,
+        correct_answer=question.correct_answer,
+        acceptable_answers=acceptable_answers,
+        user_id=user.id,
+        skill_id=skill.id,
+        allow_ai=not over_budget(db, user.id)
+    )
+    return evaluation["is_correct"], evaluation["feedback"]
+
+def _pet_message(alien_pet: Optional[AlienPet], is_correct: bool, pet_health_change: float, skill: UserSkill) -> str:
+    if not alien_pet:
+        return "No pet found"
+    if is_correct:
+        if pet_health_change >= 5.0:
+            pet_messages = [
+                f"✨ {alien_pet.name} feeds on your knowledge! Health +{pet_health_change:.0f}!",
+                f"🌟 {alien_pet.name} glows brighter! Health at {alien_pet.luminosity:.0f}%!"
+            ]
+        else:
+            pet_messages = [f"⭐ {alien_pet.name} is already at max health! Keep it up!"]
+    else:
+        if skill.consecutive_wrong >= 2:
+            pet_messages = [
+                f"🚨 {alien_pet.name} suffers! 2 wrong in a row! Health -{abs(pet_health_change):.0f}",
+                f"⚠️ {alien_pet.name} dims significantly! Study harder!"
+            ]
+        else:
+            pet_messages = [
+                f"🌙 {alien_pet.name} dims slightly (Health -{abs(pet_health_change):.0f})",
+                f"☁️ {alien_pet.name} encourages: Learn from this! Review the explanation."
+            ]
+    return random.choice(pet_messages)
+
+def _answer_row(user_id: int, question: Question, submission: AnswerSubmission, is_correct: bool, xp_earned: int, answer_quality: int) -> List:
+    """Rows recording one answer: a log event in event-sourced mode, else answer + practice session"""
+    if EVENT_SOURCED_ANSWERS:
+        return [AnswerEvent(
+            user_id=user_id,
+            skill_id=question.skill_id,
+            question_id=question.id,
+            user_answer=submission.user_answer,
+            is_correct=is_correct,
+            xp_earned=xp_earned,
+            answer_quality=answer_quality,
+            time_taken_seconds=submission.time_taken_seconds
+        )]
+    return [
+        UserAnswer(
+            user_id=user_id,
+            question_id=question.id,
+            user_answer=submission.user_answer,
+            is_correct=is_correct,
+            time_taken_seconds=submission.time_taken_seconds
+        ),
+        PracticeSession(
+            skill_id=question.skill_id,
+            questions_answered=1,
+            correct_answers=1 if is_correct else 0,
+            xp_earned=xp_earned
+        )
+    ]
+
+def _apply_answers(db: Session, user: User, graded: List) -> Tuple[List[AnswerResult], List]:
+    """
+    Fold graded answers, in order, into the user, skills and pet.
+
+    graded holds (question, submission, is_correct, feedback) tuples. Returns
+    the per-answer results and the rows to insert; nothing is committed.
+    """
+    now = datetime.utcnow()
+    skill_ids = {question.skill_id for question, _, _, _ in graded}
+    if EVENT_SOURCED_ANSWERS:
+        # Grade against the full log; the projector writes the state tables later
+        skills, alien_pet = current_state(db, user, skill_ids)
+    else:
+        skills = {skill.id: skill for skill in db.query(UserSkill).filter(UserSkill.id.in_(skill_ids))}
+        alien_pet = pet_for_user(db, user.id)
+    starting_xp = user.total_xp or 0
+
+    results, rows = [], []
+    for question, submission, is_correct, evaluation_feedback in graded:
+        skill = skills[question.skill_id]
+        base_xp = question.cosmic_reward
+        xp_earned = base_xp if is_correct else base_xp // 2
+        answer_quality = submission.difficulty_rating if submission.difficulty_rating is not None else (3 if is_correct else 0)
+
+        if EVENT_SOURCED_ANSWERS:
+            changes = fold_answer(user, skill, alien_pet, is_correct, xp_earned, answer_quality, at=now)
+        else:
+            changes = fold_answer(user, skill, None, is_correct, xp_earned, answer_quality, at=now)
+            if alien_pet:
+                with db.no_autoflush:
+                    changes = apply_pet_answer(
+                        db, alien_pet, is_correct, xp_earned,
+                        skill_complexity=skill.proficiency_level / 10.0,
+                        severe=skill.consecutive_wrong >= 2,
+                        at=now
+                    )
+        pet_message = _pet_message(alien_pet, is_correct, changes["pet_health_change"], skill)
+        rows.extend(_answer_row(user.id, question, submission, is_correct, xp_earned, answer_quality))
+
+        full_explanation = question.explanation
+        if evaluation_feedback and not is_correct:
+            full_explanation = f"{evaluation_feedback}\n\nExpected: {question.correct_answer}\n\n{question.explanation}"
+
+        results.append(AnswerResult(
+            is_correct=is_correct,
+            correct_answer=question.correct_answer,
+            explanation=full_explanation,
+            xp_earned=xp_earned,
+            skill_health_change=changes["pet_health_change"],
+            pet_mood=alien_pet.mood.value if alien_pet else "neutral",
+            pet_message=pet_message,
+            next_review_date=skill.next_review_date,
+            review_interval_days=skill.review_interval_days,
+            pet_luminosity_change=changes["pet_luminosity_change"],
+            pet_knowledge_hunger_change=changes["pet_knowledge_hunger_change"],
+            new_interval_days=skill.review_interval_days,
+            message=pet_message
+        ))
+
+    if not EVENT_SOURCED_ANSWERS:
+        # The users row is shared by every skill, so its counters are updated
+        # SQL-side (like the pet's, above); skills are version-checked on flush
+        user.total_xp = xp_increment(user.total_xp - starting_xp)
+        user.streak_count = streak_after(now)
+    return results, rows
+
+def _commit_answers(db: Session, user: User, graded: List, results: List[AnswerResult], rows: List):
+    """Persist one batch of folded answers in a single commit and update the leaderboards"""
+    user_id = user.id
+    xp_by_skill: Dict[str, int] = {}
+    for (question, _, _, _), result in zip(graded, results):
+        skill_name = question.user_skill.skill_name
+        xp_by_skill[skill_name] = xp_by_skill.get(skill_name, 0) + result.xp_earned
+
+    if EVENT_SOURCED_ANSWERS:
+        # Discard the in-memory fold; the log is the only write
+        total_xp = user.total_xp
+        db.rollback()
+    db.add_all(rows)
+    db.flush()
+    # The batch commits atomically, so any of its XP rows marks it for the boards' high-water check
+    answer_id = max(row.id for row in rows if isinstance(row, (PracticeSession, AnswerEvent)))
+    db.commit()
+    if not EVENT_SOURCED_ANSWERS:
+        # Reloaded after commit: includes answers other requests committed concurrently
+        total_xp = user.total_xp
+
+    for skill_name, xp in xp_by_skill.items():
+        leaderboards.record_answer(user_id, skill_name, xp, total_xp, answer_id)
+
+async def _record_answers(db: Session, user: User, graded: List) -> List[AnswerResult]:
+    """Fold and commit graded answers, re-applying them if a skill or the pet changed underneath"""
+    def write():
+        results, rows = _apply_answers(db, user, graded)
+        _commit_answers(db, user, graded, results, rows)
+        return results
+    return await retry_on_conflict(db, write)
+
 @router.post("/answer", response_model=AnswerResult)
 async def submit_answer(
     submission: AnswerSubmission,
@@ -126,170 +462,189 @@ async def submit_answer(
     if not skill or skill.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
-    oracle = CelestialAIOracle()
-    evaluation_feedback = None
+    is_correct, evaluation_feedback = _grade_answer(db, question, submission, current_user, skill)
+    graded = [(question, submission, is_correct, evaluation_feedback)]
+    results = await _record_answers(db, current_user, graded)
+    _schedule_prefetch(db, current_user.id, graded)
+    return results[0]
 
-    # For multiple choice, do direct comparison
-    if question.question_type == "multiple_choice":
-        is_correct = submission.user_answer.strip() == question.correct_answer.strip()
-        evaluation_feedback = None
-    else:
-        # For open-ended questions, use AI evaluation
-        acceptable_answers = question.options if question.options else []
-        evaluation = oracle.evaluate_open_ended_answer(
-            question_text=question.question_text,
-            user_answer=submission.user_answer,
-            correct_answer=question.correct_answer,
-            acceptable_answers=acceptable_answers
-        )
-        is_correct = evaluation["is_correct"]
-        evaluation_feedback = evaluation["feedback"]
+# ------------------------------
+# Submit a whole practice session at once
+# ------------------------------
+MAX_BATCH_ANSWERS = 50
 
-    base_xp = question.cosmic_reward
-    xp_earned = base_xp if is_correct else base_xp // 2
+class BatchAnswerSubmission(BaseModel):
+    answers: List[AnswerSubmission]
 
-    user_answer = UserAnswer(
-        user_id=current_user.id,
-        question_id=question.id,
-        user_answer=submission.user_answer,
-        is_correct=is_correct,
-        time_taken_seconds=submission.time_taken_seconds
-    )
-    db.add(user_answer)
+class BatchAnswerResult(BaseModel):
+    results: List[AnswerResult]
+    answered: int
+    correct: int
+    xp_earned: int
 
-    answer_quality = submission.difficulty_rating if submission.difficulty_rating is not None else (3 if is_correct else 0)
-    next_review_date = skill.calculate_next_review(answer_quality)
+@router.post("/answer/batch", response_model=BatchAnswerResult)
+async def submit_answer_batch(
+    batch: BatchAnswerSubmission,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    📦 Grade a whole practice session in one call
 
-    # Update skill
-    if is_correct:
-        skill.consecutive_wrong = 0
-        skill.health_score = min(100.0, skill.health_score + 5.0)
-        skill.star_power = min(100.0, skill.star_power + 3.0)
-    else:
-        skill.consecutive_wrong += 1
-        skill.health_score = max(0.0, skill.health_score - 2.0)
-
-    # Update user stats
-    current_user.total_xp += xp_earned
-    today = datetime.utcnow().date()
-    if current_user.last_practice_date:
-        last_date = current_user.last_practice_date.date()
-        if (today - last_date).days == 1:
-            current_user.streak_count += 1
-        elif (today - last_date).days > 1:
-            current_user.streak_count = 1
-    else:
-        current_user.streak_count = 1
-    current_user.last_practice_date = datetime.utcnow()
+    Answers are applied in order, exactly as if submitted one by one, but
+    all XP, schedule and pet changes are saved in a single transaction.
+    """
+    if not batch.answers:
+        raise HTTPException(status_code=400, detail="No answers submitted")
+    if len(batch.answers) > MAX_BATCH_ANSWERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ANSWERS} answers per batch")
 
-    # Record practice session
-    session = PracticeSession(
-        skill_id=skill.id,
-        questions_answered=1,
-        correct_answers=1 if is_correct else 0,
-        xp_earned=xp_earned
-    )
-    db.add(session)
-
-    # Update alien pet
-    alien_pet = db.query(AlienPet).filter(AlienPet.user_id == current_user.id).first()
-    pet_health_change = 0.0
-    pet_luminosity_change = 0.0
-    pet_knowledge_hunger_change = 0.0
-
-    if alien_pet:
-        old_luminosity = alien_pet.luminosity or 100.0
-        old_knowledge_hunger = alien_pet.knowledge_hunger or 50.0
-        if is_correct:
-            alien_pet.luminosity = min(100.0, old_luminosity + 5.0)
-            pet_health_change = alien_pet.luminosity - old_luminosity
-            alien_pet.feed_knowledge(skill_complexity=skill.proficiency_level / 10.0)
-            alien_pet.gain_experience(xp_earned)
-            skill.consecutive_wrong = 0
-        else:
-            if skill.consecutive_wrong >= 2:
-                alien_pet.luminosity = max(0.0, old_luminosity - 10.0)
-            else:
-                alien_pet.luminosity = max(0.0, old_luminosity - 2.0)
-            pet_health_change = alien_pet.luminosity - old_luminosity
-        pet_luminosity_change = alien_pet.luminosity - old_luminosity
-        pet_knowledge_hunger_change = (alien_pet.knowledge_hunger or 50.0) - old_knowledge_hunger
-        alien_pet.update_mood()
-        alien_pet.last_updated = datetime.utcnow()
-
-        # Generate pet message
-        if is_correct:
-            if pet_health_change >= 5.0:
-                pet_messages = [
-                    f"✨ {alien_pet.name} feeds on your knowledge! Health +{pet_health_change:.0f}!",
-                    f"🌟 {alien_pet.name} glows brighter! Health at {alien_pet.luminosity:.0f}%!"
-                ]
-            else:
-                pet_messages = [f"⭐ {alien_pet.name} is already at max health! Keep it up!"]
-        else:
-            if skill.consecutive_wrong >= 2:
-                pet_messages = [
-                    f"🚨 {alien_pet.name} suffers! 2 wrong in a row! Health -{abs(pet_health_change):.0f}",
-                    f"⚠️ {alien_pet.name} dims significantly! Study harder!"
-                ]
-            else:
-                pet_messages = [
-                    f"🌙 {alien_pet.name} dims slightly (Health -{abs(pet_health_change):.0f})",
-                    f"☁️ {alien_pet.name} encourages: Learn from this! Review the explanation."
-                ]
-        pet_message = random.choice(pet_messages)
-        pet_mood = alien_pet.mood.value
-    else:
-        pet_message = "No pet found"
-        pet_mood = "neutral"
-        pet_luminosity_change = 0.0
-        pet_knowledge_hunger_change = 0.0
+    question_ids = {submission.question_id for submission in batch.answers}
+    questions = {question.id: question for question in db.query(Question).filter(Question.id.in_(question_ids))}
+    missing = question_ids - questions.keys()
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Question not found: {sorted(missing)}")
 
-    db.commit()
-    db.refresh(skill)
+    skill_ids = {question.skill_id for question in questions.values()}
+    skills = {skill.id: skill for skill in db.query(UserSkill).filter(UserSkill.id.in_(skill_ids))}
+    if len(skills) != len(skill_ids) or any(skill.user_id != current_user.id for skill in skills.values()):
+        raise HTTPException(status_code=403, detail="Unauthorized")
 
-    full_explanation = question.explanation
-    if evaluation_feedback and not is_correct:
-        full_explanation = f"{evaluation_feedback}\n\nExpected: {question.correct_answer}\n\n{question.explanation}"
+    # Grade everything before touching any state
+    graded = []
+    for submission in batch.answers:
+        question = questions[submission.question_id]
+        is_correct, evaluation_feedback = _grade_answer(db, question, submission, current_user, skills[question.skill_id])
+        graded.append((question, submission, is_correct, evaluation_feedback))
 
-    return AnswerResult(
-        is_correct=is_correct,
-        correct_answer=question.correct_answer,
-        explanation=full_explanation,
-        xp_earned=xp_earned,
-        skill_health_change=pet_health_change,
-        pet_mood=pet_mood,
-        pet_message=pet_message,
-        next_review_date=skill.next_review_date,
-        review_interval_days=skill.review_interval_days,
-        pet_luminosity_change=pet_luminosity_change,
-        pet_knowledge_hunger_change=pet_knowledge_hunger_change,
-        new_interval_days=skill.review_interval_days,
-        message=pet_message
+    results = await _record_answers(db, current_user, graded)
+    _schedule_prefetch(db, current_user.id, graded)
+    return BatchAnswerResult(
+        results=results,
+        answered=len(results),
+        correct=sum(1 for result in results if result.is_correct),
+        xp_earned=sum(result.xp_earned for result in results)
     )
 
+# ------------------------------
+# LLM token usage
+# ------------------------------
+@router.get("/usage")
+async def get_llm_usage(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    🪙 Today's AI token spend and remaining daily budget
+    """
+    return usage_summary(db, current_user.id)
+
+# ------------------------------
+# Rebuild the near-duplicate index
+# ------------------------------
+@router.post("/index/rebuild", dependencies=[Depends(require_admin)])
+async def rebuild_question_index(
+    background: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    🔁 Rebuild the near-duplicate question index from the questions table
+
+    Pass background=true to queue it and poll /jobs/{job_id} instead.
+    Operator only: send X-Admin-Token.
+    """
+    if background:
+        job = enqueue(db, "question_index_rebuild")
+        db.commit()
+        return {"job_id": job.id, "status": job.status}
+    return question_index.rebuild(db)
+
+# ------------------------------
+# Event-sourced answer log
+# ------------------------------
+@router.get("/events/stats")
+async def get_answer_log_stats(
+    db: Session = Depends(get_db)
+):
+    """
+    📜 Answer log head, projected position and projection lag
+    """
+    return log_stats(db)
+
+@router.post("/events/project")
+async def project_answer_events(
+    db: Session = Depends(get_db)
+):
+    """
+    🧮 Fold pending answer events into skills, XP and pet stats now
+    """
+    return {"events_projected": await retry_on_conflict(db, lambda: project_pending(db))}
+
+@router.post("/events/replay")
+async def replay_answer_events(
+    from_snapshot: str = "earliest",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    ⏪ Rebuild your XP, streak, skill schedules and pet stats from the answer log
+
+    from_snapshot=earliest refolds the whole log; latest starts at the newest snapshot.
+    """
+    if from_snapshot not in ("earliest", "latest"):
+        raise HTTPException(status_code=400, detail="from_snapshot must be 'earliest' or 'latest'")
+    user_id = current_user.id
+
+    def replay():
+        # Pending events are folded first so replay covers the whole log
+        while project_pending(db):
+            pass
+        return replay_user(db, user_id, from_snapshot=from_snapshot)
+    return await retry_on_conflict(db, replay)
+
 # ------------------------------
 # Get practice history
 # ------------------------------
 @router.get("/history/{skill_id}")
 async def get_practice_history(
     skill_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    skill = db.query(UserSkill).filter(
+    skill_name = db.query(UserSkill.skill_name).filter(
         UserSkill.id == skill_id,
         UserSkill.user_id == current_user.id
-    ).first()
-    if not skill:
+    ).scalar()
+    if skill_name is None:
         raise HTTPException(status_code=404, detail="Skill not found")
 
-    sessions = db.query(PracticeSession).filter(
-        PracticeSession.skill_id == skill_id
-    ).order_by(PracticeSession.session_date.desc()).limit(20).all()
+    page_size = clamp_limit(limit, default=20)
+    query = db.query(
+        PracticeSession.id,
+        PracticeSession.session_date,
+        PracticeSession.questions_answered,
+        PracticeSession.correct_answers,
+        PracticeSession.xp_earned
+    ).filter(PracticeSession.skill_id == skill_id)
 
-    return {
-        "skill_name": skill.skill_name,
+    # Newest first; cursor is [last session_date, last id]
+    after = decode_cursor(cursor, 2)
+    if after:
+        query = query.filter(tuple_(PracticeSession.session_date, PracticeSession.id) < tuple_(*after))
+
+    sessions = query.order_by(
+        PracticeSession.session_date.desc(), PracticeSession.id.desc()
+    ).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(sessions) > page_size:
+        sessions = sessions[:page_size]
+        next_cursor = encode_cursor([sessions[-1].session_date, sessions[-1].id])
+
+    return FastJSONResponse({
+        "skill_name": skill_name,
         "total_sessions": len(sessions),
         "sessions": [
             {
@@ -299,5 +654,6 @@ async def get_practice_history(
                 "accuracy": (s.correct_answers / s.questions_answered * 100) if s.questions_answered > 0 else 0,
                 "xp_earned": s.xp_earned
             } for s in sessions
-        ]
-    }
+        ],
+        "next_cursor": next_cursor
+    })
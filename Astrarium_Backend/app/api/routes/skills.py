@@ -1,13 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import insert, tuple_, func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
+import csv
+import io
+import re
+import json
 
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app.api.routes.auth import require_admin
 from app.models.skill import UserSkill, PracticeSession
 from app.models.user import User
 from app.core.ai_service import CelestialAIOracle
+from app.core.question_index import question_index
+from app.core.pagination import encode_cursor, decode_cursor, clamp_limit
+from app.core.versioning import CacheValidators, state_versions
+from app.core.decay import urgency_tier_filters, idle_since_cutoff, sweep_urgency_tiers
+from app.core.serialization import FastJSONResponse, skill_row_to_dict
+from app.core.jobs import enqueue
+from app.core.pubsub import publish_state_delta, skill_delta, wants_deltas
+from app.core.concurrency import retry_on_conflict
+from app.core.repository import current_user, skill_for_user, count_due_skills, due_skills_page
 
 router = APIRouter(prefix="/skills", tags=["skills"])
 
@@ -35,6 +50,13 @@ class SkillResponse(BaseModel):
     class Config:
         from_attributes = True  # Allow ORM models
 
+class SkillListResponse(BaseModel):
+    skills: List[SkillResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
+class SkillBulkCreate(BaseModel):
+    skills: List[SkillCreate]
+
 class SkillUpdate(BaseModel):
     proficiency_level: Optional[float] = None
     health_score: Optional[float] = None
@@ -42,11 +64,30 @@ class SkillUpdate(BaseModel):
 # Dependency to get current user
 def get_current_user(db: Session = Depends(get_db)) -> User:
     # TODO: Implement proper JWT authentication
-    user = db.query(User).first()
+    user = current_user(db)
+    if not user:
+        raise HTTPException(status_code=401, detail="No user found. Please register first!")
+    return user
+
+def get_current_reader(db: Session = Depends(get_read_db)) -> User:
+    # Same lookup on the read-only session, so GET routes never touch the write pool
+    user = current_user(db)
     if not user:
         raise HTTPException(status_code=401, detail="No user found. Please register first!")
     return user
 
+def skill_response(skill: UserSkill) -> SkillResponse:
+    return SkillResponse(
+        id=skill.id,
+        skill_name=skill.skill_name,
+        category=skill.category,
+        proficiency_level=skill.proficiency_level,
+        health_score=skill.health_score,
+        star_power=skill.star_power,
+        last_practiced=skill.last_practiced,
+        created_at=skill.created_at
+    )
+
 @router.post("/add", response_model=SkillResponse)
 async def add_skill(
     skill_data: SkillCreate,
@@ -87,70 +128,198 @@ async def add_skill(
     db.commit()
     db.refresh(new_skill)
     
-    return SkillResponse(
-        id=new_skill.id,
-        skill_name=new_skill.skill_name,
-        category=new_skill.category,
-        proficiency_level=new_skill.proficiency_level,
-        health_score=new_skill.health_score,
-        star_power=new_skill.star_power,
-        last_practiced=new_skill.last_practiced,
-        created_at=new_skill.created_at
-    )
+    return skill_response(new_skill)
 
-@router.get("/my-skills", response_model=List[SkillResponse])
-async def get_my_skills(
+MAX_BULK_SKILLS = 10000
+# New skills re-read per query when pushing their deltas
+BULK_DELTA_CHUNK = 500
+
+def normalize_skill_name(name: str) -> str:
+    """Trim and collapse internal whitespace in a skill or category name"""
+    return re.sub(r"\s+", " ", name or "").strip()
+
+def _parse_bulk_rows(content_type: str, body: bytes) -> List:
+    """
+    Turn a JSON or CSV upload into raw rows. Rows are not validated here, so
+    one bad row is reported on its own instead of rejecting the import.
+    """
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        return [
+            {
+                "skill_name": row.get("skill_name") or row.get("name") or "",
+                "category": row.get("category") or None,
+                "proficiency_level": row.get("proficiency_level") or 5.0
+            }
+            for row in reader
+        ]
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Body must be JSON or CSV")
+    rows = payload.get("skills") if isinstance(payload, dict) else None
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=422, detail='JSON body must look like {"skills": [...]}')
+    return rows
+
+@router.post("/bulk")
+async def bulk_add_skills(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
+):
+    """
+    🌌 Import many skills at once (JSON or CSV)
+
+    Send JSON as {"skills": [{"skill_name": ..., "category": ..., "proficiency_level": ...}]}
+    or CSV (Content-Type: text/csv) with a skill_name,category,proficiency_level header.
+    Returns one result per row: created, duplicate or invalid.
+    """
+    rows = _parse_bulk_rows(request.headers.get("content-type", ""), await request.body())
+    if len(rows) > MAX_BULK_SKILLS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_SKILLS} skills per import")
+
+    # One query for every skill name the user already tracks (single adds store names as sent)
+    existing = {
+        normalize_skill_name(name).lower()
+        for (name,) in db.query(UserSkill.skill_name).filter(UserSkill.user_id == current_user.id)
+    }
+
+    now = datetime.utcnow()
+    results = []
+    to_insert = []
+    seen = set()
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results.append({"row": index, "skill_name": None, "status": "invalid", "detail": "Row must be an object"})
+            continue
+        raw_name = row.get("skill_name")
+        name = normalize_skill_name(raw_name) if isinstance(raw_name, str) else ""
+        if not name:
+            results.append({"row": index, "skill_name": raw_name, "status": "invalid", "detail": "Missing skill name"})
+            continue
+        category = row.get("category")
+        if category is not None and not isinstance(category, str):
+            results.append({"row": index, "skill_name": name, "status": "invalid", "detail": "category must be a string"})
+            continue
+        try:
+            proficiency = float(row.get("proficiency_level", 5.0))
+        except (TypeError, ValueError):
+            results.append({"row": index, "skill_name": name, "status": "invalid", "detail": "proficiency_level must be a number"})
+            continue
+
+        key = name.lower()
+        if key in existing or key in seen:
+            results.append({"row": index, "skill_name": name, "status": "duplicate"})
+            continue
+
+        seen.add(key)
+        results.append({"row": index, "skill_name": name, "status": "created"})
+        to_insert.append({
+            "user_id": current_user.id,
+            "skill_name": name,
+            "category": normalize_skill_name(category) or None,
+            "proficiency_level": min(10.0, max(1.0, proficiency)),
+            "health_score": 100.0,
+            "star_power": 50.0,
+            "created_at": now
+        })
+
+    if to_insert:
+        # Single executemany insert; RETURNING keeps ids in parameter order
+        new_ids = db.scalars(
+            insert(UserSkill).returning(UserSkill.id, sort_by_parameter_order=True),
+            to_insert
+        ).all()
+        db.commit()
+        # Core inserts bypass the ORM flush hooks, so bump the skills version
+        # and push the new skills to live subscribers by hand
+        state_versions.bump("skills", current_user.id)
+        if wants_deltas(current_user.id):
+            for start in range(0, len(new_ids), BULK_DELTA_CHUNK):
+                chunk = new_ids[start:start + BULK_DELTA_CHUNK]
+                for skill in db.query(UserSkill).filter(UserSkill.id.in_(chunk)).order_by(UserSkill.id):
+                    publish_state_delta(current_user.id, skill_delta(skill))
+
+        created = iter(new_ids)
+        for result in results:
+            if result["status"] == "created":
+                result["skill_id"] = next(created)
+
+    return {
+        "total_rows": len(rows),
+        "created": len(to_insert),
+        "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+        "invalid": sum(1 for r in results if r["status"] == "invalid"),
+        "results": results
+    }
+
+# Columns serialized by the skill list endpoints - selected directly, no ORM identities
+SKILL_LIST_COLUMNS = (
+    UserSkill.id,
+    UserSkill.skill_name,
+    UserSkill.category,
+    UserSkill.proficiency_level,
+    UserSkill.health_score,
+    UserSkill.star_power,
+    UserSkill.last_practiced,
+    UserSkill.created_at,
+)
+
+@router.get("/my-skills", response_model=SkillListResponse)
+async def get_my_skills(
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader)
 ):
     """
     📚 Get all your tracked skills
+
+    Paginated by health (highest first); pass next_cursor back to fetch the next page.
     """
-    skills = db.query(UserSkill).filter(
-        UserSkill.user_id == current_user.id
-    ).order_by(UserSkill.health_score.desc()).all()
-    
-    return [
-        SkillResponse(
-            id=s.id,
-            skill_name=s.skill_name,
-            category=s.category,
-            proficiency_level=s.proficiency_level,
-            health_score=s.health_score,
-            star_power=s.star_power,
-            last_practiced=s.last_practiced,
-            created_at=s.created_at
-        )
-        for s in skills
-    ]
+    validators = CacheValidators(request, "skills", current_user.id, variant=str(request.query_params))
+    if validators.not_modified:
+        return validators.not_modified_response()
+
+    page_size = clamp_limit(limit)
+    query = db.query(*SKILL_LIST_COLUMNS).filter(UserSkill.user_id == current_user.id)
+
+    after = decode_cursor(cursor, 2)
+    if after:
+        query = query.filter(tuple_(UserSkill.health_score, UserSkill.id) < tuple_(*after))
+
+    rows = query.order_by(
+        UserSkill.health_score.desc(), UserSkill.id.desc()
+    ).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor([rows[-1].health_score, rows[-1].id])
+
+    return FastJSONResponse({
+        "skills": [skill_row_to_dict(row) for row in rows],
+        "next_cursor": next_cursor
+    }, headers=validators.headers())
 
 @router.get("/skill/{skill_id}", response_model=SkillResponse)
 async def get_skill(
     skill_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader)
 ):
     """
     🔍 Get details for a specific skill
     """
-    skill = db.query(UserSkill).filter(
-        UserSkill.id == skill_id,
-        UserSkill.user_id == current_user.id
-    ).first()
+    skill = skill_for_user(db, skill_id, current_user.id)
     
     if not skill:
         raise HTTPException(status_code=404, detail="Skill not found")
 
-    return SkillResponse(
-        id=skill.id,
-        skill_name=skill.skill_name,
-        category=skill.category,
-        proficiency_level=skill.proficiency_level,
-        health_score=skill.health_score,
-        star_power=skill.star_power,
-        last_practiced=skill.last_practiced,
-        created_at=skill.created_at
-    )
+    return skill_response(skill)
 
 @router.patch("/skill/{skill_id}", response_model=SkillResponse)
 async def update_skill(
@@ -162,33 +331,23 @@ async def update_skill(
     """
     ✏️ Update skill stats
     """
-    skill = db.query(UserSkill).filter(
-        UserSkill.id == skill_id,
-        UserSkill.user_id == current_user.id
-    ).first()
-    
-    if not skill:
-        raise HTTPException(status_code=404, detail="Skill not found")
-    
-    if update_data.proficiency_level is not None:
-        skill.proficiency_level = min(10.0, max(1.0, update_data.proficiency_level))
-    
-    if update_data.health_score is not None:
-        skill.health_score = min(100.0, max(0.0, update_data.health_score))
-    
-    db.commit()
-    db.refresh(skill)
+    def write():
+        skill = skill_for_user(db, skill_id, current_user.id)
 
-    return SkillResponse(
-        id=skill.id,
-        skill_name=skill.skill_name,
-        category=skill.category,
-        proficiency_level=skill.proficiency_level,
-        health_score=skill.health_score,
-        star_power=skill.star_power,
-        last_practiced=skill.last_practiced,
-        created_at=skill.created_at
-    )
+        if not skill:
+            raise HTTPException(status_code=404, detail="Skill not found")
+
+        if update_data.proficiency_level is not None:
+            skill.proficiency_level = min(10.0, max(1.0, update_data.proficiency_level))
+
+        if update_data.health_score is not None:
+            skill.health_score = min(100.0, max(0.0, update_data.health_score))
+
+        db.commit()
+        db.refresh(skill)
+        return skill
+
+    return skill_response(await retry_on_conflict(db, write))
 
 @router.delete("/skill/{skill_id}")
 async def delete_skill(
@@ -199,10 +358,7 @@ async def delete_skill(
     """
     🗑️ Remove a skill from tracking
     """
-    skill = db.query(UserSkill).filter(
-        UserSkill.id == skill_id,
-        UserSkill.user_id == current_user.id
-    ).first()
+    skill = skill_for_user(db, skill_id, current_user.id)
     
     if not skill:
         raise HTTPException(status_code=404, detail="Skill not found")
@@ -210,16 +366,69 @@ async def delete_skill(
     skill_name = skill.skill_name
     db.delete(skill)
     db.commit()
+    question_index.forget_skill(skill_id)
     
     return {
         "message": f"✨ {skill_name} has been released into the cosmos",
         "skill_id": skill_id
     }
 
+# ------------------------------
+# Entry builders shared with the dashboard
+# ------------------------------
+URGENCY_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+DECAY_COLUMNS = (
+    UserSkill.id,
+    UserSkill.skill_name,
+    UserSkill.category,
+    UserSkill.health_score,
+    UserSkill.last_practiced,
+)
+
+def decaying_sort_key(skill) -> tuple:
+    """The /skills/decaying ORDER BY, for skills ranked in Python (the dashboard)"""
+    return (skill.last_practiced is not None, skill.last_practiced or datetime.min, skill.id)
+
+def decaying_entry(skill, analysis: dict) -> dict:
+    return {
+        "skill_id": skill.id,
+        "skill_name": skill.skill_name,
+        "category": skill.category,
+        "health_score": skill.health_score,
+        "days_idle": analysis["days_idle"],
+        "urgency": analysis["urgency"],
+        "message": analysis["message"],
+        "questions_recommended": analysis["questions_recommended"]
+    }
+
+def due_entry(skill) -> dict:
+    return {
+        "skill_id": skill.id,
+        "skill_name": skill.skill_name,
+        "category": skill.category,
+        "next_review_date": skill.next_review_date,
+        "review_interval_days": skill.review_interval_days,
+        "consecutive_correct": skill.consecutive_correct,
+        "health_score": skill.health_score,
+        "is_new": skill.next_review_date is None
+    }
+
+def recommendation_entry(skill, analysis: dict) -> dict:
+    return {
+        "skill_id": skill.id,
+        "skill_name": skill.skill_name,
+        "priority": analysis["urgency"],
+        "reason": analysis["message"],
+        "suggested_questions": analysis["questions_recommended"],
+        "health_score": skill.health_score,
+        "days_idle": analysis["days_idle"]
+    }
+
 @router.get("/decaying")
 async def get_decaying_skills(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader)
 ):
     """
     ⚠️ CRITICAL: Skills fading from memory due to the forgetting curve
@@ -227,83 +436,112 @@ async def get_decaying_skills(
     These skills haven't been practiced recently and are at risk of knowledge decay.
     Battle the forgetting curve by practicing these first!
     """
-    skills = db.query(UserSkill).filter(
-        UserSkill.user_id == current_user.id
+    now = datetime.utcnow()
+
+    # High/critical filter and ordering run in SQL on the (user_id, last_practiced) index.
+    # Urgency only grows with idle time, so oldest-first is also most-urgent-first;
+    # the tier label is derived per row below.
+    skills = db.query(*DECAY_COLUMNS).filter(
+        UserSkill.user_id == current_user.id,
+        (UserSkill.last_practiced == None) | (UserSkill.last_practiced <= idle_since_cutoff("high", now))
+    ).order_by(
+        UserSkill.last_practiced != None,  # Never practiced (999 days idle) first
+        UserSkill.last_practiced.asc(),
+        UserSkill.id.asc()
     ).all()
-    
+
     oracle = CelestialAIOracle()
-    decaying_skills = []
-    
-    for skill in skills:
-        analysis = oracle.analyze_skill_decay({
+    decaying_skills = [
+        decaying_entry(skill, oracle.analyze_skill_decay({
             "last_practiced": skill.last_practiced,
             "health_score": skill.health_score
-        })
-        
-        if analysis["urgency"] in ["high", "critical"]:
-            decaying_skills.append({
-                "skill_id": skill.id,
-                "skill_name": skill.skill_name,
-                "category": skill.category,
-                "health_score": skill.health_score,
-                "days_idle": analysis["days_idle"],
-                "urgency": analysis["urgency"],
-                "message": analysis["message"],
-                "questions_recommended": analysis["questions_recommended"]
-            })
-    
-    # Sort by urgency (critical first)
-    decaying_skills.sort(key=lambda x: (x["urgency"] == "critical", x["days_idle"]), reverse=True)
-    
-    return {
+        }))
+        for skill in skills
+    ]
+
+    return FastJSONResponse({
         "total_decaying": len(decaying_skills),
         "skills": decaying_skills
+    })
+
+@router.get("/outreach", dependencies=[Depends(require_admin)])
+async def get_outreach_users(
+    tier: str = "critical",
+    db: Session = Depends(get_read_db)
+):
+    """
+    📣 Users with skills in a high-urgency tier (across all users)
+
+    Served from the materialized urgency_tier column and its partial index.
+    Operator only: send X-Admin-Token.
+    """
+    if tier not in ("critical", "high"):
+        raise HTTPException(status_code=400, detail="tier must be 'critical' or 'high'")
+
+    rows = db.query(UserSkill.user_id, func.count(UserSkill.id)).filter(
+        UserSkill.urgency_tier == tier
+    ).group_by(UserSkill.user_id).all()
+
+    return {
+        "tier": tier,
+        "total_users": len(rows),
+        "users": [{"user_id": user_id, "skill_count": count} for user_id, count in rows]
     }
 
+@router.post("/sweep-decay", dependencies=[Depends(require_admin)])
+async def trigger_decay_sweep(
+    background: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    ⏰ Run the urgency tier sweep now (it also runs in the background)
+
+    Pass background=true to queue it and poll /jobs/{job_id} instead.
+    Operator only: send X-Admin-Token.
+    """
+    if background:
+        job = enqueue(db, "decay_sweep")
+        db.commit()
+        return {"job_id": job.id, "status": job.status}
+    return sweep_urgency_tiers(db)
+
 @router.get("/due-today")
 async def get_skills_due_today(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader)
 ):
     """
     📅 Get skills due for review TODAY (Anki-style spaced repetition)
 
     Returns skills where next_review_date is today or earlier.
     Practice these to stay ahead of the forgetting curve!
+    Never-reviewed skills come first; pass next_cursor back to fetch the next page.
     """
-    from datetime import datetime
-
     now = datetime.utcnow()
+    page_size = clamp_limit(limit)
 
-    # Get skills that are due (next_review_date <= now OR never reviewed)
-    due_skills = db.query(UserSkill).filter(
-        UserSkill.user_id == current_user.id
-    ).filter(
-        (UserSkill.next_review_date <= now) | (UserSkill.next_review_date == None)
-    ).order_by(UserSkill.next_review_date.asc()).all()
+    # Due = next_review_date <= now OR never reviewed; cursor is [last next_review_date or None, last id]
+    total_due = count_due_skills(db, current_user.id, now)
+    due_skills = due_skills_page(db, current_user.id, now, page_size + 1, after=decode_cursor(cursor, 2))
 
-    return {
-        "total_due": len(due_skills),
-        "skills": [
-            {
-                "skill_id": s.id,
-                "skill_name": s.skill_name,
-                "category": s.category,
-                "next_review_date": s.next_review_date,
-                "review_interval_days": s.review_interval_days,
-                "consecutive_correct": s.consecutive_correct,
-                "health_score": s.health_score,
-                "is_new": s.next_review_date is None
-            }
-            for s in due_skills
-        ],
-        "message": f"🌟 {len(due_skills)} skills ready for retention practice!" if due_skills else "✨ All caught up! No skills due today."
-    }
+    next_cursor = None
+    if len(due_skills) > page_size:
+        due_skills = due_skills[:page_size]
+        next_cursor = encode_cursor([due_skills[-1].next_review_date, due_skills[-1].id])
+
+    return FastJSONResponse({
+        "total_due": total_due,
+        "skills": [due_entry(s) for s in due_skills],
+        "next_cursor": next_cursor,
+        "message": f"🌟 {total_due} skills ready for retention practice!" if total_due else "✨ All caught up! No skills due today."
+    })
 
 @router.get("/recommendations")
 async def get_practice_recommendations(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader)
 ):
     """
     💡 AI-powered micro-practice recommendations to prevent knowledge decay
@@ -311,41 +549,41 @@ async def get_practice_recommendations(
     Get personalized suggestions for which skills need retention work.
     Prioritizes skills falling victim to the forgetting curve.
     """
-    skills = db.query(UserSkill).filter(
+    total_skills = db.query(func.count(UserSkill.id)).filter(
         UserSkill.user_id == current_user.id
-    ).all()
-    
-    if not skills:
+    ).scalar()
+
+    if not total_skills:
         return {
             "message": "No skills tracked yet! Add some skills to get started.",
             "recommendations": []
         }
-    
+
+    # Rank by urgency then health: one last_practiced range query per tier, most
+    # urgent first, each sorting only its own tier. Stops once the top 5 are in.
+    skills = []
+    for _, in_tier in urgency_tier_filters():
+        skills += db.query(*DECAY_COLUMNS).filter(
+            UserSkill.user_id == current_user.id,
+            in_tier
+        ).order_by(
+            UserSkill.health_score.asc(),
+            UserSkill.id.asc()
+        ).limit(5 - len(skills)).all()
+        if len(skills) >= 5:
+            break
+
     oracle = CelestialAIOracle()
-    recommendations = []
-    
-    for skill in skills:
-        analysis = oracle.analyze_skill_decay({
+    recommendations = [
+        recommendation_entry(skill, oracle.analyze_skill_decay({
             "last_practiced": skill.last_practiced,
             "health_score": skill.health_score
-        })
-        
-        recommendations.append({
-            "skill_id": skill.id,
-            "skill_name": skill.skill_name,
-            "priority": analysis["urgency"],
-            "reason": analysis["message"],
-            "suggested_questions": analysis["questions_recommended"],
-            "health_score": skill.health_score,
-            "days_idle": analysis["days_idle"]
-        })
-    
-    # Sort by urgency and health score
-    urgency_order = {"critical": 0, "high": 1, "medium": 2, "low": 3}
-    recommendations.sort(key=lambda x: (urgency_order.get(x["priority"], 4), x["health_score"]))
-    
-    return {
-        "total_skills": len(skills),
-        "recommendations": recommendations[:5],  # Top 5 recommendations
+        }))
+        for skill in skills
+    ]
+
+    return FastJSONResponse({
+        "total_skills": total_skills,
+        "recommendations": recommendations,  # Top 5 recommendations
         "cosmic_wisdom": "🌟 Focus on the skills that need you most!"
-    }
\ No newline at end of file
+    })
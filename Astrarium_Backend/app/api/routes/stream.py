@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import os
+
+from app.database import SessionLocal
+from app.models.user import User
+from app.core.pubsub import state_broker
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "25"))
+
+def _resolve_user_id() -> int:
+    # Short-lived session: an open stream must not pin a pooled DB connection
+    db = SessionLocal()
+    try:
+        # TODO: Implement proper JWT authentication
+        user_id = db.query(User.id).order_by(User.id).limit(1).scalar()
+    finally:
+        db.close()
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="No user found. Please register first!")
+    return user_id
+
+def _sse(event_type: str, data) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.get("/state")
+async def stream_state(request: Request):
+    """
+    📡 Server-sent events with your pet and skill changes as they happen
+
+    Events: pet, skill, skill_deleted, skill_tier, and resync (the server
+    dropped events for a slow client - refetch /dashboard).
+    """
+    user_id = _resolve_user_id()
+
+    async def events():
+        subscription = state_broker.subscribe(user_id)
+        try:
+            yield _sse("ready", {"user_id": user_id})
+            while True:
+                try:
+                    delta = await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if subscription.lagged:
+                    subscription.lagged = False
+                    yield _sse("resync", {"reason": "events dropped for slow client"})
+                yield _sse(delta["type"], delta)
+        finally:
+            state_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats")
+async def stream_stats():
+    """
+    📊 Number of open push connections in this worker
+    """
+    return {"connections": state_broker.connection_count()}
@@ -1,42 +1,30 @@
-import os
 import json
 import random
+import logging
 from datetime import datetime
-from openai import OpenAI
 from dotenv import load_dotenv
 from typing import Dict, List
 
+from app.core.llm_router import LLMRouter, load_endpoints_from_env
+from app.core.token_ledger import usage_recorder
+from app.core.decay import tier_for_days_idle
+
+logger = logging.getLogger(__name__)
+
 # ------------------------------
 # Load environment variables first
 # ------------------------------
 load_dotenv()
 
-BASE_URL = os.getenv("OPENAI_BASE_URL", "https://openrouter.ai/api/v1")
-API_KEY = os.getenv("OPENAI_API_KEY")
-
-print(f"[CelestialAIOracle] Testing API connection...")
-print(f"Base URL: {BASE_URL}")
-print(f"API Key (first 20 chars): {API_KEY[:20]}...")
-print(f"API Key length: {len(API_KEY)}\n")
-
 # ------------------------------
-# OpenRouter requires extra headers
+# Route calls across the configured OpenAI-compatible endpoints
 # ------------------------------
-default_headers = {}
-if "openrouter" in BASE_URL.lower():
-    default_headers = {
-        "HTTP-Referer": "http://localhost:3000",
-        "X-Title": "Astrarium",
-    }
+llm_router = LLMRouter(load_endpoints_from_env())
 
-# ------------------------------
-# Initialize OpenAI client
-# ------------------------------
-client = OpenAI(
-    api_key=API_KEY,
-    base_url=BASE_URL,
-    default_headers=default_headers
-)
+print("[CelestialAIOracle] Configured LLM endpoints:")
+for _endpoint in llm_router.endpoints:
+    print(f"  - {_endpoint.name}: {_endpoint.base_url} ({_endpoint.model})")
+print()
 
 # ------------------------------
 # Helper function to extract JSON from markdown
@@ -64,8 +52,15 @@ class CelestialAIOracle:
         skill_name: str,
         category: str = None,
         proficiency_level: float = 5.0,
-        question_type: str = "random"
+        question_type: str = "random",
+        user_id: int = None,
+        skill_id: int = None,
+        speculative: bool = False
     ) -> Dict:
+        """
+        speculative: a background prefetch nobody is waiting on yet - no hedged
+        request, and the tokens are booked as "prefetch" so they can be capped
+        """
 
         # Determine difficulty
         if proficiency_level < 3:
@@ -109,15 +104,12 @@ Return ONLY valid JSON in the appropriate format with this structure:
 """
 
         try:
-            # Use gpt-4o-mini for better reliability
-            model_name = "openai/gpt-4o-mini" if "openrouter" in BASE_URL.lower() else "gpt-4o-mini"
+            logger.debug("Sending question request to LLM router, prompt:\n%s", prompt)
 
-            # DEBUG: show AI call info
-            print(f"[DEBUG] Sending request to AI model {model_name}...")
-            print(f"[DEBUG] Prompt:\n{prompt}")
-
-            response = client.chat.completions.create(
-                model=model_name,
+            # Question generation is latency-critical, so allow a hedged second request
+            response, endpoint = llm_router.chat(
+                hedge=not speculative,
+                on_usage=usage_recorder(user_id, skill_id, "prefetch" if speculative else "question"),
                 messages=[
                     {"role": "system", "content": "You are a cosmic skill retention expert. Generate questions that reinforce previously learned skills."},
                     {"role": "user", "content": prompt}
@@ -127,12 +119,10 @@ Return ONLY valid JSON in the appropriate format with this structure:
             )
 
             content = response.choices[0].message.content.strip()
-            print(f"[DEBUG] Raw AI response (first 200 chars): {content[:200]}...")
-            print(f"[DEBUG] Full AI response: {content}")
+            logger.debug("Served by %s (%s)", endpoint.name, endpoint.model)
+            logger.debug("Raw AI response: %s", content)
             question_data = extract_json_from_markdown(content)
-
-            # DEBUG: show extracted JSON
-            print(f"[DEBUG] Extracted JSON: {question_data}")
+            logger.debug("Extracted JSON: %s", question_data)
 
             # Validate that we got required fields
             if not question_data or "question" not in question_data:
@@ -180,7 +170,15 @@ Return ONLY valid JSON in the appropriate format with this structure:
             }
 
     @staticmethod
-    def evaluate_open_ended_answer(question_text: str, user_answer: str, correct_answer: str, acceptable_answers: List[str] = None) -> Dict:
+    def evaluate_open_ended_answer(
+        question_text: str,
+        user_answer: str,
+        correct_answer: str,
+        acceptable_answers: List[str] = None,
+        user_id: int = None,
+        skill_id: int = None,
+        allow_ai: bool = True
+    ) -> Dict:
         """Evaluate open-ended answers using AI semantic similarity"""
         user_lower = user_answer.strip().lower()
         correct_lower = correct_answer.strip().lower()
@@ -190,6 +188,10 @@ Return ONLY valid JSON in the appropriate format with this structure:
                 if ans.lower() in user_lower or user_lower in ans.lower():
                     return {"is_correct": True, "feedback": "Correct!", "confidence": 1.0}
 
+        # Out of LLM budget - grade with plain string matching
+        if not allow_ai:
+            return CelestialAIOracle._fallback_evaluation(user_lower, correct_lower)
+
         try:
             prompt = f"""
 Evaluate if the user's answer is correct.
@@ -200,14 +202,10 @@ User's Answer: {user_answer}
 
 Respond with ONLY JSON: {{"is_correct": true or false, "reasoning": "Brief explanation", "confidence": 0.0-1.0}}
 """
-            # Use gpt-4o-mini for better reliability
-            model_name = "openai/gpt-4o-mini" if "openrouter" in BASE_URL.lower() else "gpt-4o-mini"
-
-            print(f"[DEBUG] Sending evaluation request to AI model {model_name}...")
-            print(f"[DEBUG] Prompt:\n{prompt}")
+            logger.debug("Sending evaluation request to LLM router, prompt:\n%s", prompt)
 
-            response = client.chat.completions.create(
-                model=model_name,
+            response, endpoint = llm_router.chat(
+                on_usage=usage_recorder(user_id, skill_id, "evaluation"),
                 messages=[
                     {"role": "system", "content": "You are an expert evaluator of answers."},
                     {"role": "user", "content": prompt}
@@ -217,7 +215,7 @@ Respond with ONLY JSON: {{"is_correct": true or false, "reasoning": "Brief expla
             )
 
             content = response.choices[0].message.content.strip()
-            print(f"[DEBUG] Raw evaluation response: {content[:200]}...")
+            logger.debug("Raw evaluation response: %s", content[:200])
             result = extract_json_from_markdown(content)
             return {
                 "is_correct": result.get("is_correct", False),
@@ -225,16 +223,20 @@ Respond with ONLY JSON: {{"is_correct": true or false, "reasoning": "Brief expla
                 "confidence": result.get("confidence", 0.5)
             }
 
-        except Exception as e:
-            similarity = user_lower in correct_lower or correct_lower in user_lower
-            return {
-                "is_correct": similarity,
-                "feedback": "Fallback evaluation" if similarity else "Answer doesn't match",
-                "confidence": 0.6 if similarity else 0.3
-            }
+        except Exception:
+            return CelestialAIOracle._fallback_evaluation(user_lower, correct_lower)
+
+    @staticmethod
+    def _fallback_evaluation(user_lower: str, correct_lower: str) -> Dict:
+        similarity = user_lower in correct_lower or correct_lower in user_lower
+        return {
+            "is_correct": similarity,
+            "feedback": "Fallback evaluation" if similarity else "Answer doesn't match",
+            "confidence": 0.6 if similarity else 0.3
+        }
 
     @staticmethod
-    def generate_hint(question_text: str, correct_answer: str, options: Dict) -> str:
+    def generate_hint(question_text: str, correct_answer: str, options: Dict, user_id: int = None, skill_id: int = None) -> str:
         """Generate subtle cosmic hint"""
         try:
             prompt = f"""
@@ -246,14 +248,10 @@ Correct Answer: {correct_answer}
 
 Keep it mystical and helpful. Max 2 sentences.
 """
-            # Use gpt-4o-mini for better reliability
-            model_name = "openai/gpt-4o-mini" if "openrouter" in BASE_URL.lower() else "gpt-4o-mini"
+            logger.debug("Sending hint request to LLM router, prompt:\n%s", prompt)
 
-            print(f"[DEBUG] Sending hint request to AI model {model_name}...")
-            print(f"[DEBUG] Prompt:\n{prompt}")
-
-            response = client.chat.completions.create(
-                model=model_name,
+            response, endpoint = llm_router.chat(
+                on_usage=usage_recorder(user_id, skill_id, "hint"),
                 messages=[
                     {"role": "system", "content": "You are a mystical guide offering cosmic wisdom."},
                     {"role": "user", "content": prompt}
@@ -263,7 +261,7 @@ Keep it mystical and helpful. Max 2 sentences.
             )
 
             content = response.choices[0].message.content.strip()
-            print(f"[DEBUG] Raw hint response: {content[:200]}...")
+            logger.debug("Raw hint response: %s", content[:200])
             return content
 
         except Exception:
@@ -282,16 +280,7 @@ Keep it mystical and helpful. Max 2 sentences.
                 last_practiced = datetime.fromisoformat(last_practiced.replace('Z', '+00:00'))
             days_idle = (datetime.utcnow() - last_practiced).days
 
-        if days_idle >= 180:
-            urgency, msg, questions = "critical", "!! CRITICAL DECAY: Practice immediately!", 10
-        elif days_idle >= 90:
-            urgency, msg, questions = "high", "! HIGH DECAY: Significant knowledge loss.", 5
-        elif days_idle >= 30:
-            urgency, msg, questions = "medium", "~ MODERATE DECAY: Refresh concepts.", 3
-        elif days_idle >= 7:
-            urgency, msg, questions = "low", "- EARLY DECAY: Quick refresher recommended.", 2
-        else:
-            urgency, msg, questions = "maintenance", "* WELL MAINTAINED: Keep practicing.", 1
+        _, urgency, msg, questions = tier_for_days_idle(days_idle)
 
         return {
             "urgency": urgency,
@@ -0,0 +1,377 @@
+import os
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.user import User
+from app.models.skill import UserSkill, PracticeSession
+from app.models.question import UserAnswer
+from app.models.alien_pet import AlienPet, AlienMood, EvolutionStage
+from app.models.answer_event import AnswerEvent, StateSnapshot, ProjectionCheckpoint
+
+# ------------------------------
+# Event-sourced answer settings
+# ------------------------------
+# When on, /questions/answer appends to answer_events and the projector
+# folds events into users / user_skills / alien_pets in batches.
+EVENT_SOURCED_ANSWERS = os.getenv("ANSWER_EVENT_LOG", "false").lower() in ("1", "true", "yes")
+PROJECTOR_INTERVAL_SECONDS = float(os.getenv("ANSWER_PROJECTOR_INTERVAL", "5"))
+PROJECTOR_BATCH_SIZE = int(os.getenv("ANSWER_PROJECTOR_BATCH", "500"))
+# A user gets a fresh snapshot once this many log entries have passed since their last one
+SNAPSHOT_EVERY_EVENTS = int(os.getenv("ANSWER_SNAPSHOT_EVERY", "1000"))
+
+PROJECTOR = "answers"
+
+
+# ------------------------------
+# State transition for one answer
+# ------------------------------
+def fold_answer(
+    user: User,
+    skill: UserSkill,
+    pet: Optional[AlienPet],
+    is_correct: bool,
+    xp_earned: int,
+    answer_quality: int,
+    at: Optional[datetime] = None
+) -> Dict:
+    """
+    Apply one graded answer to the user, skill and pet (SM-2 schedule, XP,
+    streak, pet stats). Returns the pet stat changes shown to the user.
+    """
+    at = at or datetime.utcnow()
+    skill.calculate_next_review(answer_quality, now=at)
+
+    if is_correct:
+        skill.consecutive_wrong = 0
+        skill.health_score = min(100.0, skill.health_score + 5.0)
+        skill.star_power = min(100.0, skill.star_power + 3.0)
+    else:
+        skill.consecutive_wrong += 1
+        skill.health_score = max(0.0, skill.health_score - 2.0)
+
+    # Update user stats
+    user.total_xp = (user.total_xp or 0) + xp_earned
+    today = at.date()
+    if user.last_practice_date:
+        last_date = user.last_practice_date.date()
+        if (today - last_date).days == 1:
+            user.streak_count += 1
+        elif (today - last_date).days > 1:
+            user.streak_count = 1
+    else:
+        user.streak_count = 1
+    user.last_practice_date = at
+
+    changes = {
+        "pet_health_change": 0.0,
+        "pet_luminosity_change": 0.0,
+        "pet_knowledge_hunger_change": 0.0
+    }
+    if pet:
+        old_luminosity = pet.luminosity or 100.0
+        old_knowledge_hunger = pet.knowledge_hunger or 50.0
+        if is_correct:
+            pet.luminosity = min(100.0, old_luminosity + 5.0)
+            changes["pet_health_change"] = pet.luminosity - old_luminosity
+            pet.feed_knowledge(skill_complexity=skill.proficiency_level / 10.0)
+            pet.gain_experience(xp_earned)
+            pet.last_fed = at
+        else:
+            if skill.consecutive_wrong >= 2:
+                pet.luminosity = max(0.0, old_luminosity - 10.0)
+            else:
+                pet.luminosity = max(0.0, old_luminosity - 2.0)
+            changes["pet_health_change"] = pet.luminosity - old_luminosity
+        changes["pet_luminosity_change"] = pet.luminosity - old_luminosity
+        changes["pet_knowledge_hunger_change"] = (pet.knowledge_hunger or 50.0) - old_knowledge_hunger
+        pet.update_mood()
+        pet.last_updated = at
+    return changes
+
+
+# ------------------------------
+# Snapshots
+# ------------------------------
+USER_FIELDS = ("total_xp", "streak_count", "last_practice_date")
+SKILL_FIELDS = (
+    "health_score", "star_power", "last_practiced", "next_review_date", "review_interval_days",
+    "ease_factor", "consecutive_correct", "consecutive_wrong", "urgency_tier", "days_idle_snapshot"
+)
+PET_FIELDS = (
+    "luminosity", "energy", "knowledge_hunger", "cosmic_resonance", "level", "experience",
+    "mood", "evolution_stage", "last_fed", "last_updated"
+)
+DATETIME_FIELDS = {"last_practice_date", "last_practiced", "next_review_date", "last_fed", "last_updated"}
+ENUM_FIELDS = {"mood": AlienMood, "evolution_stage": EvolutionStage}
+
+
+def _dump(obj, fields) -> Dict:
+    state = {}
+    for field in fields:
+        value = getattr(obj, field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif field in ENUM_FIELDS and value is not None:
+            value = value.value
+        state[field] = value
+    return state
+
+
+def _load(obj, state: Dict):
+    for field, value in state.items():
+        if value is not None and field in DATETIME_FIELDS:
+            value = datetime.fromisoformat(value)
+        elif value is not None and field in ENUM_FIELDS:
+            value = ENUM_FIELDS[field](value)
+        setattr(obj, field, value)
+
+
+def capture_state(user: User, skills: List[UserSkill], pet: Optional[AlienPet]) -> Dict:
+    return {
+        "user": _dump(user, USER_FIELDS),
+        "skills": {str(skill.id): _dump(skill, SKILL_FIELDS) for skill in skills},
+        "pet": _dump(pet, PET_FIELDS) if pet else None
+    }
+
+
+def initial_skill_state() -> Dict:
+    """SKILL_FIELDS as a newly added skill has them (the column defaults)"""
+    state = {}
+    for field in SKILL_FIELDS:
+        default = UserSkill.__table__.c[field].default
+        state[field] = default.arg if default is not None and default.is_scalar else None
+    return state
+
+
+def restore_state(user: User, skills: Dict[int, UserSkill], pet: Optional[AlienPet], state: Dict):
+    _load(user, state["user"])
+    for skill_id, skill in skills.items():
+        # A skill missing from the snapshot was added after it: every one of
+        # its events comes later in the log, so it refolds from a fresh skill
+        _load(skill, state["skills"].get(str(skill_id)) or initial_skill_state())
+    if pet is not None and state.get("pet"):
+        _load(pet, state["pet"])
+
+
+# ------------------------------
+# Projector
+# ------------------------------
+def checkpoint_seq(db: Session) -> int:
+    seq = db.query(ProjectionCheckpoint.last_seq).filter(ProjectionCheckpoint.name == PROJECTOR).scalar()
+    return seq or 0
+
+
+def _ensure_checkpoint(db: Session) -> int:
+    checkpoint = db.get(ProjectionCheckpoint, PROJECTOR)
+    if checkpoint is not None:
+        return checkpoint.last_seq
+    try:
+        db.add(ProjectionCheckpoint(name=PROJECTOR, last_seq=0))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    return checkpoint_seq(db)
+
+
+def _load_rows(db: Session, user_ids) -> Tuple[Dict[int, User], Dict[int, List[UserSkill]], Dict[int, AlienPet]]:
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids))}
+    skills: Dict[int, List[UserSkill]] = {}
+    for skill in db.query(UserSkill).filter(UserSkill.user_id.in_(user_ids)):
+        skills.setdefault(skill.user_id, []).append(skill)
+    pets = {pet.user_id: pet for pet in db.query(AlienPet).filter(AlienPet.user_id.in_(user_ids))}
+    return users, skills, pets
+
+
+def _latest_snapshot_seqs(db: Session, user_ids) -> Dict[int, int]:
+    return dict(
+        db.query(StateSnapshot.user_id, func.max(StateSnapshot.seq))
+        .filter(StateSnapshot.user_id.in_(user_ids))
+        .group_by(StateSnapshot.user_id)
+        .all()
+    )
+
+
+def project_pending(db: Session, limit: int = PROJECTOR_BATCH_SIZE) -> int:
+    """
+    Fold the next batch of events into the state tables and advance the
+    checkpoint in one transaction. Each row is written once per batch,
+    however many answers touched it. Returns the number of events folded.
+    """
+    last_seq = _ensure_checkpoint(db)
+    events = db.query(AnswerEvent).filter(AnswerEvent.id > last_seq).order_by(AnswerEvent.id).limit(limit).all()
+    if not events:
+        return 0
+
+    user_ids = {event.user_id for event in events}
+    users, skills, pets = _load_rows(db, user_ids)
+    snapshot_seqs = _latest_snapshot_seqs(db, user_ids)
+
+    # Baseline snapshot before a user's first projected event, so replay has a starting point
+    for user_id in user_ids:
+        if user_id not in snapshot_seqs and user_id in users:
+            db.add(StateSnapshot(
+                user_id=user_id,
+                seq=last_seq,
+                state=capture_state(users[user_id], skills.get(user_id, []), pets.get(user_id))
+            ))
+            snapshot_seqs[user_id] = last_seq
+
+    skills_by_id = {skill.id: skill for user_skills in skills.values() for skill in user_skills}
+    history = []
+    for event in events:
+        user = users.get(event.user_id)
+        skill = skills_by_id.get(event.skill_id)
+        if user is None or skill is None:
+            continue  # Deleted since the answer was logged
+        fold_answer(user, skill, pets.get(event.user_id), event.is_correct, event.xp_earned, event.answer_quality, at=event.occurred_at)
+        history.append(UserAnswer(
+            user_id=event.user_id,
+            question_id=event.question_id,
+            user_answer=event.user_answer,
+            is_correct=event.is_correct,
+            time_taken_seconds=event.time_taken_seconds,
+            answered_at=event.occurred_at
+        ))
+        history.append(PracticeSession(
+            skill_id=event.skill_id,
+            questions_answered=1,
+            correct_answers=1 if event.is_correct else 0,
+            xp_earned=event.xp_earned,
+            session_date=event.occurred_at
+        ))
+    db.add_all(history)
+
+    new_seq = events[-1].id
+    for user_id in user_ids:
+        if user_id in users and new_seq - snapshot_seqs[user_id] >= SNAPSHOT_EVERY_EVENTS:
+            db.add(StateSnapshot(
+                user_id=user_id,
+                seq=new_seq,
+                state=capture_state(users[user_id], skills.get(user_id, []), pets.get(user_id))
+            ))
+
+    # Compare-and-set, so two workers never fold the same batch
+    advanced = db.execute(
+        update(ProjectionCheckpoint)
+        .where(ProjectionCheckpoint.name == PROJECTOR, ProjectionCheckpoint.last_seq == last_seq)
+        .values(last_seq=new_seq, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not advanced:
+        db.rollback()
+        return 0
+    db.commit()
+    return len(events)
+
+
+def current_state(db: Session, user: User, skill_ids) -> Tuple[Dict[int, UserSkill], Optional[AlienPet]]:
+    """
+    Load the user, skills and pet as of the whole log: the projected rows plus
+    this user's not-yet-projected events, folded in memory only. The caller
+    must roll back afterwards instead of committing these objects.
+    """
+    while True:
+        seq = checkpoint_seq(db)
+        db.refresh(user)
+        skills = {
+            skill.id: skill
+            for skill in db.query(UserSkill).filter(UserSkill.id.in_(skill_ids)).populate_existing()
+        }
+        pet = db.query(AlienPet).filter(AlienPet.user_id == user.id).populate_existing().first()
+        # The checkpoint only moves when a projection commits, so an unchanged
+        # value means the rows above were all read at `seq`
+        if checkpoint_seq(db) == seq:
+            break
+
+    pending = db.query(AnswerEvent).filter(
+        AnswerEvent.user_id == user.id,
+        AnswerEvent.id > seq
+    ).order_by(AnswerEvent.id).all()
+    for event in pending:
+        event_skill = skills.get(event.skill_id)
+        if event_skill is None:
+            event_skill = db.get(UserSkill, event.skill_id, populate_existing=True)
+            if event_skill is None:
+                continue
+            skills[event.skill_id] = event_skill
+        fold_answer(user, event_skill, pet, event.is_correct, event.xp_earned, event.answer_quality, at=event.occurred_at)
+    return skills, pet
+
+
+def replay_user(db: Session, user_id: int, from_snapshot: str = "earliest") -> Dict:
+    """
+    Rebuild a user's derived state from a snapshot plus every projected event after it.
+
+    "earliest" refolds the whole log (e.g. after changing fold_answer);
+    "latest" is the fast path for repairing a damaged row.
+    """
+    order = StateSnapshot.seq.asc() if from_snapshot == "earliest" else StateSnapshot.seq.desc()
+    snapshot = db.query(StateSnapshot).filter(StateSnapshot.user_id == user_id).order_by(order, StateSnapshot.id).first()
+    if snapshot is None:
+        return {"user_id": user_id, "events_replayed": 0, "from_seq": None}
+
+    users, skills, pets = _load_rows(db, [user_id])
+    user = users.get(user_id)
+    if user is None:
+        return {"user_id": user_id, "events_replayed": 0, "from_seq": None}
+    skills_by_id = {skill.id: skill for skill in skills.get(user_id, [])}
+    pet = pets.get(user_id)
+    restore_state(user, skills_by_id, pet, snapshot.state)
+
+    # Only events the projector has applied; later ones are still pending
+    through = _ensure_checkpoint(db)
+    events = db.query(AnswerEvent).filter(
+        AnswerEvent.user_id == user_id,
+        AnswerEvent.id > snapshot.seq,
+        AnswerEvent.id <= through
+    ).order_by(AnswerEvent.id).yield_per(1000)
+    replayed = 0
+    for event in events:
+        skill = skills_by_id.get(event.skill_id)
+        if skill is None:
+            continue
+        fold_answer(user, skill, pet, event.is_correct, event.xp_earned, event.answer_quality, at=event.occurred_at)
+        replayed += 1
+    db.commit()
+    return {"user_id": user_id, "events_replayed": replayed, "from_seq": snapshot.seq, "through_seq": through}
+
+
+def log_stats(db: Session) -> Dict:
+    last_seq = checkpoint_seq(db)
+    head = db.query(func.max(AnswerEvent.id)).scalar() or 0
+    return {
+        "enabled": EVENT_SOURCED_ANSWERS,
+        "head_seq": head,
+        "projected_seq": last_seq,
+        "lag_events": head - last_seq,
+        "snapshots": db.query(func.count(StateSnapshot.id)).scalar()
+    }
+
+
+def _project_all() -> int:
+    db = SessionLocal()
+    try:
+        total = 0
+        while True:
+            folded = project_pending(db)
+            total += folded
+            if folded < PROJECTOR_BATCH_SIZE:
+                return total
+    finally:
+        db.close()
+
+
+async def run_projector():
+    """Background loop started from the app lifespan when the event log is enabled"""
+    while True:
+        try:
+            await asyncio.to_thread(_project_all)
+        except Exception as e:
+            print(f"[WARNING] Answer projection failed: {e}")
+        await asyncio.sleep(PROJECTOR_INTERVAL_SECONDS)
@@ -0,0 +1,123 @@
+import os
+import random
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable, Dict, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.models.user import User
+from app.models.alien_pet import AlienPet
+
+# ------------------------------
+# Optimistic concurrency settings
+# ------------------------------
+# UserSkill and AlienPet carry a version column: a flush whose row changed
+# since it was read raises StaleDataError instead of overwriting it. Answers
+# only version-check the skill (its SM-2 schedule depends on its current
+# state); the users and alien_pets counters they touch are updated SQL-side.
+CAS_MAX_ATTEMPTS = int(os.getenv("CAS_MAX_ATTEMPTS", "20"))
+# Random pause before a retry, doubling per attempt up to the cap, so racing writers spread out
+CAS_BACKOFF_BASE_SECONDS = float(os.getenv("CAS_BACKOFF_BASE_SECONDS", "0.005"))
+CAS_BACKOFF_MAX_SECONDS = float(os.getenv("CAS_BACKOFF_MAX_SECONDS", "0.25"))
+
+T = TypeVar("T")
+
+
+async def retry_on_conflict(db: Session, write: Callable[[], T]) -> T:
+    """
+    Run write() until it commits without a version conflict. write() must
+    re-read what it changes: after a rollback every loaded row is expired,
+    so the next attempt starts from the current database state. The backoff
+    awaits, so the worker keeps serving other requests meanwhile.
+    """
+    for attempt in range(CAS_MAX_ATTEMPTS):
+        try:
+            return write()
+        except StaleDataError:
+            db.rollback()
+            await asyncio.sleep(random.uniform(0, min(CAS_BACKOFF_MAX_SECONDS, CAS_BACKOFF_BASE_SECONDS * 2 ** attempt)))
+    raise HTTPException(status_code=409, detail="Too many concurrent updates, please retry")
+
+
+# ------------------------------
+# SQL-side counters
+# ------------------------------
+def xp_increment(amount: int):
+    """users.total_xp + amount, evaluated by the database so concurrent answers all count"""
+    return func.coalesce(User.total_xp, 0) + amount
+
+
+def streak_after(at: datetime):
+    """
+    New users.streak_count for a practice at `at`, computed from the row's
+    current last_practice_date (same rule as fold_answer): practicing again
+    the same day keeps the streak, the next day extends it, later resets it.
+    """
+    today = datetime.combine(at.date(), datetime.min.time())
+    streak = func.coalesce(User.streak_count, 0)
+    return case(
+        (User.last_practice_date == None, 1),
+        (User.last_practice_date >= today, streak),
+        (User.last_practice_date >= today - timedelta(days=1), streak + 1),
+        else_=1
+    )
+
+
+def clamped(expr, low: float = 0.0, high: float = 100.0):
+    """expr limited to [low, high], evaluated by the database"""
+    return case((expr > high, high), (expr < low, low), else_=expr)
+
+
+def apply_pet_answer(db: Session, pet: AlienPet, is_correct: bool, xp_earned: int, skill_complexity: float, severe: bool, at: datetime) -> Dict:
+    """
+    Apply one answer to the pet (same rules as fold_answer) without a lost
+    update or a version conflict, however many answers race on the row.
+
+    The stat counters and experience change in one UPDATE of the form
+    x = MIN(100, x + delta), which also takes the row's write lock until
+    commit. The fields that follow from the new values (level-ups,
+    evolution, mood) are then computed from the re-read row, which nobody
+    else can change before this transaction ends. Must run with autoflush
+    off, so pending user and skill changes are not flushed early.
+    """
+    old_luminosity = pet.luminosity or 100.0
+    old_knowledge_hunger = pet.knowledge_hunger or 50.0
+    luminosity = func.coalesce(AlienPet.luminosity, 100.0)
+    if is_correct:
+        # feed_knowledge: every stat gains a share of the knowledge fed
+        knowledge_gain = 15 * skill_complexity
+        values = {
+            "luminosity": clamped(luminosity + 5.0 + knowledge_gain * 0.8),
+            "knowledge_hunger": clamped(func.coalesce(AlienPet.knowledge_hunger, 50.0) + knowledge_gain),
+            "energy": clamped(func.coalesce(AlienPet.energy, 100.0) + knowledge_gain * 0.5),
+            "cosmic_resonance": clamped(func.coalesce(AlienPet.cosmic_resonance, 50.0) + knowledge_gain * 0.3),
+            "experience": func.coalesce(AlienPet.experience, 0) + xp_earned,
+            "last_fed": at,
+        }
+        health_change = min(100.0, old_luminosity + 5.0) - old_luminosity
+    else:
+        penalty = 10.0 if severe else 2.0
+        values = {"luminosity": clamped(luminosity - penalty)}
+        health_change = max(0.0, old_luminosity - penalty) - old_luminosity
+
+    db.execute(
+        update(AlienPet)
+        .where(AlienPet.id == pet.id)
+        .values(**values, last_updated=at, version=AlienPet.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.refresh(pet)
+
+    # Locked now, so these writes flush without a conflict
+    pet.gain_experience(0)  # Level up on the experience just added
+    pet.update_mood()
+    pet.last_updated = at
+    return {
+        "pet_health_change": health_change,
+        "pet_luminosity_change": pet.luminosity - old_luminosity,
+        "pet_knowledge_hunger_change": (pet.knowledge_hunger or 50.0) - old_knowledge_hunger
+    }
@@ -0,0 +1,174 @@
+import os
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import literal, or_, and_, update, bindparam
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.skill import UserSkill
+from app.models.sweep_checkpoint import SweepCheckpoint
+from app.core.pubsub import publish_state_delta, wants_deltas
+from app.core.jobs import job_handler
+
+SWEEP_ENABLED = os.getenv("DECAY_SWEEPER_ENABLED", "true").lower() in ("1", "true", "yes")
+SWEEP_INTERVAL_SECONDS = int(os.getenv("DECAY_SWEEP_INTERVAL", "3600"))
+SWEEP_BATCH_SIZE = 1000
+SWEEP_CHECKPOINT = "urgency_tiers"
+
+# (min days idle, urgency, message, questions recommended) - most urgent first
+DECAY_TIERS = [
+    (180, "critical", "!! CRITICAL DECAY: Practice immediately!", 10),
+    (90, "high", "! HIGH DECAY: Significant knowledge loss.", 5),
+    (30, "medium", "~ MODERATE DECAY: Refresh concepts.", 3),
+    (7, "low", "- EARLY DECAY: Quick refresher recommended.", 2),
+]
+MAINTENANCE_TIER = (0, "maintenance", "* WELL MAINTAINED: Keep practicing.", 1)
+
+
+def tier_for_days_idle(days_idle: int) -> tuple:
+    for tier in DECAY_TIERS:
+        if days_idle >= tier[0]:
+            return tier
+    return MAINTENANCE_TIER
+
+
+def urgency_tier_filters(now: datetime = None) -> List[Tuple]:
+    """
+    (urgency, filter) per tier, most urgent first, matching tier_for_days_idle.
+
+    (now - last_practiced).days >= N  <=>  last_practiced <= now - N days,
+    so each tier is a range on last_practiced that the (user_id,
+    last_practiced) index can seek. Never-practiced skills are critical.
+    """
+    now = now or datetime.utcnow()
+    filters = []
+    newer_than = None
+    for min_days, urgency, _, _ in DECAY_TIERS:
+        cutoff = now - timedelta(days=min_days)
+        if newer_than is None:
+            filters.append((urgency, or_(UserSkill.last_practiced == None, UserSkill.last_practiced <= cutoff)))
+        else:
+            filters.append((urgency, and_(UserSkill.last_practiced > newer_than, UserSkill.last_practiced <= cutoff)))
+        newer_than = cutoff
+    filters.append((MAINTENANCE_TIER[1], UserSkill.last_practiced > newer_than))
+    return filters
+
+
+def idle_since_cutoff(urgency: str, now: datetime = None) -> datetime:
+    """Latest last_practiced value that still falls in the given tier or worse"""
+    now = now or datetime.utcnow()
+    min_days = next(tier[0] for tier in DECAY_TIERS if tier[1] == urgency)
+    return now - timedelta(days=min_days)
+
+
+# ------------------------------
+# Materialized urgency tier sweeper
+# ------------------------------
+# Compare-and-swap on the version column: a skill answered since it was read
+# already holds the right tier, so the sweep leaves it alone
+_skills = UserSkill.__table__
+TIER_UPDATE = update(_skills).where(
+    _skills.c.id == bindparam("skill_id"),
+    _skills.c.version == bindparam("read_version")
+).values(
+    urgency_tier=bindparam("urgency_tier"),
+    days_idle_snapshot=bindparam("days_idle_snapshot"),
+    version=_skills.c.version + 1
+)
+
+
+def sweep_urgency_tiers(db: Session, now: datetime = None) -> Dict:
+    """
+    Refresh user_skills.urgency_tier / days_idle_snapshot incrementally.
+
+    A skill only changes tier when now - last_practiced crosses a tier
+    boundary, i.e. when last_practiced falls in (previous run - N days,
+    now - N days] for some boundary N. Only those rows (plus rows with no
+    tier yet) are read and rewritten. Practicing a skill resets its tier on
+    the write path (UserSkill.calculate_next_review), so the sweep never
+    has to look at recently practiced rows.
+    """
+    now = now or datetime.utcnow()
+    checkpoint = db.get(SweepCheckpoint, SWEEP_CHECKPOINT)
+
+    if checkpoint is None:
+        # First run - evaluate every row once
+        needs_update = literal(True)
+    else:
+        since = checkpoint.last_run_at
+        crossings = [
+            and_(
+                UserSkill.last_practiced > since - timedelta(days=min_days),
+                UserSkill.last_practiced <= now - timedelta(days=min_days)
+            )
+            for min_days, _, _, _ in DECAY_TIERS
+        ]
+        needs_update = or_(UserSkill.urgency_tier == None, *crossings)
+
+    updated = 0
+    last_id = 0
+    deltas = []
+    while True:
+        rows = db.query(UserSkill.id, UserSkill.user_id, UserSkill.last_practiced, UserSkill.version).filter(
+            needs_update, UserSkill.id > last_id
+        ).order_by(UserSkill.id).limit(SWEEP_BATCH_SIZE).all()
+        if not rows:
+            break
+
+        for row in rows:
+            days_idle = 999 if row.last_practiced is None else (now - row.last_practiced).days
+            urgency = tier_for_days_idle(days_idle)[1]
+            # One statement per row, since an executemany rowcount can't say
+            # which rows lost the compare-and-swap. Those are neither counted
+            # nor pushed: the client already has their fresher tier.
+            result = db.execute(TIER_UPDATE, {
+                "skill_id": row.id,
+                "read_version": row.version,
+                "urgency_tier": urgency,
+                "days_idle_snapshot": days_idle
+            })
+            if result.rowcount != 1:
+                continue
+            updated += 1
+            # Core updates skip the ORM flush hooks, so queue push events by hand
+            if wants_deltas(row.user_id):
+                deltas.append((row.user_id, {"type": "skill_tier", "skill_id": row.id, "urgency_tier": urgency}))
+        last_id = rows[-1].id
+
+    if checkpoint is None:
+        db.add(SweepCheckpoint(name=SWEEP_CHECKPOINT, last_run_at=now))
+    else:
+        checkpoint.last_run_at = now
+    db.commit()
+
+    for user_id, delta in deltas:
+        publish_state_delta(user_id, delta)
+
+    return {"rows_updated": updated, "swept_at": now}
+
+
+@job_handler("decay_sweep")
+def decay_sweep_job(db: Session, payload: Dict) -> Dict:
+    result = sweep_urgency_tiers(db)
+    return {"rows_updated": result["rows_updated"], "swept_at": result["swept_at"].isoformat()}
+
+
+def _sweep_once() -> Dict:
+    db = SessionLocal()
+    try:
+        return sweep_urgency_tiers(db)
+    finally:
+        db.close()
+
+
+async def run_decay_sweeper():
+    """Inline background loop, used when the job worker pool is disabled"""
+    while True:
+        try:
+            result = await asyncio.to_thread(_sweep_once)
+            print(f"[DecaySweeper] Updated {result['rows_updated']} urgency tiers")
+        except Exception as e:
+            print(f"[WARNING] Decay sweep failed: {e}")
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
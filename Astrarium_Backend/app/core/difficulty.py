@@ -0,0 +1,388 @@
+import os
+import math
+import bisect
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select, update, func, case
+from sqlalchemy.orm import Session
+
+from app.database import upsert
+from app.models.question import Question, UserAnswer
+from app.models.question_stats import QuestionStats, QuestionTimeBucket
+from app.core.invalidation import on_invalidation, publish_invalidation
+from app.core.jobs import job_handler
+
+# ------------------------------
+# Calibration settings
+# ------------------------------
+# Success probability adaptive selection aims for: hard enough to stretch, easy enough to stick
+TARGET_SUCCESS = float(os.getenv("ADAPTIVE_TARGET_SUCCESS", "0.7"))
+# Questions answered more recently than this are skipped, so adaptive picks don't repeat
+REPEAT_COOLDOWN_MINUTES = int(os.getenv("ADAPTIVE_REPEAT_COOLDOWN_MINUTES", "30"))
+
+# Pseudo-answers behind each prior: how many real answers it takes to outweigh the guess
+QUESTION_PRIOR_WEIGHT = 3.0
+SKILL_PRIOR_WEIGHT = 5.0
+SKILL_PRIOR_SUCCESS = 0.7
+# Log-odds shift the generator's difficulty label gives a question relative to the user's skill level
+LABEL_LOGIT_OFFSETS = {"easy": 0.8, "medium": 0.0, "hard": -0.8}
+
+# Upper bounds (seconds) of the answer-time histogram buckets; one more open-ended bucket follows
+TIME_BUCKET_BOUNDS = [2, 4, 6, 8, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600]
+
+
+def _logit(p: float) -> float:
+    p = min(max(p, 1e-6), 1 - 1e-6)
+    return math.log(p / (1 - p))
+
+
+def _sigmoid(x: float) -> float:
+    return 1 / (1 + math.exp(-x))
+
+
+def time_bucket(seconds: float) -> int:
+    """Bucket i holds times in [TIME_BUCKET_BOUNDS[i - 1], TIME_BUCKET_BOUNDS[i])"""
+    return bisect.bisect_right(TIME_BUCKET_BOUNDS, max(0.0, seconds))
+
+
+def histogram_median(counts: Dict[int, int]) -> Optional[float]:
+    """Median answer time, interpolated linearly inside the bucket that holds it"""
+    total = sum(counts.values())
+    if not total:
+        return None
+    half = total / 2
+    seen = 0
+    for bucket in sorted(counts):
+        count = counts[bucket]
+        if count and seen + count >= half:
+            low = TIME_BUCKET_BOUNDS[bucket - 1] if bucket > 0 else 0
+            high = TIME_BUCKET_BOUNDS[bucket] if bucket < len(TIME_BUCKET_BOUNDS) else low * 2
+            return round(low + (high - low) * (half - seen) / count, 1)
+        seen += count
+    return None
+
+
+def skill_success(attempts: int, correct: int) -> float:
+    """The user's smoothed success rate across every question of a skill"""
+    return (correct + SKILL_PRIOR_WEIGHT * SKILL_PRIOR_SUCCESS) / (attempts + SKILL_PRIOR_WEIGHT)
+
+
+def predicted_success(attempts: int, correct: int, difficulty: Optional[str], skill_p: float) -> float:
+    """
+    Chance the user answers this question correctly: its own correct rate,
+    shrunk toward the skill-level rate shifted by the generator's label, so an
+    unanswered question starts from its label and converges to its record.
+    """
+    prior = _sigmoid(_logit(skill_p) + LABEL_LOGIT_OFFSETS.get(difficulty, 0.0))
+    return (correct + QUESTION_PRIOR_WEIGHT * prior) / (attempts + QUESTION_PRIOR_WEIGHT)
+
+
+# ------------------------------
+# Incremental statistics
+# ------------------------------
+def record_answer_stats(connection, answers: List[UserAnswer]) -> Dict[int, Optional[float]]:
+    """
+    Fold new answers into question_stats and question_time_buckets with
+    SQL-side increments (concurrent writers never overwrite each other), then
+    refresh the median of every question that got a timed answer. Returns
+    those medians by question id.
+    """
+    totals: Dict[int, List] = {}  # question_id -> [attempts, correct, timed, last answered]
+    bucket_counts: Dict[Tuple[int, int], int] = {}
+    for answer in answers:
+        at = answer.answered_at or datetime.utcnow()
+        entry = totals.setdefault(answer.question_id, [0, 0, 0, at])
+        entry[0] += 1
+        entry[1] += 1 if answer.is_correct else 0
+        entry[3] = max(entry[3], at)
+        if answer.time_taken_seconds is not None:
+            entry[2] += 1
+            key = (answer.question_id, time_bucket(answer.time_taken_seconds))
+            bucket_counts[key] = bucket_counts.get(key, 0) + 1
+
+    stats = QuestionStats.__table__
+    for question_id, (attempts, correct, timed, last_at) in totals.items():
+        stmt = upsert(connection, stats).values(
+            question_id=question_id, attempts=attempts, correct=correct,
+            timed_attempts=timed, last_answered_at=last_at
+        )
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[stats.c.question_id],
+            set_={
+                "attempts": stats.c.attempts + attempts,
+                "correct": stats.c.correct + correct,
+                "timed_attempts": stats.c.timed_attempts + timed,
+                "last_answered_at": last_at
+            }
+        ))
+
+    buckets = QuestionTimeBucket.__table__
+    for (question_id, bucket), count in bucket_counts.items():
+        stmt = upsert(connection, buckets).values(question_id=question_id, bucket=bucket, count=count)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[buckets.c.question_id, buckets.c.bucket],
+            set_={"count": buckets.c.count + count}
+        ))
+
+    medians: Dict[int, Optional[float]] = {}
+    timed_ids = {question_id for question_id, _ in bucket_counts}
+    if timed_ids:
+        histograms: Dict[int, Dict[int, int]] = {}
+        rows = connection.execute(
+            select(buckets.c.question_id, buckets.c.bucket, buckets.c.count).where(buckets.c.question_id.in_(timed_ids))
+        )
+        for question_id, bucket, count in rows:
+            histograms.setdefault(question_id, {})[bucket] = count
+        for question_id, histogram in histograms.items():
+            medians[question_id] = histogram_median(histogram)
+            connection.execute(
+                update(stats).where(stats.c.question_id == question_id).values(median_time_seconds=medians[question_id])
+            )
+    return medians
+
+
+@event.listens_for(Session, "after_flush")
+def _track_new_answers(session, flush_context):
+    # new still holds the objects just inserted here
+    answers = [obj for obj in session.new if isinstance(obj, UserAnswer)]
+    questions = [obj for obj in session.new if isinstance(obj, Question)]
+    if not answers and not questions:
+        return
+    pending: List = session.info.setdefault("difficulty_updates", [])
+    if answers:
+        medians = record_answer_stats(session.connection(), answers)
+        pending.extend(
+            ("answer", answer.question_id, answer.is_correct, answer.answered_at or datetime.utcnow(), medians.get(answer.question_id))
+            for answer in answers
+        )
+    pending.extend(("question", question.id, question.skill_id, question.difficulty, None) for question in questions)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_answers(session):
+    updates = session.info.pop("difficulty_updates", None)
+    if updates:
+        difficulty_index.apply(updates)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_answers(session):
+    session.info.pop("difficulty_updates", None)
+
+
+# ------------------------------
+# Difficulty index
+# ------------------------------
+class _SkillLadder:
+    """One skill's questions with their running counts, ordered by predicted success on demand"""
+
+    def __init__(self):
+        # question_id -> [attempts, correct, difficulty label, last answered, median seconds]
+        self.entries: Dict[int, List] = {}
+        self.skill_p = SKILL_PRIOR_SUCCESS
+        self._order: Optional[List[Tuple[float, int]]] = None
+
+    def add(self, question_id: int, attempts: int, correct: int, difficulty: Optional[str], last_answered_at, median):
+        self.entries[question_id] = [attempts, correct, difficulty, last_answered_at, median]
+        self._order = None
+
+    def record(self, question_id: int, is_correct: bool, at: datetime, median: Optional[float]):
+        entry = self.entries.get(question_id)
+        if entry is None:
+            return
+        entry[0] += 1
+        entry[1] += 1 if is_correct else 0
+        entry[3] = at
+        if median is not None:
+            entry[4] = median
+        # Every question's prior moves with the skill-level rate, so re-rank them all
+        self._order = None
+
+    def order(self) -> List[Tuple[float, int]]:
+        """(predicted success, question_id), ascending"""
+        if self._order is None:
+            attempts = sum(entry[0] for entry in self.entries.values())
+            correct = sum(entry[1] for entry in self.entries.values())
+            self.skill_p = skill_success(attempts, correct)
+            self._order = sorted(
+                (predicted_success(entry[0], entry[1], entry[2], self.skill_p), question_id)
+                for question_id, entry in self.entries.items()
+            )
+        return self._order
+
+    def nearest(self, target: float, not_after: datetime, exclude=()) -> Optional[Tuple[int, float]]:
+        """The question whose predicted success is closest to target, skipping recent and excluded ones"""
+        order = self.order()
+        above = bisect.bisect_left(order, (target, -1))
+        below = above - 1
+        while below >= 0 or above < len(order):
+            if above < len(order) and (below < 0 or order[above][0] - target <= target - order[below][0]):
+                success, question_id = order[above]
+                above += 1
+            else:
+                success, question_id = order[below]
+                below -= 1
+            last_answered_at = self.entries[question_id][3]
+            if question_id in exclude or (last_answered_at and last_answered_at > not_after):
+                continue
+            return question_id, success
+        return None
+
+
+class DifficultyIndex:
+    """
+    Calibrated difficulty of stored questions, scoped per skill.
+
+    Each skill's ladder is loaded lazily from questions + question_stats the
+    first time it is queried, then kept current from committed answers and
+    new questions, so adaptive selection is a bisect instead of a query.
+    """
+
+    def __init__(self):
+        self._ladders: Dict[int, _SkillLadder] = {}
+        self._skill_of: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, skill_id: int) -> _SkillLadder:
+        ladder = self._ladders.get(skill_id)
+        if ladder is not None:
+            return ladder
+
+        rows = db.query(
+            Question.id, Question.difficulty, QuestionStats.attempts, QuestionStats.correct,
+            QuestionStats.last_answered_at, QuestionStats.median_time_seconds
+        ).outerjoin(
+            QuestionStats, QuestionStats.question_id == Question.id
+        ).filter(Question.skill_id == skill_id).all()
+
+        ladder = _SkillLadder()
+        for question_id, difficulty, attempts, correct, last_answered_at, median in rows:
+            ladder.add(question_id, attempts or 0, correct or 0, difficulty, last_answered_at, median)
+
+        with self._lock:
+            for question_id in ladder.entries:
+                self._skill_of[question_id] = skill_id
+            return self._ladders.setdefault(skill_id, ladder)
+
+    def select(self, db: Session, skill_id: int, target: float = TARGET_SUCCESS, exclude=()) -> Optional[Tuple[int, float]]:
+        """(question_id, predicted success) of the stored question nearest the target, or None"""
+        ladder = self._load(db, skill_id)
+        not_after = datetime.utcnow() - timedelta(minutes=REPEAT_COOLDOWN_MINUTES)
+        with self._lock:
+            return ladder.nearest(target, not_after, exclude)
+
+    def ladder_entry(self, question_id: int) -> Optional[Dict]:
+        """Running counts of one loaded question"""
+        with self._lock:
+            ladder = self._ladders.get(self._skill_of.get(question_id))
+            entry = ladder.entries.get(question_id) if ladder else None
+            return {"attempts": entry[0], "correct": entry[1]} if entry else None
+
+    def ladder(self, db: Session, skill_id: int) -> Dict:
+        """Every question of a skill with its stats and predicted success, easiest first"""
+        ladder = self._load(db, skill_id)
+        with self._lock:
+            order = ladder.order()
+            questions = []
+            for success, question_id in reversed(order):
+                attempts, correct, difficulty, last_answered_at, median = ladder.entries[question_id]
+                questions.append({
+                    "question_id": question_id,
+                    "label": difficulty,
+                    "attempts": attempts,
+                    "correct_rate": round(correct / attempts, 3) if attempts else None,
+                    "median_time_seconds": median,
+                    "predicted_success": round(success, 3),
+                    "last_answered_at": last_answered_at
+                })
+            return {"skill_id": skill_id, "skill_success": round(ladder.skill_p, 3), "questions": questions}
+
+    def apply(self, updates: List):
+        """Fold committed answers and new questions into the loaded ladders"""
+        touched = set()
+        with self._lock:
+            for kind, question_id, a, b, median in updates:
+                if kind == "question":
+                    skill_id, difficulty = a, b
+                    ladder = self._ladders.get(skill_id)
+                    if ladder is not None:
+                        ladder.add(question_id, 0, 0, difficulty, None, None)
+                        self._skill_of[question_id] = skill_id
+                else:
+                    skill_id = self._skill_of.get(question_id)
+                    ladder = self._ladders.get(skill_id) if skill_id is not None else None
+                    if ladder is not None:
+                        ladder.record(question_id, a, b, median)
+                if skill_id is not None:
+                    touched.add(skill_id)
+        # Other workers reload the ladder on next use
+        for skill_id in touched:
+            publish_invalidation("question_difficulty", str(skill_id))
+
+    def drop_local(self, skill_id: Optional[int] = None):
+        """Drop one ladder, or every ladder, from this worker only"""
+        with self._lock:
+            if skill_id is None:
+                self._ladders = {}
+                self._skill_of = {}
+            else:
+                ladder = self._ladders.pop(skill_id, None)
+                for question_id in (ladder.entries if ladder else ()):
+                    self._skill_of.pop(question_id, None)
+
+    def rebuild_stats(self, db: Session) -> Dict:
+        """Recompute question_stats and question_time_buckets from every stored answer"""
+        db.query(QuestionTimeBucket).delete()
+        db.query(QuestionStats).delete()
+
+        totals = db.query(
+            UserAnswer.question_id,
+            func.count(UserAnswer.id),
+            func.sum(case((UserAnswer.is_correct == True, 1), else_=0)),
+            func.count(UserAnswer.time_taken_seconds),
+            func.max(UserAnswer.answered_at)
+        ).group_by(UserAnswer.question_id).all()
+        db.bulk_insert_mappings(QuestionStats, [
+            {"question_id": question_id, "attempts": attempts, "correct": correct or 0,
+             "timed_attempts": timed, "last_answered_at": last_at}
+            for question_id, attempts, correct, timed, last_at in totals
+        ])
+
+        histograms: Dict[int, Dict[int, int]] = {}
+        timed = db.query(UserAnswer.question_id, UserAnswer.time_taken_seconds).filter(
+            UserAnswer.time_taken_seconds != None
+        ).yield_per(1000)
+        for question_id, seconds in timed:
+            histogram = histograms.setdefault(question_id, {})
+            bucket = time_bucket(seconds)
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+        db.bulk_insert_mappings(QuestionTimeBucket, [
+            {"question_id": question_id, "bucket": bucket, "count": count}
+            for question_id, histogram in histograms.items()
+            for bucket, count in histogram.items()
+        ])
+        db.bulk_update_mappings(QuestionStats, [
+            {"question_id": question_id, "median_time_seconds": histogram_median(histogram)}
+            for question_id, histogram in histograms.items()
+        ])
+        db.commit()
+
+        self.drop_local()
+        publish_invalidation("question_difficulty", "*")
+        return {"questions_with_answers": len(totals), "questions_timed": len(histograms)}
+
+
+# Shared process-wide index
+difficulty_index = DifficultyIndex()
+
+
+@on_invalidation("question_difficulty")
+def _drop_remote_ladder(key, payload, seq, created):
+    difficulty_index.drop_local(None if key == "*" else int(key))
+
+
+@job_handler("question_stats_rebuild")
+def rebuild_question_stats_job(db: Session, payload: Dict) -> Dict:
+    return difficulty_index.rebuild_stats(db)
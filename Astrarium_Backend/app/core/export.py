@@ -0,0 +1,160 @@
+import io
+import os
+import csv
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import ReadSessionLocal
+# Relationship targets of the exported models, so their mappers configure outside the app
+from app.models.user import User  # noqa: F401
+from app.models.alien_pet import AlienPet  # noqa: F401
+from app.models.skill import UserSkill, PracticeSession
+from app.models.question import Question, UserAnswer
+from app.core.serialization import orjson
+
+# ------------------------------
+# Export settings
+# ------------------------------
+# Rows fetched per round trip; memory use is bounded by one chunk regardless of history size
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+# zlib level for the gzip stream: 1 is fastest, 9 smallest
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+
+# ------------------------------
+# Exported tables
+# ------------------------------
+def _answers_query(user_id: Optional[int]):
+    stmt = select(
+        UserAnswer.id.label("answer_id"), UserAnswer.user_id, Question.skill_id, UserAnswer.question_id,
+        Question.difficulty, UserAnswer.user_answer, UserAnswer.is_correct,
+        UserAnswer.time_taken_seconds, UserAnswer.answered_at
+    ).join(Question, Question.id == UserAnswer.question_id)
+    if user_id is not None:
+        stmt = stmt.where(UserAnswer.user_id == user_id)
+    return stmt.order_by(UserAnswer.id)
+
+
+def _sessions_query(user_id: Optional[int]):
+    stmt = select(
+        PracticeSession.id.label("session_id"), UserSkill.user_id, PracticeSession.skill_id,
+        PracticeSession.session_date, PracticeSession.questions_answered, PracticeSession.correct_answers,
+        PracticeSession.duration_minutes, PracticeSession.xp_earned
+    ).join(UserSkill, UserSkill.id == PracticeSession.skill_id)
+    if user_id is not None:
+        stmt = stmt.where(UserSkill.user_id == user_id)
+    return stmt.order_by(PracticeSession.id)
+
+
+def _skills_query(user_id: Optional[int]):
+    stmt = select(
+        UserSkill.id.label("skill_id"), UserSkill.user_id, UserSkill.skill_name, UserSkill.category,
+        UserSkill.proficiency_level, UserSkill.health_score, UserSkill.star_power, UserSkill.last_practiced,
+        UserSkill.next_review_date, UserSkill.review_interval_days, UserSkill.ease_factor,
+        UserSkill.consecutive_correct, UserSkill.urgency_tier, UserSkill.created_at
+    )
+    if user_id is not None:
+        stmt = stmt.where(UserSkill.user_id == user_id)
+    return stmt.order_by(UserSkill.id)
+
+
+EXPORT_TABLES = {
+    "answers": _answers_query,
+    "sessions": _sessions_query,
+    "skills": _skills_query,
+}
+
+
+def parse_tables(tables: str, fmt: str) -> List[str]:
+    """Validate a comma-separated table list for the format (CSV has one header, so one table)"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    names = [name.strip() for name in tables.split(",") if name.strip()]
+    unknown = [name for name in names if name not in EXPORT_TABLES]
+    if not names or unknown:
+        raise ValueError(f"tables must be a comma-separated list of: {', '.join(EXPORT_TABLES)}")
+    if fmt == "csv" and len(names) != 1:
+        raise ValueError("CSV exports one table at a time")
+    return names
+
+
+# ------------------------------
+# Streaming
+# ------------------------------
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ndjson_chunk(table: str, keys: List[str], rows) -> bytes:
+    if orjson is not None:
+        return b"".join(
+            orjson.dumps({"table": table, **dict(zip(keys, row))}) + b"\n" for row in rows
+        )
+    return "".join(
+        json.dumps({"table": table, **{key: _plain(value) for key, value in zip(keys, row)}}) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _header(keys: List[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(keys)
+    return buffer.getvalue().encode("utf-8")
+
+
+def iter_export(db: Session, user_id: Optional[int], tables: List[str], fmt: str = "ndjson") -> Iterator[bytes]:
+    """
+    Uncompressed export, one encoded chunk per fetch. Rows come through a
+    server-side cursor (stream_results) EXPORT_CHUNK_ROWS at a time, so only
+    one chunk is ever held in memory. user_id=None exports every user.
+    """
+    for table in tables:
+        stmt = EXPORT_TABLES[table](user_id).execution_options(yield_per=EXPORT_CHUNK_ROWS)
+        result = db.execute(stmt)
+        keys = list(result.keys())
+        if fmt == "csv":
+            yield _header(keys)
+        for rows in result.partitions():
+            yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(table, keys, rows)
+        result.close()
+
+
+def gzip_stream(chunks: Iterator[bytes], level: int = EXPORT_GZIP_LEVEL) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member as it goes"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(user_id: Optional[int], tables: List[str], fmt: str = "ndjson", compress: bool = True) -> Iterator[bytes]:
+    """
+    Export on its own read-only session, which lives as long as the stream
+    (a response body outlasts request-scoped dependencies).
+    """
+    db = ReadSessionLocal()
+    try:
+        chunks = iter_export(db, user_id, tables, fmt)
+        yield from gzip_stream(chunks) if compress else chunks
+    finally:
+        db.close()
+
+
+def export_filename(user_id: Optional[int], tables: List[str], fmt: str, compress: bool) -> str:
+    scope = f"user-{user_id}" if user_id is not None else "all-users"
+    name = f"astrarium-{scope}-{'-'.join(tables)}-{datetime.utcnow():%Y%m%d}.{fmt}"
+    return name + ".gz" if compress else name
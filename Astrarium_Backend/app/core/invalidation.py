@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional
+
+# ------------------------------
+# Multi-worker settings
+# ------------------------------
+MULTI_WORKER = os.getenv("ASTRARIUM_MULTI_WORKER", "false").lower() in ("1", "true", "yes")
+BUS_PATH = os.getenv("INVALIDATION_BUS_PATH", "./astrarium_bus.db")
+POLL_SECONDS = float(os.getenv("INVALIDATION_POLL_SECONDS", "0.2"))
+RETENTION_SECONDS = float(os.getenv("INVALIDATION_RETENTION_SECONDS", "3600"))
+
+Handler = Callable[[str, Optional[Dict], int, float], None]
+_handlers: Dict[str, List[Handler]] = {}
+
+
+def on_invalidation(kind: str):
+    """Register a handler for invalidations of `kind` published by other workers"""
+    def register(handler: Handler) -> Handler:
+        _handlers.setdefault(kind, []).append(handler)
+        return handler
+    return register
+
+
+class InvalidationBus:
+    """
+    Cross-process change log in a SQLite file shared by every worker on the host.
+
+    publish() appends (kind, key, payload) and returns its global sequence
+    number. A background thread in each worker tails the log and dispatches
+    entries written by other workers to the registered handlers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._thread = None
+        # Requests can catch up on the log too, so dispatch is serialized with the poller
+        self._poll_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, key TEXT NOT NULL, "
+            "payload TEXT, origin TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO meta (k, v) VALUES ('bus_id', ?)", (uuid.uuid4().hex[:8],))
+        self.bus_id = conn.execute("SELECT v FROM meta WHERE k = 'bus_id'").fetchone()[0]
+        self.last_seq = self.max_seq()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def max_seq(self) -> int:
+        # sqlite_sequence survives pruning, so sequence numbers never go backwards
+        row = self._connection().execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'changes'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def publish(self, kind: str, key: str, payload: Optional[Dict] = None) -> int:
+        cursor = self._connection().execute(
+            "INSERT INTO changes (kind, key, payload, origin, created) VALUES (?, ?, ?, ?, ?)",
+            (kind, key, json.dumps(payload, default=str) if payload is not None else None, self.origin, time.time())
+        )
+        return cursor.lastrowid
+
+    def poll_once(self) -> int:
+        with self._poll_lock:
+            rows = self._connection().execute(
+                "SELECT seq, kind, key, payload, origin, created FROM changes WHERE seq > ? ORDER BY seq LIMIT 1000",
+                (self.last_seq,)
+            ).fetchall()
+            for seq, kind, key, payload, origin, created in rows:
+                self.last_seq = seq
+                if origin == self.origin:
+                    continue
+                for handler in _handlers.get(kind, ()):
+                    try:
+                        handler(key, json.loads(payload) if payload else None, seq, created)
+                    except Exception as e:
+                        print(f"[WARNING] Invalidation handler for {kind} failed: {e}")
+            return len(rows)
+
+    def catch_up(self) -> int:
+        """
+        Apply everything already in the log without waiting for the next poll.
+        A write another worker acknowledged is in the log by then, so callers
+        that must not act on stale state (a 304) see it. Returns entries read.
+        """
+        applied = 0
+        while self.max_seq() > self.last_seq:
+            read = self.poll_once()
+            if not read:
+                break  # The rest was pruned
+            applied += read
+        return applied
+
+    def prune(self):
+        self._connection().execute("DELETE FROM changes WHERE created < ?", (time.time() - RETENTION_SECONDS,))
+
+    def _run(self):
+        last_prune = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                # Drain backlog without sleeping, then wait for the next tick
+                if self.poll_once() < 1000:
+                    self._stop.wait(POLL_SECONDS)
+                if time.monotonic() - last_prune > 60:
+                    self.prune()
+                    last_prune = time.monotonic()
+            except Exception as e:
+                print(f"[WARNING] Invalidation bus poll failed: {e}")
+                self._stop.wait(1.0)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="invalidation-bus", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+
+bus: Optional[InvalidationBus] = InvalidationBus(BUS_PATH) if MULTI_WORKER else None
+
+
+def publish_invalidation(kind: str, key: str, payload: Optional[Dict] = None) -> Optional[int]:
+    """Tell other workers that `kind`/`key` changed. Returns the sequence number, or None in single-worker mode."""
+    if bus is None:
+        return None
+    try:
+        return bus.publish(kind, key, payload)
+    except Exception as e:
+        print(f"[WARNING] Failed to publish invalidation {kind}:{key}: {e}")
+        return None
@@ -0,0 +1,351 @@
+import os
+import time
+import random
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, func, or_, and_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.job import BackgroundJob
+
+# ------------------------------
+# Job queue settings
+# ------------------------------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # 0 disables the in-process pool
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE_SECONDS = float(os.getenv("JOB_BACKOFF_BASE_SECONDS", "5"))
+JOB_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "600"))
+# A running job whose worker died is handed out again after this long, so it
+# must exceed the longest job (an overrunning job is re-run; only the newest
+# run records the outcome)
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "900"))
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+# Handlers take (db, payload) and may return a JSON-able result. Jobs run at
+# least once, so handlers must tolerate being re-run after a crash.
+JobHandler = Callable[[Session, Dict], Optional[Dict]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str):
+    """Register the function that runs jobs of `kind`"""
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+# ------------------------------
+# Enqueue
+# ------------------------------
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[Dict] = None,
+    key: Optional[str] = None,
+    delay_seconds: float = 0,
+    max_attempts: int = JOB_MAX_ATTEMPTS
+) -> BackgroundJob:
+    """
+    Add a job to the caller's transaction; it becomes visible to workers on commit.
+
+    A job with the same `key` is only ever enqueued once - later calls return
+    the existing job whatever its status.
+    """
+    if key is not None:
+        existing = db.query(BackgroundJob).filter(BackgroundJob.key == key).first()
+        if existing:
+            return existing
+
+    now = datetime.utcnow()
+    job = BackgroundJob(
+        kind=kind,
+        key=key,
+        payload=payload,
+        status="pending",
+        attempts=0,
+        max_attempts=max_attempts,
+        run_after=now + timedelta(seconds=delay_seconds),
+        created_at=now
+    )
+    try:
+        with db.begin_nested():
+            db.add(job)
+    except IntegrityError:
+        # Another request enqueued the same key between our check and insert
+        return db.query(BackgroundJob).filter(BackgroundJob.key == key).one()
+
+    db.info["jobs_enqueued"] = True
+    return job
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session):
+    if session.info.pop("jobs_enqueued", False):
+        job_pool.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued(session):
+    session.info.pop("jobs_enqueued", None)
+
+
+# ------------------------------
+# Claim and run
+# ------------------------------
+def _lease_expired(now: datetime):
+    return and_(
+        BackgroundJob.status == "running",
+        BackgroundJob.started_at < now - timedelta(seconds=JOB_LEASE_SECONDS)
+    )
+
+
+def _runnable(now: datetime):
+    return or_(
+        and_(BackgroundJob.status == "pending", BackgroundJob.run_after <= now),
+        and_(_lease_expired(now), BackgroundJob.attempts < BackgroundJob.max_attempts)
+    )
+
+
+def _fail_exhausted(db: Session, now: datetime):
+    """A job whose lease ran out on its final attempt is failed instead of run again"""
+    exhausted = and_(_lease_expired(now), BackgroundJob.attempts >= BackgroundJob.max_attempts)
+    # Read first, so the usual case takes no write lock
+    if db.query(BackgroundJob.id).filter(exhausted).first() is None:
+        return
+    db.execute(
+        update(BackgroundJob)
+        .where(exhausted)
+        .values(
+            status="failed",
+            finished_at=now,
+            last_error="Lease expired on the final attempt (worker died or the job outran JOB_LEASE_SECONDS)"
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _claim(db: Session, worker: str) -> Optional[BackgroundJob]:
+    """Take the oldest runnable job. The conditional UPDATE makes claims safe across workers and processes."""
+    now = datetime.utcnow()
+    _fail_exhausted(db, now)
+    candidates = db.query(BackgroundJob.id).filter(_runnable(now)).order_by(
+        BackgroundJob.run_after, BackgroundJob.id
+    ).limit(8).all()
+
+    for (job_id,) in candidates:
+        claimed = db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id, _runnable(now))
+            .values(
+                status="running",
+                started_at=now,
+                locked_by=worker,
+                attempts=BackgroundJob.attempts + 1
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(BackgroundJob, job_id)
+    return None
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter after the given number of failed attempts"""
+    delay = min(JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run_next_job(worker: str = "inline") -> bool:
+    """Claim and run one job. Returns False when nothing was runnable."""
+    db = SessionLocal()
+    try:
+        job = _claim(db, worker)
+        if job is None:
+            return False
+
+        job_id, kind, attempt, max_attempts = job.id, job.kind, job.attempts, job.max_attempts
+        # Every claim bumps attempts, so (worker, attempts) identifies this lease.
+        # If it expired and the job was reclaimed, the newer run owns the outcome.
+        finish = update(BackgroundJob).where(
+            BackgroundJob.id == job_id,
+            BackgroundJob.status == "running",
+            BackgroundJob.locked_by == worker,
+            BackgroundJob.attempts == attempt
+        ).execution_options(synchronize_session=False)
+
+        handler = JOB_HANDLERS.get(kind)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind '{kind}'")
+            result = handler(db, job.payload or {})
+            db.commit()
+            outcome = finish.values(status="succeeded", result=result, last_error=None, finished_at=datetime.utcnow())
+        except Exception as e:
+            db.rollback()
+            last_error = f"{type(e).__name__}: {e}"
+            if attempt >= max_attempts:
+                outcome = finish.values(status="failed", last_error=last_error, finished_at=datetime.utcnow())
+                print(f"[WARNING] Job {job_id} ({kind}) failed permanently: {last_error}")
+            else:
+                run_after = datetime.utcnow() + timedelta(seconds=backoff_seconds(attempt))
+                outcome = finish.values(status="pending", locked_by=None, last_error=last_error, run_after=run_after)
+                print(f"[WARNING] Job {job_id} ({kind}) failed, retrying at {run_after}: {last_error}")
+        if db.execute(outcome).rowcount == 0:
+            print(f"[WARNING] Job {job_id} ({kind}) outran its lease and was reclaimed; leaving its status to the newer run")
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def drain(max_jobs: int = 1000) -> int:
+    """Run runnable jobs inline until the queue is empty (scripts and tests)"""
+    ran = 0
+    while ran < max_jobs and run_next_job():
+        ran += 1
+    return ran
+
+
+# ------------------------------
+# Worker pool
+# ------------------------------
+class JobWorkerPool:
+    """Asyncio workers that run jobs in threads, woken by commits or the poll interval"""
+
+    def __init__(self, concurrency: int = JOB_WORKERS):
+        self.concurrency = concurrency
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        for i in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._worker(f"{os.getpid()}-{i}")))
+
+    async def _worker(self, name: str):
+        while True:
+            # Cleared before polling so a commit during the poll still wakes us
+            self._wake.clear()
+            try:
+                ran = await asyncio.to_thread(run_next_job, name)
+            except Exception as e:
+                print(f"[WARNING] Job worker {name} error: {e}")
+                ran = False
+            if not ran:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    def notify(self):
+        """Safe to call from any thread"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._loop = None
+
+
+job_pool = JobWorkerPool()
+
+
+def _enqueue_periodic(kind: str, interval_seconds: int):
+    # Keyed by time bucket, so every worker process enqueues the same job once
+    bucket = int(time.time() // interval_seconds)
+    db = SessionLocal()
+    try:
+        enqueue(db, kind, key=f"{kind}:{bucket}")
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_periodic(kind: str, interval_seconds: int):
+    """Enqueue `kind` once per interval (started from the app lifespan)"""
+    while True:
+        try:
+            await asyncio.to_thread(_enqueue_periodic, kind, interval_seconds)
+        except Exception as e:
+            print(f"[WARNING] Failed to schedule {kind}: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+@job_handler("prune_jobs")
+def prune_finished_jobs(db: Session, payload: Dict) -> Dict:
+    cutoff = datetime.utcnow() - timedelta(days=payload.get("older_than_days", JOB_RETENTION_DAYS))
+    deleted = db.query(BackgroundJob).filter(
+        BackgroundJob.status.in_(("succeeded", "failed")),
+        BackgroundJob.finished_at < cutoff
+    ).delete(synchronize_session=False)
+    return {"deleted": deleted}
+
+
+# ------------------------------
+# Visibility
+# ------------------------------
+def _percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(pct * len(samples)))], 3)
+
+
+def queue_stats(db: Session, window_seconds: int = 3600) -> Dict:
+    """Queue depth by status plus wait/run latency of jobs finished in the window"""
+    now = datetime.utcnow()
+    counts = dict(db.query(BackgroundJob.status, func.count(BackgroundJob.id)).group_by(BackgroundJob.status).all())
+
+    ready, oldest_ready = db.query(func.count(BackgroundJob.id), func.min(BackgroundJob.run_after)).filter(
+        BackgroundJob.status == "pending",
+        BackgroundJob.run_after <= now
+    ).one()
+
+    finished = db.query(
+        BackgroundJob.kind, BackgroundJob.run_after, BackgroundJob.started_at, BackgroundJob.finished_at
+    ).filter(
+        BackgroundJob.status == "succeeded",
+        BackgroundJob.finished_at >= now - timedelta(seconds=window_seconds)
+    ).order_by(BackgroundJob.finished_at.desc()).limit(5000).all()
+
+    waits: Dict[str, List[float]] = {}
+    runs: Dict[str, List[float]] = {}
+    for kind, run_after, started_at, finished_at in finished:
+        # Wait is measured from when the job became runnable (retries included)
+        waits.setdefault(kind, []).append((started_at - run_after).total_seconds())
+        runs.setdefault(kind, []).append((finished_at - started_at).total_seconds())
+
+    return {
+        "depth": {
+            "ready": ready,
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "succeeded": counts.get("succeeded", 0),
+            "failed": counts.get("failed", 0),
+        },
+        "oldest_ready_age_seconds": round((now - oldest_ready).total_seconds(), 3) if oldest_ready else None,
+        "workers": job_pool.concurrency if job_pool._tasks else 0,
+        "latency_window_seconds": window_seconds,
+        "latency": {
+            kind: {
+                "completed": len(waits[kind]),
+                "wait_p50": _percentile(waits[kind], 0.5),
+                "wait_p95": _percentile(waits[kind], 0.95),
+                "run_p50": _percentile(runs[kind], 0.5),
+                "run_p95": _percentile(runs[kind], 0.95),
+            }
+            for kind in sorted(waits)
+        }
+    }
@@ -0,0 +1,331 @@
+import os
+import time
+import random
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.skill import UserSkill, PracticeSession
+from app.models.answer_event import AnswerEvent
+from app.core.invalidation import on_invalidation, publish_invalidation
+from app.core.answer_log import EVENT_SOURCED_ANSWERS
+
+# Boards are rebuilt from the database this often to absorb any drift
+REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", "600"))
+# Per-skill boards are kept for the most recently used skill names only
+MAX_SKILL_BOARDS = int(os.getenv("LEADERBOARD_MAX_SKILL_BOARDS", "256"))
+
+_MAX_LEVEL = 32
+
+
+# ------------------------------
+# Indexable skip list
+# ------------------------------
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * level
+        self.width: List[int] = [1] * level
+
+
+class RankedSet:
+    """
+    Sorted set of comparable keys with O(log n) expected insert, remove,
+    rank-of-key and index-of-rank (skip list whose links record how many
+    elements they jump over).
+    """
+
+    def __init__(self):
+        self._head = _Node(None, _MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < _MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key):
+        update = [self._head] * _MAX_LEVEL
+        steps = [0] * _MAX_LEVEL
+        node = self._head
+        position = 0
+        for i in range(self._level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+            update[i] = node
+            steps[i] = position
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                update[i] = self._head
+                steps[i] = 0
+                self._head.width[i] = self._size + 1
+            self._level = level
+
+        new = _Node(key, level)
+        for i in range(self._level):
+            prev = update[i]
+            if i < level:
+                # Split prev's link at the new node's position
+                skipped = position - steps[i]
+                new.next[i] = prev.next[i]
+                new.width[i] = prev.width[i] - skipped
+                prev.next[i] = new
+                prev.width[i] = skipped + 1
+            else:
+                prev.width[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        update = [self._head] * _MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+
+        target = node.next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+
+        for i in range(self._level):
+            prev = update[i]
+            if prev.next[i] is target:
+                prev.width[i] += target.width[i] - 1
+                prev.next[i] = target.next[i]
+            else:
+                prev.width[i] -= 1
+        self._size -= 1
+
+    def count_less(self, key) -> int:
+        """Number of keys strictly less than `key`"""
+        node = self._head
+        position = 0
+        for i in range(self._level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+        return position
+
+    def iter_from(self, index: int):
+        """Yield keys in order starting at 0-based `index`"""
+        if index >= self._size:
+            return
+        node = self._head
+        position = -1
+        for i in range(self._level - 1, -1, -1):
+            while node.next[i] is not None and position + node.width[i] <= index:
+                position += node.width[i]
+                node = node.next[i]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+
+# ------------------------------
+# Leaderboards
+# ------------------------------
+class Leaderboard:
+    """
+    XP per user, ordered by (xp desc, user_id). high_water is the last XP
+    row id the scores were loaded from: answers at or below it are already
+    counted, so their deltas must not be added again.
+    """
+
+    def __init__(self, scores: Dict[int, int], high_water: int = 0):
+        self.loaded_at = time.monotonic()
+        self.high_water = high_water
+        self._scores: Dict[int, int] = {}
+        self._ranked = RankedSet()
+        for user_id, xp in scores.items():
+            self.set(user_id, xp)
+
+    def set(self, user_id: int, xp: int):
+        old = self._scores.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._ranked.remove((-old, user_id))
+        if xp > 0:
+            self._scores[user_id] = xp
+            self._ranked.insert((-xp, user_id))
+        else:
+            self._scores.pop(user_id, None)
+
+    def add(self, user_id: int, delta: int):
+        self.set(user_id, self._scores.get(user_id, 0) + delta)
+
+    def raise_to(self, user_id: int, xp: int):
+        """Set a running total, ignoring one older than the score already held"""
+        if xp > self._scores.get(user_id, 0):
+            self.set(user_id, xp)
+
+    def rank_of(self, user_id: int) -> Optional[Tuple[int, int]]:
+        """(rank, xp) - ties share a rank - or None when the user has no XP here"""
+        xp = self._scores.get(user_id)
+        if xp is None:
+            return None
+        return self._ranked.count_less((-xp, 0)) + 1, xp
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[int, int, int]]:
+        """[(rank, user_id, xp)] for positions offset .. offset + limit"""
+        entries = []
+        rank, last_xp = None, None
+        for position, (neg_xp, user_id) in enumerate(self._ranked.iter_from(offset), start=offset):
+            if len(entries) >= limit:
+                break
+            xp = -neg_xp
+            if xp != last_xp:
+                rank = position + 1 if last_xp is not None else self._ranked.count_less((neg_xp, 0)) + 1
+                last_xp = xp
+            entries.append((rank, user_id, xp))
+        return entries
+
+    def __len__(self) -> int:
+        return len(self._ranked)
+
+
+def week_start(when: Optional[datetime] = None) -> datetime:
+    """Monday 00:00 UTC of the week containing `when`"""
+    day = (when or datetime.utcnow()).date()
+    return datetime.combine(day - timedelta(days=day.weekday()), datetime.min.time())
+
+
+def skill_board_name(skill_name: str) -> str:
+    return " ".join((skill_name or "").split()).lower()
+
+
+def _xp_rows():
+    """The table answers' XP is committed to, and its timestamp column"""
+    if EVENT_SOURCED_ANSWERS:
+        # Practice sessions are written later by the projector; the log has every answer at once
+        return AnswerEvent, AnswerEvent.occurred_at
+    return PracticeSession, PracticeSession.session_date
+
+
+def _load_global(db: Session) -> Tuple[Dict[int, int], int]:
+    # Answers set absolute totals on this board, so nothing can be counted twice
+    return dict(db.query(User.id, User.total_xp).filter(User.total_xp > 0).all()), 0
+
+
+def _load_xp(db: Session, *criteria) -> Tuple[Dict[int, int], int]:
+    """
+    XP per user over the rows matching criteria, and the high-water row id.
+    Only rows up to the high-water id are summed, so an answer committing
+    during the load is either in the scores or has its delta applied after.
+    """
+    source, _ = _xp_rows()
+    high_water = db.query(func.coalesce(func.max(source.id), 0)).scalar()
+    rows = db.query(UserSkill.user_id, func.sum(source.xp_earned)).join(
+        source, source.skill_id == UserSkill.id
+    ).filter(
+        source.id <= high_water, *criteria
+    ).group_by(UserSkill.user_id).all()
+    return {user_id: int(xp or 0) for user_id, xp in rows}, high_water
+
+
+def _load_skill(db: Session, name: str) -> Tuple[Dict[int, int], int]:
+    return _load_xp(db, func.lower(UserSkill.skill_name) == name)
+
+
+def _load_week(db: Session, start: datetime) -> Tuple[Dict[int, int], int]:
+    _, occurred_at = _xp_rows()
+    return _load_xp(db, occurred_at >= start, occurred_at < start + timedelta(days=7))
+
+
+class LeaderboardService:
+    """
+    Global, per-skill-name and weekly XP boards, loaded from the database on
+    first use and then updated in place as answers are recorded.
+    """
+
+    def __init__(self):
+        self._boards: "OrderedDict[str, Leaderboard]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _board(self, key: str, loader: Callable[[], Tuple[Dict[int, int], int]]) -> Leaderboard:
+        with self._lock:
+            board = self._boards.get(key)
+            if board is not None and time.monotonic() - board.loaded_at < REFRESH_SECONDS:
+                self._boards.move_to_end(key)
+                return board
+            # Loaded under the lock so answers recorded meanwhile land on the new board
+            board = Leaderboard(*loader())
+            self._boards[key] = board
+            self._boards.move_to_end(key)
+            skill_keys = [k for k in self._boards if k.startswith("skill:")]
+            for stale in skill_keys[:-MAX_SKILL_BOARDS]:
+                del self._boards[stale]
+            return board
+
+    def global_board(self, db: Session) -> Leaderboard:
+        return self._board("global", lambda: _load_global(db))
+
+    def skill_board(self, db: Session, skill_name: str) -> Leaderboard:
+        name = skill_board_name(skill_name)
+        return self._board(f"skill:{name}", lambda: _load_skill(db, name))
+
+    def weekly_board(self, db: Session, when: Optional[datetime] = None) -> Leaderboard:
+        start = week_start(when)
+        key = f"week:{start.date().isoformat()}"
+        with self._lock:
+            for stale in [k for k in self._boards if k.startswith("week:") and k < key]:
+                del self._boards[stale]
+        return self._board(key, lambda: _load_week(db, start))
+
+    def apply_answer(self, user_id: int, skill_name: str, xp: int, total_xp: int, week: str, answer_id: int):
+        """
+        Fold one answer into whichever boards are loaded; unloaded boards pick
+        it up when they load, and boards loaded after it committed skip it
+        """
+        with self._lock:
+            board = self._boards.get("global")
+            if board is not None:
+                # One user's after-commit hooks can run out of order across
+                # threads; total_xp only grows, so the larger total is newer
+                board.raise_to(user_id, total_xp)
+            for key in (f"skill:{skill_board_name(skill_name)}", f"week:{week}"):
+                board = self._boards.get(key)
+                if board is not None and answer_id > board.high_water:
+                    board.add(user_id, xp)
+
+    def record_answer(self, user_id: int, skill_name: str, xp: int, total_xp: int, answer_id: int):
+        """
+        Call after the answer commits. answer_id is the id of the XP row
+        (practice session, or log event in event-sourced mode) it committed.
+        """
+        if xp <= 0:
+            return
+        week = week_start().date().isoformat()
+        self.apply_answer(user_id, skill_name, xp, total_xp, week, answer_id)
+        publish_invalidation("leaderboard", str(user_id), {
+            "skill_name": skill_name, "xp": xp, "total_xp": total_xp, "week": week, "answer_id": answer_id
+        })
+
+    def forget(self):
+        with self._lock:
+            self._boards.clear()
+
+
+leaderboards = LeaderboardService()
+
+
+@on_invalidation("leaderboard")
+def _apply_remote_answer(key, payload, seq, created):
+    leaderboards.apply_answer(
+        int(key), payload["skill_name"], payload["xp"], payload["total_xp"], payload["week"], payload["answer_id"]
+    )
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------
+# Router settings
+# ------------------------------
+WINDOW_SIZE = int(os.getenv("LLM_STATS_WINDOW", "50"))
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "2.0"))  # seconds, until we have samples
+HEDGE_MIN_SAMPLES = 5
+FAILURE_COOLDOWN_SECONDS = float(os.getenv("LLM_FAILURE_COOLDOWN", "30"))
+FAILURES_BEFORE_COOLDOWN = 3
+
+# Called with (endpoint, response) for each completed call
+UsageCallback = Callable[["LLMEndpoint", object], None]
+
+
+class LLMEndpoint:
+    """One OpenAI-compatible endpoint + model, with its rolling latency/error profile"""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        api_key: Optional[str],
+        model: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30.0,
+        max_retries: int = 0,
+        client=None
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        # A prebuilt client can be injected (e.g. pointed at a local stub server)
+        self.client = client or OpenAI(
+            api_key=api_key or "not-set",
+            base_url=base_url,
+            default_headers=headers or {},
+            timeout=timeout,
+            max_retries=max_retries
+        )
+
+        self._latencies = deque(maxlen=WINDOW_SIZE)
+        self._outcomes = deque(maxlen=WINDOW_SIZE)  # True = success
+        self._consecutive_failures = 0
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.append(latency)
+                self._consecutive_failures = 0
+            else:
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= FAILURES_BEFORE_COOLDOWN:
+                    self._cooldown_until = time.monotonic() + FAILURE_COOLDOWN_SECONDS
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(pct * len(samples)))
+        return samples[index]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1 - sum(self._outcomes) / len(self._outcomes)
+
+    def sample_count(self) -> int:
+        with self._lock:
+            return len(self._latencies)
+
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self._cooldown_until
+
+    def score(self) -> float:
+        """Lower is better. Unsampled endpoints score 0 so they get explored first."""
+        median = self.latency_percentile(0.5)
+        if median is None:
+            return 0.0
+        return median / max(0.05, 1 - self.error_rate())
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "model": self.model,
+            "base_url": self.base_url,
+            "samples": self.sample_count(),
+            "p50_latency": self.latency_percentile(0.5),
+            "p90_latency": self.latency_percentile(0.9),
+            "error_rate": round(self.error_rate(), 3),
+            "cooling_down": self.cooling_down()
+        }
+
+
+class LLMRouter:
+    """
+    Sends chat completions to the best of several OpenAI-compatible endpoints.
+
+    Endpoints are ranked by rolling median latency inflated by error rate.
+    Failed calls fail over to the next endpoint. Hedged calls fire a second
+    request at the runner-up once the primary exceeds its latency percentile,
+    and return whichever answer arrives first.
+
+    on_usage(endpoint, response) runs for every call that completes, the
+    loser of a hedge included (it lands later, from the pool thread): the
+    provider bills both, so both belong in the token accounting.
+    """
+
+    def __init__(self, endpoints: List[LLMEndpoint]):
+        if not endpoints:
+            raise ValueError("LLMRouter needs at least one endpoint")
+        self.endpoints = endpoints
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(endpoints)), thread_name_prefix="llm")
+
+    def ranked(self) -> List[LLMEndpoint]:
+        healthy = [e for e in self.endpoints if not e.cooling_down()]
+        cooling = [e for e in self.endpoints if e.cooling_down()]
+        return sorted(healthy, key=lambda e: e.score()) + cooling
+
+    def _call(self, endpoint: LLMEndpoint, kwargs: Dict, on_usage: Optional[UsageCallback] = None):
+        start = time.monotonic()
+        try:
+            response = endpoint.client.chat.completions.create(model=endpoint.model, **kwargs)
+        except Exception:
+            endpoint.record(time.monotonic() - start, ok=False)
+            raise
+        endpoint.record(time.monotonic() - start, ok=True)
+        if on_usage is not None:
+            try:
+                on_usage(endpoint, response)
+            except Exception as e:
+                # Accounting must never turn a served answer into a failover
+                logger.warning("Usage callback failed for %s: %s", endpoint.name, e)
+        return response
+
+    def _hedge_delay(self, endpoint: LLMEndpoint) -> float:
+        if endpoint.sample_count() < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return endpoint.latency_percentile(HEDGE_PERCENTILE)
+
+    def chat(self, hedge: bool = False, on_usage: Optional[UsageCallback] = None, **kwargs) -> Tuple[object, LLMEndpoint]:
+        """Run a chat completion and return (response, endpoint that served it)"""
+        ranked = self.ranked()
+        if hedge and HEDGE_ENABLED and len(ranked) > 1:
+            return self._hedged_chat(ranked, kwargs, on_usage)
+
+        last_error = None
+        for endpoint in ranked:
+            try:
+                return self._call(endpoint, kwargs, on_usage), endpoint
+            except Exception as e:
+                logger.warning("LLM endpoint %s failed: %s", endpoint.name, e)
+                last_error = e
+        raise last_error
+
+    def _hedged_chat(self, ranked: List[LLMEndpoint], kwargs: Dict, on_usage: Optional[UsageCallback]) -> Tuple[object, LLMEndpoint]:
+        primary, backup = ranked[0], ranked[1]
+        pending = {self._executor.submit(self._call, primary, kwargs, on_usage): primary}
+
+        backup_fired = False
+        done, _ = wait(pending, timeout=self._hedge_delay(primary))
+        if not done:
+            logger.debug("Hedging: %s is slow, also asking %s", primary.name, backup.name)
+            pending[self._executor.submit(self._call, backup, kwargs, on_usage)] = backup
+            backup_fired = True
+
+        last_error = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    # The losing request keeps running in the pool; its timing and usage still count
+                    return future.result(), endpoint
+                except Exception as e:
+                    logger.warning("LLM endpoint %s failed: %s", endpoint.name, e)
+                    last_error = e
+                    if not backup_fired:
+                        pending[self._executor.submit(self._call, backup, kwargs, on_usage)] = backup
+                        backup_fired = True
+
+        # Both hedged endpoints failed - fall back to the rest of the ranking
+        for endpoint in ranked[2:]:
+            try:
+                return self._call(endpoint, kwargs, on_usage), endpoint
+            except Exception as e:
+                logger.warning("LLM endpoint %s failed: %s", endpoint.name, e)
+                last_error = e
+        raise last_error
+
+    def stats(self) -> List[Dict]:
+        return [e.stats() for e in self.endpoints]
+
+
+# ------------------------------
+# Configuration
+# ------------------------------
+def _default_model(base_url: str) -> str:
+    return "openai/gpt-4o-mini" if "openrouter" in base_url.lower() else "gpt-4o-mini"
+
+
+def _default_headers(base_url: str) -> Dict[str, str]:
+    # OpenRouter requires extra headers
+    if "openrouter" in base_url.lower():
+        return {
+            "HTTP-Referer": "http://localhost:3000",
+            "X-Title": "Astrarium",
+        }
+    return {}
+
+
+def load_endpoints_from_env() -> List[LLMEndpoint]:
+    """
+    Build endpoints from LLM_ENDPOINTS, a JSON list such as
+    [{"name": "openrouter", "base_url": "https://openrouter.ai/api/v1",
+      "api_key_env": "OPENROUTER_API_KEY", "model": "openai/gpt-4o-mini"}]
+
+    Without it, a single endpoint is built from OPENAI_BASE_URL / OPENAI_API_KEY.
+    """
+    raw = os.getenv("LLM_ENDPOINTS")
+    if not raw:
+        base_url = os.getenv("OPENAI_BASE_URL", "https://openrouter.ai/api/v1")
+        return [LLMEndpoint(
+            name="default",
+            base_url=base_url,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            model=_default_model(base_url),
+            headers=_default_headers(base_url)
+        )]
+
+    endpoints = []
+    for i, cfg in enumerate(json.loads(raw)):
+        base_url = cfg["base_url"]
+        api_key = cfg.get("api_key") or os.getenv(cfg.get("api_key_env", "OPENAI_API_KEY"))
+        endpoints.append(LLMEndpoint(
+            name=cfg.get("name", f"endpoint-{i}"),
+            base_url=base_url,
+            api_key=api_key,
+            model=cfg.get("model", _default_model(base_url)),
+            headers=cfg.get("headers", _default_headers(base_url)),
+            timeout=float(cfg.get("timeout", 30.0)),
+            max_retries=int(cfg.get("max_retries", 0))
+        ))
+    return endpoints
@@ -0,0 +1,46 @@
+import json
+import base64
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: List) -> str:
+    """Opaque keyset cursor holding the sort key of the last row on a page"""
+    raw = json.dumps([_encode_value(v) for v in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("wrong cursor shape")
+        return [_decode_value(v) for v in values]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def clamp_limit(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    if limit is None:
+        return default
+    return max(1, min(MAX_PAGE_SIZE, limit))
@@ -0,0 +1,287 @@
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.models.alien_pet import AlienPet, AlienMood, EvolutionStage
+# Imported so AlienPet's relationships resolve when pets are built outside the app
+from app.models.user import User  # noqa: F401
+from app.models.skill import UserSkill  # noqa: F401
+
+# ------------------------------
+# Lookup tables mirroring AlienPet
+# ------------------------------
+# Minimum level per evolution stage, in enum order (EGG .. CELESTIAL)
+STAGES = list(EvolutionStage)
+STAGE_MIN_LEVEL = np.array([1, 2, 3, 5, 7, 9, 11, 15, 20, 30, 40, 50])
+
+# Mood by average health, most cheerful first
+MOODS = [AlienMood.RADIANT, AlienMood.CONTENT, AlienMood.DIMMING, AlienMood.FLICKERING, AlienMood.ECLIPSE]
+MOOD_BINS = np.array([20.0, 40.0, 60.0, 80.0])
+
+
+# Per-pet state arrays on PetPopulation
+_STATE = ("luminosity", "energy", "knowledge_hunger", "cosmic_resonance", "level", "experience", "stage", "mood")
+
+
+def _or(values: np.ndarray, default: float) -> np.ndarray:
+    # AlienPet reads stats as `self.x or default`, so a stat at exactly 0 counts as the default
+    return np.where(values == 0, default, values)
+
+
+class PetPopulation:
+    """
+    Struct-of-arrays copy of AlienPet state, with AlienPet's rules applied to
+    every pet at once. Methods take scalars or per-pet arrays, plus an
+    optional boolean mask selecting which pets the rule applies to.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.luminosity = np.full(size, 100.0)
+        self.energy = np.full(size, 100.0)
+        self.knowledge_hunger = np.full(size, 50.0)
+        self.cosmic_resonance = np.full(size, 50.0)
+        self.level = np.ones(size, dtype=np.int64)
+        self.experience = np.zeros(size, dtype=np.int64)
+        self.stage = np.zeros(size, dtype=np.int64)  # Index into STAGES
+        self.mood = np.ones(size, dtype=np.int64)    # Index into MOODS (CONTENT)
+
+    @classmethod
+    def from_pets(cls, pets) -> "PetPopulation":
+        population = cls(len(pets))
+        for i, pet in enumerate(pets):
+            population.luminosity[i] = pet.luminosity or 0.0
+            population.energy[i] = pet.energy or 0.0
+            population.knowledge_hunger[i] = pet.knowledge_hunger or 0.0
+            population.cosmic_resonance[i] = pet.cosmic_resonance or 0.0
+            population.level[i] = pet.level or 1
+            population.experience[i] = pet.experience or 0
+            population.stage[i] = STAGES.index(pet.evolution_stage or EvolutionStage.EGG)
+            population.mood[i] = MOODS.index(pet.mood or AlienMood.CONTENT)
+        return population
+
+    def take(self, index: np.ndarray) -> "PetPopulation":
+        """Copy of the pets at `index`"""
+        subset = PetPopulation(len(index))
+        for name in _STATE:
+            setattr(subset, name, getattr(self, name)[index])
+        return subset
+
+    def put(self, index: np.ndarray, subset: "PetPopulation"):
+        """Write a subset taken with take() back"""
+        for name in _STATE:
+            getattr(self, name)[index] = getattr(subset, name)
+
+    @staticmethod
+    def _masked(mask: Optional[np.ndarray], new: np.ndarray, old: np.ndarray) -> np.ndarray:
+        return new if mask is None else np.where(mask, new, old)
+
+    # ------------------------------
+    # Rules
+    # ------------------------------
+    def update_mood(self, mask: Optional[np.ndarray] = None):
+        avg_health = (_or(self.luminosity, 100.0) + _or(self.energy, 100.0) + _or(self.knowledge_hunger, 50.0)) / 3
+        # digitize gives 4 for >= 80 ... 0 for < 20; MOODS runs the other way
+        mood = len(MOOD_BINS) - np.digitize(avg_health, MOOD_BINS)
+        self.mood = self._masked(mask, mood, self.mood)
+
+    def check_evolution(self, mask: Optional[np.ndarray] = None):
+        stage = np.searchsorted(STAGE_MIN_LEVEL, np.maximum(self.level, 1), side="right") - 1
+        self.stage = self._masked(mask, stage, self.stage)
+
+    def feed_knowledge(self, skill_complexity=1.0, mask: Optional[np.ndarray] = None):
+        gain = 15 * np.asarray(skill_complexity, dtype=float)
+        m = self._masked
+        self.knowledge_hunger = m(mask, np.minimum(100, _or(self.knowledge_hunger, 50.0) + gain), self.knowledge_hunger)
+        self.luminosity = m(mask, np.minimum(100, _or(self.luminosity, 100.0) + gain * 0.8), self.luminosity)
+        self.energy = m(mask, np.minimum(100, _or(self.energy, 100.0) + gain * 0.5), self.energy)
+        self.cosmic_resonance = m(mask, np.minimum(100, _or(self.cosmic_resonance, 50.0) + gain * 0.3), self.cosmic_resonance)
+        self.update_mood(mask)
+
+    def decay_stats(self, hours_since_last_feed, mask: Optional[np.ndarray] = None):
+        decay_rate = 0.5 * (np.asarray(hours_since_last_feed, dtype=float) / 24)
+        m = self._masked
+        self.knowledge_hunger = m(mask, np.minimum(100, _or(self.knowledge_hunger, 50.0) + decay_rate * 2), self.knowledge_hunger)
+        self.luminosity = m(mask, np.maximum(0, _or(self.luminosity, 100.0) - decay_rate), self.luminosity)
+        self.energy = m(mask, np.maximum(0, _or(self.energy, 100.0) - decay_rate * 0.8), self.energy)
+        self.cosmic_resonance = m(mask, np.maximum(0, _or(self.cosmic_resonance, 50.0) - decay_rate * 0.5), self.cosmic_resonance)
+        self.update_mood(mask)
+
+    def gain_experience(self, xp, mask: Optional[np.ndarray] = None):
+        """
+        Closed form of AlienPet.gain_experience's level-up loop.
+
+        Reaching level L from level 1 costs 50 * L * (L - 1) XP in total, so the
+        final level is the largest L whose cost fits in the pet's cumulative XP.
+        """
+        xp = np.broadcast_to(np.asarray(xp, dtype=np.int64), (self.size,))
+        if mask is None:
+            mask = np.ones(self.size, dtype=bool)
+        xp = np.where(mask, xp, 0)
+        level = np.maximum(self.level, 1)
+        experience = self.experience + xp
+        cumulative = experience + 50 * level * (level - 1)
+
+        new_level = np.floor((1 + np.sqrt(1 + cumulative / 12.5)) / 2).astype(np.int64)
+        # Guard against sqrt rounding at exact boundaries
+        new_level -= 50 * new_level * (new_level - 1) > cumulative
+        new_level += 50 * (new_level + 1) * new_level <= cumulative
+        # The loop never levels down, even if experience starts out negative
+        new_level = np.where(mask, np.maximum(new_level, level), level)
+        levels_gained = new_level - level
+
+        leveled = levels_gained > 0
+        self.experience = np.where(leveled, cumulative - 50 * new_level * (new_level - 1), experience)
+        # +10 luminosity and energy per level gained, capped at 100
+        self.luminosity = np.where(leveled, np.minimum(100, _or(self.luminosity, 100.0) + 10 * levels_gained), self.luminosity)
+        self.energy = np.where(leveled, np.minimum(100, _or(self.energy, 100.0) + 10 * levels_gained), self.energy)
+        self.level = np.where(mask, new_level, self.level)
+        self.check_evolution(mask)
+
+    def answer(self, is_correct: np.ndarray, xp, skill_complexity, consecutive_wrong: np.ndarray, mask: Optional[np.ndarray] = None):
+        """The pet side of answer_log.fold_answer for one answer per pet (only correct answers feed the pet)"""
+        answering = np.ones(self.size, dtype=bool) if mask is None else mask
+        correct = is_correct & answering
+        luminosity = _or(self.luminosity, 100.0)
+        penalty = np.where(consecutive_wrong >= 2, 10.0, 2.0)
+        new_luminosity = np.where(correct, np.minimum(100.0, luminosity + 5.0), np.maximum(0.0, luminosity - penalty))
+        self.luminosity = np.where(answering, new_luminosity, self.luminosity)
+        self.feed_knowledge(skill_complexity, mask=correct)
+        self.gain_experience(xp, mask=correct)
+        self.update_mood(answering)
+
+    # ------------------------------
+    # Reporting
+    # ------------------------------
+    def summary(self) -> Dict:
+        def percentiles(values):
+            p = np.percentile(values, [5, 25, 50, 75, 95])
+            return {"mean": round(float(values.mean()), 2), **{f"p{q}": round(float(v), 2) for q, v in zip((5, 25, 50, 75, 95), p)}}
+
+        stage_counts = np.bincount(self.stage, minlength=len(STAGES))
+        mood_counts = np.bincount(self.mood, minlength=len(MOODS))
+        return {
+            "pets": self.size,
+            "level": percentiles(self.level),
+            "luminosity": percentiles(self.luminosity),
+            "energy": percentiles(self.energy),
+            "knowledge_hunger": percentiles(self.knowledge_hunger),
+            "evolution_stage": {stage.value: int(n) for stage, n in zip(STAGES, stage_counts) if n},
+            "mood": {mood.value: int(n) for mood, n in zip(MOODS, mood_counts) if n},
+        }
+
+
+# ------------------------------
+# Simulation
+# ------------------------------
+def simulate(
+    pets: int,
+    days: int,
+    answers_per_day: float = 5.0,
+    p_correct: float = 0.7,
+    xp_per_answer: int = 15,
+    skill_complexity: float = 0.5,
+    p_active: float = 0.6,
+    seed: int = 0
+) -> Dict:
+    """
+    Simulate `pets` pets for `days` days. Each day a pet is active with
+    probability p_active and answers a Poisson(answers_per_day) number of
+    questions. Correct answers feed the pet and grant xp_per_answer pet XP,
+    as in /questions/answer. Idle pets decay for 24 hours.
+    """
+    rng = np.random.default_rng(seed)
+    population = PetPopulation(pets)
+    consecutive_wrong = np.zeros(pets, dtype=np.int64)
+    answers_total = 0
+
+    start = time.perf_counter()
+    for _ in range(days):
+        active = rng.random(pets) < p_active
+        population.decay_stats(24.0, mask=~active)
+
+        answers = np.where(active, rng.poisson(answers_per_day, pets), 0)
+        answers_total += int(answers.sum())
+        for round_index in range(int(answers.max(initial=0))):
+            # Only pets still answering this round are worked on
+            index = np.flatnonzero(answers > round_index)
+            subset = population.take(index)
+            correct = rng.random(len(index)) < p_correct
+            wrong_streak = np.where(correct, 0, consecutive_wrong[index] + 1)
+            consecutive_wrong[index] = wrong_streak
+            subset.answer(correct, xp_per_answer, skill_complexity, wrong_streak)
+            population.put(index, subset)
+    elapsed = time.perf_counter() - start
+
+    result = population.summary()
+    result["days"] = days
+    result["answers_simulated"] = answers_total
+    result["pet_days_per_second"] = round(pets * days / elapsed) if elapsed > 0 else None
+    return result
+
+
+# ------------------------------
+# Validation against the ORM methods
+# ------------------------------
+def validate_against_orm(pets: int = 500, steps: int = 200, seed: int = 0) -> Dict:
+    """
+    Drive AlienPet instances and a PetPopulation through the same random
+    sequence of feed / decay / XP / answer operations and compare every stat.
+    """
+    rng = np.random.default_rng(seed)
+    orm_pets = [AlienPet(name=f"sim-{i}") for i in range(pets)]
+    for pet in orm_pets:
+        pet.luminosity = float(rng.uniform(0, 100))
+        pet.energy = float(rng.uniform(0, 100))
+        pet.knowledge_hunger = float(rng.uniform(0, 100))
+        pet.cosmic_resonance = float(rng.uniform(0, 100))
+        pet.level = int(rng.integers(1, 60))
+        pet.experience = int(rng.integers(0, 100))
+        pet.mood = AlienMood.CONTENT
+        pet.check_evolution()
+    population = PetPopulation.from_pets(orm_pets)
+    consecutive_wrong = np.zeros(pets, dtype=np.int64)
+
+    for _ in range(steps):
+        op = rng.integers(4)
+        mask = rng.random(pets) < 0.5
+        if op == 0:
+            complexity = rng.uniform(0, 1, pets)
+            population.feed_knowledge(complexity, mask=mask)
+            for i in np.flatnonzero(mask):
+                orm_pets[i].feed_knowledge(float(complexity[i]))
+        elif op == 1:
+            hours = rng.uniform(0, 240, pets)
+            population.decay_stats(hours, mask=mask)
+            for i in np.flatnonzero(mask):
+                orm_pets[i].decay_stats(float(hours[i]))
+        elif op == 2:
+            xp = rng.integers(0, 5000, pets)
+            population.gain_experience(xp, mask=mask)
+            for i in np.flatnonzero(mask):
+                orm_pets[i].gain_experience(int(xp[i]))
+        else:
+            answering = rng.random(pets) < 0.8
+            correct = mask & answering
+            consecutive_wrong = np.where(correct, 0, np.where(answering, consecutive_wrong + 1, consecutive_wrong))
+            population.answer(correct, 15, 0.5, consecutive_wrong, mask=answering)
+            for i in np.flatnonzero(answering):
+                pet = orm_pets[i]
+                old = pet.luminosity or 100.0
+                if correct[i]:
+                    pet.luminosity = min(100.0, old + 5.0)
+                    pet.feed_knowledge(skill_complexity=0.5)
+                    pet.gain_experience(15)
+                else:
+                    pet.luminosity = max(0.0, old - (10.0 if consecutive_wrong[i] >= 2 else 2.0))
+                pet.update_mood()
+
+    expected = PetPopulation.from_pets(orm_pets)
+    mismatches = {}
+    for name in _STATE:
+        got, want = getattr(population, name), getattr(expected, name)
+        bad = ~np.isclose(got, want, rtol=0, atol=1e-9)
+        if bad.any():
+            mismatches[name] = int(bad.sum())
+    return {"pets": pets, "steps": steps, "mismatches": mismatches, "ok": not mismatches}
@@ -0,0 +1,282 @@
+import os
+import time
+import logging
+import asyncio
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.skill import UserSkill
+from app.models.question import Question, UserAnswer
+from app.models.answer_event import AnswerEvent
+from app.core.ai_service import CelestialAIOracle
+from app.core.question_index import question_index
+from app.core.token_ledger import over_budget, tokens_used_today
+from app.core.answer_log import EVENT_SOURCED_ANSWERS
+from app.core.repository import skill_for_user, next_due_skill_id
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------
+# Prefetch settings
+# ------------------------------
+# After an answer commits, the likely next question is reserved (an unanswered
+# stored one) or generated in the background so "next" returns at once.
+PREFETCH_ENABLED = os.getenv("QUESTION_PREFETCH", "true").lower() in ("1", "true", "yes")
+# Per-user daily cap on tokens spent generating questions nobody asked for yet
+PREFETCH_DAILY_TOKEN_CAP = int(os.getenv("PREFETCH_DAILY_TOKEN_CAP", "5000"))
+# A ready question older than this is dropped (it stays in the question bank)
+PREFETCH_TTL_SECONDS = int(os.getenv("PREFETCH_TTL_SECONDS", "900"))
+
+# How many times to re-ask the oracle when it returns a near-duplicate
+MAX_GENERATION_ATTEMPTS = int(os.getenv("QUESTION_GENERATION_ATTEMPTS", "3"))
+
+
+# ------------------------------
+# Question generation (shared with /questions/generate)
+# ------------------------------
+def generate_new_question(
+    db: Session,
+    skill: UserSkill,
+    user_id: int,
+    speculative: bool = False,
+    cancelled: Optional[Callable[[], bool]] = None
+) -> Optional[Question]:
+    """
+    Ask the oracle for a new question and store it. When every attempt is a
+    near-duplicate, the stored original is returned instead of a new copy.
+    Returns None only when cancelled() turned true before anything was stored.
+    """
+    oracle = CelestialAIOracle()
+    duplicate_id = None
+    for attempt in range(MAX_GENERATION_ATTEMPTS):
+        if cancelled and cancelled():
+            return None
+        question_data = oracle.generate_skill_question(
+            skill_name=skill.skill_name,
+            category=skill.category,
+            proficiency_level=skill.proficiency_level,
+            user_id=user_id,
+            skill_id=skill.id,
+            speculative=speculative
+        )
+        duplicate_id = question_index.find_duplicate(db, skill.id, question_data["question"])
+        if duplicate_id is None:
+            break
+        logger.debug("Rejected near-duplicate of question %s (attempt %d)", duplicate_id, attempt + 1)
+
+    if duplicate_id is not None:
+        # Every attempt was a paraphrase - serve the stored question instead of inserting another copy
+        return db.query(Question).filter(Question.id == duplicate_id).first()
+
+    # Tokens are already spent, so a question generated before a cancel still joins the bank
+    question = Question(
+        skill_id=skill.id,
+        question_text=question_data["question"],
+        question_type=question_data["type"],
+        options=question_data.get("options"),
+        correct_answer=question_data["correct_answer"],
+        explanation=question_data.get("explanation"),
+        difficulty=question_data.get("difficulty", "medium"),
+        cosmic_reward=question_data.get("cosmic_reward", 10)
+    )
+    db.add(question)
+    db.commit()
+    db.refresh(question)
+    question_index.add(db, skill.id, question.id, question.question_text)
+    return question
+
+
+# ------------------------------
+# Predicting the next skill
+# ------------------------------
+def last_answer(db: Session, user_id: int) -> Optional[Tuple[int, bool]]:
+    """(skill_id, is_correct) of the user's most recent answer"""
+    if EVENT_SOURCED_ANSWERS:
+        row = db.query(AnswerEvent.skill_id, AnswerEvent.is_correct).filter(
+            AnswerEvent.user_id == user_id
+        ).order_by(AnswerEvent.id.desc()).first()
+    else:
+        row = db.query(Question.skill_id, UserAnswer.is_correct).join(
+            Question, Question.id == UserAnswer.question_id
+        ).filter(UserAnswer.user_id == user_id).order_by(UserAnswer.id.desc()).first()
+    return (row[0], row[1]) if row else None
+
+
+def predict_next_skill(db: Session, user_id: int, last_skill_id: Optional[int] = None, last_correct: bool = True) -> Optional[int]:
+    """
+    A wrong answer keeps the user on the same skill for a refresher; otherwise
+    the next skill is the head of /skills/due-today (never reviewed first,
+    then by next review date). Without a last answer given, the stored one is used.
+    """
+    if last_skill_id is None:
+        last = last_answer(db, user_id)
+        if last:
+            last_skill_id, last_correct = last
+    if last_skill_id is not None and not last_correct:
+        return last_skill_id
+    return next_due_skill_id(db, user_id, datetime.utcnow())
+
+
+def unanswered_question(db: Session, skill_id: int) -> Optional[Question]:
+    """Oldest stored question for the skill with no answer in either answer store"""
+    return db.query(Question).filter(
+        Question.skill_id == skill_id,
+        ~exists().where(UserAnswer.question_id == Question.id),
+        ~exists().where(AnswerEvent.question_id == Question.id)
+    ).order_by(Question.id.asc()).first()
+
+
+def _prepare(user_id: int, skill_id: int, cancelled: threading.Event) -> Optional[Dict]:
+    """Reserve or generate the next question for a skill (runs in a worker thread)"""
+    db = SessionLocal()
+    try:
+        skill = skill_for_user(db, skill_id, user_id)
+        if not skill:
+            return None
+
+        reserved = unanswered_question(db, skill_id)
+        if reserved:
+            return {"question_id": reserved.id, "source": "reserved"}
+
+        if over_budget(db, user_id):
+            return None
+        if PREFETCH_DAILY_TOKEN_CAP > 0 and tokens_used_today(db, user_id, operation="prefetch") >= PREFETCH_DAILY_TOKEN_CAP:
+            return {"question_id": None, "source": "capped"}
+
+        question = generate_new_question(db, skill, user_id, speculative=True, cancelled=cancelled.is_set)
+        if question is None or cancelled.is_set():
+            return None
+        return {"question_id": question.id, "source": "generated"}
+    finally:
+        db.close()
+
+
+# ------------------------------
+# Per-user prefetch slots
+# ------------------------------
+class Prefetch:
+    """One user's speculative next question: in flight, then ready until taken or stale"""
+
+    def __init__(self, user_id: int, skill_id: int):
+        self.user_id = user_id
+        self.skill_id = skill_id
+        self.started_at = time.time()
+        self.cancelled = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.started_at > PREFETCH_TTL_SECONDS
+
+    def cancel(self):
+        # The oracle call can't be interrupted mid-flight; the flag stops further attempts
+        self.cancelled.set()
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    def result(self) -> Optional[Dict]:
+        if self.task and self.task.done() and not self.task.cancelled() and not self.task.exception():
+            return self.task.result()
+        return None
+
+    def question_id(self) -> Optional[int]:
+        result = self.result()
+        return result["question_id"] if result else None
+
+    def describe(self) -> Dict:
+        result = self.result()
+        return {
+            "skill_id": self.skill_id,
+            "status": "ready" if result else ("pending" if self.task and not self.task.done() else "empty"),
+            "question_id": result["question_id"] if result else None,
+            "source": result["source"] if result else None,
+            "age_seconds": round(time.time() - self.started_at, 1)
+        }
+
+
+class QuestionPrefetcher:
+    """
+    Holds at most one speculative question per user, per worker. A new
+    prediction cancels the previous one; taking a slot awaits it if it is
+    still being generated, which is never slower than starting over.
+    """
+
+    def __init__(self):
+        self.slots: Dict[int, Prefetch] = {}
+        self.counters = {"scheduled": 0, "hits": 0, "misses": 0, "cancelled": 0, "reserved": 0, "generated": 0, "capped": 0}
+
+    def schedule(self, user_id: int, skill_id: Optional[int], answered_ids=()):
+        """Prefetch for skill_id; answered_ids are questions just answered, which a held slot must not be"""
+        if not PREFETCH_ENABLED or skill_id is None:
+            return
+        current = self.slots.get(user_id)
+        if (current and current.skill_id == skill_id and not current.stale and not current.cancelled.is_set()
+                and current.question_id() not in answered_ids):
+            return  # Already fetching (or holding) this skill's next question
+        if current:
+            self.cancel(user_id)
+
+        slot = Prefetch(user_id, skill_id)
+        slot.task = asyncio.get_running_loop().create_task(self._run(slot))
+        self.slots[user_id] = slot
+        self.counters["scheduled"] += 1
+
+    async def _run(self, slot: Prefetch) -> Optional[Dict]:
+        try:
+            result = await asyncio.to_thread(_prepare, slot.user_id, slot.skill_id, slot.cancelled)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Question prefetch failed for user %s: %s", slot.user_id, e)
+            return None
+        if result:
+            self.counters[result["source"]] += 1
+            if result["question_id"] is None:
+                return None
+        return result
+
+    def cancel(self, user_id: int) -> bool:
+        slot = self.slots.pop(user_id, None)
+        if not slot:
+            return False
+        slot.cancel()
+        self.counters["cancelled"] += 1
+        return True
+
+    def cancel_all(self):
+        for user_id in list(self.slots):
+            self.cancel(user_id)
+
+    async def take(self, user_id: int, skill_id: Optional[int] = None) -> Optional[int]:
+        """Claim the prefetched question id, if one exists for this skill (any skill when None)"""
+        slot = self.slots.get(user_id)
+        if not slot or (skill_id is not None and slot.skill_id != skill_id):
+            self.counters["misses"] += 1
+            return None
+        if slot.stale:
+            self.cancel(user_id)
+            self.counters["misses"] += 1
+            return None
+
+        self.slots.pop(user_id, None)
+        try:
+            result = await asyncio.shield(slot.task)
+        except (asyncio.CancelledError, Exception):
+            result = None
+        if not result:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        return result["question_id"]
+
+    def status(self, user_id: int) -> Optional[Dict]:
+        slot = self.slots.get(user_id)
+        return slot.describe() if slot else None
+
+
+prefetcher = QuestionPrefetcher()
@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hmac
+import threading
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ------------------------------
+# Profiling settings
+# ------------------------------
+# Off by default: the middleware and SQL hooks are only installed when this is on
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+# Admin trigger: a request carrying X-Profile: <token> is always profiled (unset = no header trigger)
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+# Fraction of matching requests profiled at random
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Matching requests still running after this long are sampled from then on, and kept (0 = off)
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+# Comma-separated path prefixes the sampling and latency triggers apply to (empty = every path)
+PROFILE_PATHS = [prefix.strip() for prefix in os.getenv("PROFILE_PATHS", "").split(",") if prefix.strip()]
+# Stack sampling period; the GIL switch interval (5 ms) is the practical floor
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Where profiles go, and how many are kept before the oldest are deleted
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_RETAIN = int(os.getenv("PROFILE_RETAIN", "200"))
+
+PROFILE_HEADER = b"x-profile"
+
+# The profile of the request running in this context, if any
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+def _frame_label(code) -> str:
+    # Folded stacks use ';' between frames and ' ' before the count
+    location = "/".join(code.co_filename.replace("\\", "/").rsplit("/", 2)[-2:])
+    return f"{code.co_name} ({location}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _sql_label(statement: str) -> str:
+    return "[SQL] " + " ".join(statement.split())[:120].replace(";", ",")
+
+
+# ------------------------------
+# Per-request profile
+# ------------------------------
+class RequestProfile:
+    """
+    Statistical profile of one request: a sampler thread reads the stacks of
+    the threads serving it every PROFILE_INTERVAL_MS and counts identical
+    stacks (folded / collapsed format, ready for flamegraph.pl, inferno or
+    speedscope). That is the event loop thread plus any threadpool thread
+    seen running SQL for the request (sync dependencies and routes). Async
+    handlers share the loop, so samples taken while the request awaits show
+    whatever else the loop was running.
+
+    The sampler may start after the request (latency-triggered profiles only
+    sample once the request is past PROFILE_SLOW_MS); sampling_from_ms in
+    the summary says when it did.
+    """
+
+    def __init__(self, method: str, path: str, query: str, reason: str):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.reason = reason
+        self.profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{method}-{path.strip('/').replace('/', '_') or 'root'}"
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.sql: Dict[str, List[float]] = {}  # statement -> [count, total seconds]
+        self.sql_active: Dict[int, str] = {}  # thread id -> statement in flight
+        self.started = time.perf_counter()
+        self.sampling_from_ms = None
+        self.elapsed_ms = 0.0
+        self.status = None
+        self.thread_ids = {threading.get_ident()}
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+
+    def start(self):
+        if not self._stop.is_set():
+            self.sampling_from_ms = (time.perf_counter() - self.started) * 1000
+            self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler.ident is not None:
+            self._sampler.join()
+        self.elapsed_ms = (time.perf_counter() - self.started) * 1000
+
+    def _sample(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+            for thread_id in tuple(self.thread_ids):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                stack.reverse()
+                sql = self.sql_active.get(thread_id)
+                if sql:
+                    # A leaf frame for the statement in flight shows where database time goes
+                    stack.append(sql)
+                key = ";".join(stack)
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def record_sql(self, statement: str, seconds: float):
+        entry = self.sql.setdefault(" ".join(statement.split()), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def summary(self) -> Dict:
+        statements = sorted(self.sql.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "reason": self.reason,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "samples": self.samples,
+            "sampling_from_ms": round(self.sampling_from_ms, 2) if self.sampling_from_ms is not None else None,
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "sql": {
+                "queries": sum(count for count, _ in self.sql.values()),
+                "total_ms": round(sum(seconds for _, seconds in self.sql.values()) * 1000, 2),
+                "statements": [
+                    {"statement": statement, "count": count, "total_ms": round(seconds * 1000, 3)}
+                    for statement, (count, seconds) in statements
+                ]
+            }
+        }
+
+
+def write_profile(profile: RequestProfile, directory: str = PROFILE_DIR, retain: int = PROFILE_RETAIN):
+    """Write <id>.folded and <id>.json, then delete the oldest profiles beyond the newest `retain`"""
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, profile.profile_id)
+    with open(base + ".folded", "w", encoding="utf-8") as f:
+        f.write(profile.folded())
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(profile.summary(), f, indent=2)
+
+    # Ids start with a UTC timestamp, so name order is age order
+    ids = sorted({name.rsplit(".", 1)[0] for name in os.listdir(directory) if name.endswith((".folded", ".json"))})
+    for stale in ids[:max(0, len(ids) - retain)]:
+        for suffix in (".folded", ".json"):
+            try:
+                os.remove(os.path.join(directory, stale + suffix))
+            except FileNotFoundError:
+                pass
+
+
+# ------------------------------
+# SQL timing
+# ------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active.get()
+    if profile is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+        thread_id = threading.get_ident()
+        profile.thread_ids.add(thread_id)
+        profile.sql_active[thread_id] = _sql_label(statement)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.record_sql(statement, time.perf_counter() - starts.pop())
+        profile.sql_active.pop(threading.get_ident(), None)
+
+
+_sql_hooks_installed = False
+
+
+def install_sql_hooks():
+    """Time every statement run on behalf of a profiled request (installed once, only when profiling is on)"""
+    global _sql_hooks_installed
+    if not _sql_hooks_installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _sql_hooks_installed = True
+
+
+# ------------------------------
+# Middleware
+# ------------------------------
+class ProfilingMiddleware:
+    """
+    Profiles requests picked by the admin header, random sampling or the
+    latency threshold and writes them to PROFILE_DIR. Only added to the app
+    when PROFILING_ENABLED is on, so a disabled deployment runs none of it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        install_sql_hooks()
+
+    def _reason(self, scope) -> Optional[str]:
+        if PROFILE_ADMIN_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    if hmac.compare_digest(value.decode("latin-1"), PROFILE_ADMIN_TOKEN):
+                        return "header"
+                    break
+        if PROFILE_PATHS and not scope["path"].startswith(tuple(PROFILE_PATHS)):
+            return None
+        if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            return "sampled"
+        if PROFILE_SLOW_MS > 0:
+            return "slow"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reason = self._reason(scope)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), reason)
+
+        def keep() -> bool:
+            return reason != "slow" or (time.perf_counter() - profile.started) * 1000 >= PROFILE_SLOW_MS
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                if keep():
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.profile_id.encode())]}
+            await send(message)
+
+        token = _active.set(profile)
+        if reason == "slow":
+            # Most requests finish under the threshold; only the ones still
+            # running at it pay for a sampler thread
+            timer = asyncio.get_running_loop().call_later(PROFILE_SLOW_MS / 1000, profile.start)
+        else:
+            timer = None
+            profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            kept = keep()
+            if timer is not None:
+                timer.cancel()
+            profile.stop()
+            _active.reset(token)
+            if kept:
+                try:
+                    await asyncio.to_thread(write_profile, profile)
+                except OSError as e:
+                    print(f"[WARNING] Could not write profile {profile.profile_id}: {e}")
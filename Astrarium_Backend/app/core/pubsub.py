@@ -0,0 +1,159 @@
+import os
+import asyncio
+import threading
+from itertools import chain
+from typing import Dict, List, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.alien_pet import AlienPet
+from app.models.skill import UserSkill
+from app.core.invalidation import bus, on_invalidation, publish_invalidation
+
+QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))
+
+
+class Subscription:
+    """One connected client: a bounded queue plus a flag set when events were dropped"""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.lagged = False
+
+    def offer(self, event_data: Dict):
+        # Runs on the subscriber's loop. A slow client never blocks publishers:
+        # when its queue is full the oldest event is dropped and the client is
+        # told to resync from the REST endpoints.
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.lagged = True
+        self.queue.put_nowait(event_data)
+
+
+class StateBroker:
+    """In-process pub/sub of pet and skill deltas, keyed by user"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.user_id)
+            if subs:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.user_id]
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return user_id in self._subscribers
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, user_id: int, event_data: Dict):
+        """Safe to call from the event loop or from worker threads"""
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for subscription in subs:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is subscription.loop:
+                subscription.offer(event_data)
+            else:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event_data)
+
+
+state_broker = StateBroker()
+
+
+def wants_deltas(user_id: int) -> bool:
+    """Subscribers may be connected to another worker, so multi-worker mode always forwards"""
+    return bus is not None or state_broker.has_subscribers(user_id)
+
+
+def publish_state_delta(user_id: int, delta: Dict):
+    """Deliver a delta to this worker's subscribers and forward it to the other workers"""
+    state_broker.publish(user_id, delta)
+    publish_invalidation("state_delta", str(user_id), delta)
+
+
+@on_invalidation("state_delta")
+def _forward_remote_delta(key, payload, seq, created):
+    state_broker.publish(int(key), payload)
+
+
+# ------------------------------
+# Delta payloads
+# ------------------------------
+def pet_delta(pet: AlienPet) -> Dict:
+    return {
+        "type": "pet",
+        "pet_id": pet.id,
+        "mood": pet.mood.value if pet.mood else None,
+        "luminosity": pet.luminosity,
+        "energy": pet.energy,
+        "knowledge_hunger": pet.knowledge_hunger,
+        "cosmic_resonance": pet.cosmic_resonance,
+        "level": pet.level,
+        "experience": pet.experience,
+        "evolution_stage": pet.evolution_stage.value if pet.evolution_stage else None
+    }
+
+
+def skill_delta(skill: UserSkill) -> Dict:
+    return {
+        "type": "skill",
+        "skill_id": skill.id,
+        "health_score": skill.health_score,
+        "star_power": skill.star_power,
+        "last_practiced": skill.last_practiced,
+        "next_review_date": skill.next_review_date,
+        "review_interval_days": skill.review_interval_days,
+        "consecutive_correct": skill.consecutive_correct,
+        "urgency_tier": skill.urgency_tier
+    }
+
+
+# ------------------------------
+# Publish committed pet/skill changes
+# ------------------------------
+@event.listens_for(Session, "after_flush")
+def _collect_deltas(session, flush_context):
+    if bus is None and not state_broker._subscribers:
+        return
+    pending: List = session.info.setdefault("state_deltas", [])
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, AlienPet) and wants_deltas(obj.user_id):
+            pending.append((obj.user_id, pet_delta(obj)))
+        elif isinstance(obj, UserSkill) and wants_deltas(obj.user_id):
+            pending.append((obj.user_id, skill_delta(obj)))
+    for obj in session.deleted:
+        if isinstance(obj, UserSkill) and wants_deltas(obj.user_id):
+            pending.append((obj.user_id, {"type": "skill_deleted", "skill_id": obj.id}))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_deltas(session):
+    for user_id, delta in session.info.pop("state_deltas", ()):
+        publish_state_delta(user_id, delta)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deltas(session):
+    session.info.pop("state_deltas", None)
@@ -0,0 +1,186 @@
+import os
+import re
+import hashlib
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.question import Question
+from app.core.invalidation import on_invalidation, publish_invalidation
+from app.core.jobs import job_handler
+
+# ------------------------------
+# MinHash / LSH settings
+# ------------------------------
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_DUPLICATE_THRESHOLD", "0.6"))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _make_permutations() -> List[Tuple[int, int]]:
+    """Deterministic (a, b) pairs so signatures are stable across restarts"""
+    perms = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"astrarium-perm-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little") % _MERSENNE_PRIME or 1
+        b = int.from_bytes(digest[8:], "little") % _MERSENNE_PRIME
+        perms.append((a, b))
+    return perms
+
+
+_PERMUTATIONS = _make_permutations()
+
+
+def shingles(text: str) -> Set[str]:
+    """Word bigram shingles of the normalized text (unigrams for one-word text)"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < 2:
+        return set(tokens)
+    return {f"{tokens[i]} {tokens[i + 1]}" for i in range(len(tokens) - 1)}
+
+
+def minhash_signature(shingle_set: Set[str]) -> Tuple[int, ...]:
+    """Compute a MinHash signature with NUM_PERM universal hash permutations"""
+    if not shingle_set:
+        return tuple([_MAX_HASH] * NUM_PERM)
+    hashed = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little")
+        for s in shingle_set
+    ]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashed)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _SkillBank:
+    """LSH buckets and shingle sets for the questions of one skill"""
+
+    def __init__(self):
+        self.buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(NUM_BANDS)]
+        self.shingles: Dict[int, Set[str]] = {}
+
+    def add(self, question_id: int, shingle_set: Set[str], signature: Tuple[int, ...]):
+        if question_id in self.shingles:
+            return
+        self.shingles[question_id] = shingle_set
+        for band in range(NUM_BANDS):
+            key = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            self.buckets[band].setdefault(key, []).append(question_id)
+
+    def candidates(self, signature: Tuple[int, ...]) -> Set[int]:
+        found = set()
+        for band in range(NUM_BANDS):
+            key = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            found.update(self.buckets[band].get(key, ()))
+        return found
+
+
+class QuestionSimilarityIndex:
+    """
+    Near-duplicate index over Question.question_text, scoped per skill.
+
+    Each skill's bank is loaded lazily from the questions table the first time
+    it is queried, then kept current with add() as new questions are inserted.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._banks: Dict[int, _SkillBank] = {}
+        self._lock = threading.Lock()
+
+    def _load_bank(self, db: Session, skill_id: int) -> _SkillBank:
+        bank = self._banks.get(skill_id)
+        if bank is not None:
+            return bank
+
+        rows = db.query(Question.id, Question.question_text).filter(
+            Question.skill_id == skill_id
+        ).all()
+
+        bank = _SkillBank()
+        for question_id, text in rows:
+            shingle_set = shingles(text)
+            bank.add(question_id, shingle_set, minhash_signature(shingle_set))
+
+        with self._lock:
+            return self._banks.setdefault(skill_id, bank)
+
+    def find_duplicate(self, db: Session, skill_id: int, question_text: str) -> Optional[int]:
+        """Return the id of a stored near-duplicate question, or None"""
+        bank = self._load_bank(db, skill_id)
+        shingle_set = shingles(question_text)
+        signature = minhash_signature(shingle_set)
+
+        best_id, best_score = None, self.threshold
+        for question_id in bank.candidates(signature):
+            score = jaccard(shingle_set, bank.shingles[question_id])
+            if score >= best_score:
+                best_id, best_score = question_id, score
+        return best_id
+
+    def add(self, db: Session, skill_id: int, question_id: int, question_text: str):
+        """Fold a newly inserted question into its skill's bank"""
+        bank = self._load_bank(db, skill_id)
+        shingle_set = shingles(question_text)
+        with self._lock:
+            bank.add(question_id, shingle_set, minhash_signature(shingle_set))
+        # Other workers reload the bank on next use
+        publish_invalidation("question_pool", str(skill_id))
+
+    def forget_skill(self, skill_id: int):
+        """Drop a skill's bank (e.g. after the skill is deleted)"""
+        self.drop_local(skill_id)
+        publish_invalidation("question_pool", str(skill_id))
+
+    def drop_local(self, skill_id: Optional[int] = None):
+        """Drop one bank, or every bank, from this worker only"""
+        with self._lock:
+            if skill_id is None:
+                self._banks = {}
+            else:
+                self._banks.pop(skill_id, None)
+
+    def rebuild(self, db: Session) -> Dict:
+        """Rebuild every bank from the questions table"""
+        banks: Dict[int, _SkillBank] = {}
+        rows = db.query(Question.id, Question.skill_id, Question.question_text).yield_per(1000)
+        total = 0
+        for question_id, skill_id, text in rows:
+            shingle_set = shingles(text)
+            banks.setdefault(skill_id, _SkillBank()).add(
+                question_id, shingle_set, minhash_signature(shingle_set)
+            )
+            total += 1
+
+        with self._lock:
+            self._banks = banks
+        publish_invalidation("question_pool", "*")
+
+        return {"skills_indexed": len(banks), "questions_indexed": total}
+
+
+# Shared process-wide index
+question_index = QuestionSimilarityIndex()
+
+
+@on_invalidation("question_pool")
+def _drop_remote_bank(key, payload, seq, created):
+    question_index.drop_local(None if key == "*" else int(key))
+
+
+@job_handler("question_index_rebuild")
+def rebuild_question_index_job(db: Session, payload: Dict) -> Dict:
+    return question_index.rebuild(db)
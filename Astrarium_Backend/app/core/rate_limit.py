@@ -0,0 +1,250 @@
+import os
+import json
+import math
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.core.invalidation import MULTI_WORKER
+
+# ------------------------------
+# Rules
+# ------------------------------
+class RateLimitRule:
+    """Token-bucket limits for one route: a bucket per client plus one shared global bucket"""
+
+    def __init__(
+        self,
+        user_per_minute: float,
+        user_burst: int,
+        global_per_minute: Optional[float] = None,
+        global_burst: Optional[int] = None
+    ):
+        self.user_rate = user_per_minute / 60.0
+        self.user_burst = user_burst
+        self.global_rate = global_per_minute / 60.0 if global_per_minute else None
+        self.global_burst = global_burst or user_burst
+
+    @classmethod
+    def from_dict(cls, cfg: Dict) -> "RateLimitRule":
+        return cls(
+            user_per_minute=float(cfg["user_per_minute"]),
+            user_burst=int(cfg.get("user_burst", cfg["user_per_minute"])),
+            global_per_minute=cfg.get("global_per_minute"),
+            global_burst=cfg.get("global_burst")
+        )
+
+
+DEFAULT_RULES = {
+    "/questions/generate": RateLimitRule(user_per_minute=10, user_burst=5, global_per_minute=120, global_burst=30),
+    "/questions/next": RateLimitRule(user_per_minute=10, user_burst=5, global_per_minute=120, global_burst=30),
+    "/questions/answer": RateLimitRule(user_per_minute=30, user_burst=10, global_per_minute=600, global_burst=100),
+    "/questions/answer/batch": RateLimitRule(user_per_minute=6, user_burst=3, global_per_minute=120, global_burst=20),
+    "/export": RateLimitRule(user_per_minute=2, user_burst=2, global_per_minute=20, global_burst=5),
+}
+
+
+def load_rules_from_env() -> Dict[str, RateLimitRule]:
+    """
+    RATE_LIMITS overrides the defaults with a JSON object keyed by route path, e.g.
+    {"/questions/generate": {"user_per_minute": 10, "user_burst": 5,
+                             "global_per_minute": 120, "global_burst": 30}}
+    """
+    raw = os.getenv("RATE_LIMITS")
+    if not raw:
+        return dict(DEFAULT_RULES)
+    return {path: RateLimitRule.from_dict(cfg) for path, cfg in json.loads(raw).items()}
+
+
+# A bucket request is (key, rate per second, burst capacity)
+BucketSpec = Tuple[str, float, int]
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: int) -> float:
+    return min(burst, tokens + (now - updated) * rate)
+
+
+def _retry_after(tokens: float, rate: float) -> float:
+    return (1 - tokens) / rate if rate > 0 else 60.0
+
+
+# ------------------------------
+# Bucket stores
+# ------------------------------
+# How often the stores drop buckets that have refilled
+EVICT_INTERVAL_SECONDS = float(os.getenv("RATE_LIMIT_EVICT_INTERVAL", "60"))
+
+
+class MemoryBucketStore:
+    """Bucket state in process memory (one set of buckets per worker)"""
+
+    # acquire() never waits on I/O, so the middleware calls it inline
+    blocking = False
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}  # key -> (tokens, updated, full at)
+        self._lock = threading.Lock()
+        self._next_evict = time.monotonic() + EVICT_INTERVAL_SECONDS
+
+    def _evict(self, now: float):
+        # A full bucket behaves exactly like a missing one, so idle callers cost no memory
+        for key in [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+        self._next_evict = now + EVICT_INTERVAL_SECONDS
+
+    def acquire(self, specs: List[BucketSpec]) -> float:
+        """Take one token from every bucket, or none. Returns 0 on success, else seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_evict:
+                self._evict(now)
+            levels = []
+            wait = 0.0
+            for key, rate, burst in specs:
+                tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+                tokens = _refill(tokens, updated, now, rate, burst)
+                levels.append(tokens)
+                if tokens < 1:
+                    wait = max(wait, _retry_after(tokens, rate))
+
+            if wait > 0:
+                return wait
+
+            for (key, rate, burst), tokens in zip(specs, levels):
+                full_at = now + (burst - tokens + 1) / rate if rate > 0 else math.inf
+                self._buckets[key] = (tokens - 1, now, full_at)
+            return 0.0
+
+
+class SQLiteBucketStore:
+    """Bucket state in a SQLite file shared by every worker on the host"""
+
+    # acquire() can wait up to the busy timeout for the write lock, so it runs off the event loop
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._next_evict = time.time() + EVICT_INTERVAL_SECONDS
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(rate_buckets)")}
+        if "full_at" not in columns:
+            # Rows from before the column count as full: at worst a caller's bucket resets once
+            try:
+                conn.execute("ALTER TABLE rate_buckets ADD COLUMN full_at REAL NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass  # Another worker added it first
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, specs: List[BucketSpec]) -> float:
+        # Wall clock, since monotonic clocks are not comparable across processes
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if now >= self._next_evict:
+                # A full bucket behaves exactly like a missing one, so idle callers cost no rows
+                conn.execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,))
+                self._next_evict = now + EVICT_INTERVAL_SECONDS
+            levels = []
+            wait = 0.0
+            for key, rate, burst in specs:
+                row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row else (burst, now)
+                tokens = _refill(tokens, updated, now, rate, burst)
+                levels.append(tokens)
+                if tokens < 1:
+                    wait = max(wait, _retry_after(tokens, rate))
+
+            if wait == 0:
+                conn.executemany(
+                    "INSERT INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET "
+                    "tokens = excluded.tokens, updated = excluded.updated, full_at = excluded.full_at",
+                    [
+                        (key, tokens - 1, now, now + (burst - tokens + 1) / rate if rate > 0 else math.inf)
+                        for (key, rate, burst), tokens in zip(specs, levels)
+                    ]
+                )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def load_store_from_env():
+    """RATE_LIMIT_SQLITE_PATH switches to the shared SQLite store for multi-worker deployments"""
+    path = os.getenv("RATE_LIMIT_SQLITE_PATH")
+    if not path and MULTI_WORKER:
+        path = "./rate_limits.db"
+    if path:
+        return SQLiteBucketStore(path)
+    return MemoryBucketStore()
+
+
+# ------------------------------
+# ASGI middleware
+# ------------------------------
+def client_key(scope) -> str:
+    """
+    Identify the caller by client IP. Nothing the client sends (such as a user
+    id header) is trusted, or rotating it would get a fresh bucket each time.
+    Behind a proxy, run uvicorn with --proxy-headers so this is the real client.
+    """
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    """Rejects over-limit requests to configured routes with 429 + Retry-After"""
+
+    def __init__(self, app, rules: Optional[Dict[str, RateLimitRule]] = None, store=None):
+        self.app = app
+        self.rules = rules if rules is not None else load_rules_from_env()
+        self.store = store or load_store_from_env()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        rule = self.rules.get(path)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        specs: List[BucketSpec] = [(f"{path}|{client_key(scope)}", rule.user_rate, rule.user_burst)]
+        if rule.global_rate:
+            specs.append((f"{path}|global", rule.global_rate, rule.global_burst))
+
+        if self.store.blocking:
+            wait = await asyncio.to_thread(self.store.acquire, specs)
+        else:
+            wait = self.store.acquire(specs)
+        if wait > 0:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "🌠 Too many requests - the cosmos needs a moment. Please slow down!"},
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
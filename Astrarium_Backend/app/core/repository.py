@@ -0,0 +1,135 @@
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import lambda_stmt, select, func, and_, or_, tuple_
+from sqlalchemy.orm import Session, configure_mappers
+
+from app.database import SessionLocal, ReadSessionLocal, engine, read_engine
+from app.models.user import User
+from app.models.skill import UserSkill
+from app.models.alien_pet import AlienPet
+
+# Prime mappers and statement caches before the worker takes traffic
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# ------------------------------
+# Hot-path lookups
+# ------------------------------
+# Every request runs some of these. They are lambda statements: the lambda's
+# code location is the cache key, so the statement is built once per process
+# and its compiled SQL always hits the engine cache. Closure variables become
+# bound parameters.
+
+def current_user(db: Session) -> Optional[User]:
+    """The signed-in user (auth stub: the first registered user)"""
+    return db.execute(lambda_stmt(lambda: select(User).order_by(User.id).limit(1))).scalars().first()
+
+
+def user_by_id(db: Session, user_id: int) -> Optional[User]:
+    return db.execute(lambda_stmt(lambda: select(User).where(User.id == user_id))).scalars().first()
+
+
+def skill_for_user(db: Session, skill_id: int, user_id: int) -> Optional[UserSkill]:
+    """A skill by id, only if it belongs to user_id"""
+    return db.execute(lambda_stmt(
+        lambda: select(UserSkill).where(UserSkill.id == skill_id, UserSkill.user_id == user_id)
+    )).scalars().first()
+
+
+def pet_for_user(db: Session, user_id: int) -> Optional[AlienPet]:
+    return db.execute(lambda_stmt(lambda: select(AlienPet).where(AlienPet.user_id == user_id))).scalars().first()
+
+
+# Due = next review at or before now, or never reviewed. Ordered never-reviewed
+# first, then by next review date (the /skills/due-today keyset order).
+def count_due_skills(db: Session, user_id: int, now: datetime) -> int:
+    return db.execute(lambda_stmt(
+        lambda: select(func.count(UserSkill.id)).where(
+            UserSkill.user_id == user_id,
+            (UserSkill.next_review_date <= now) | (UserSkill.next_review_date == None)
+        )
+    )).scalar()
+
+
+def next_due_skill_id(db: Session, user_id: int, now: datetime) -> Optional[int]:
+    return db.execute(lambda_stmt(
+        lambda: select(UserSkill.id).where(
+            UserSkill.user_id == user_id,
+            (UserSkill.next_review_date <= now) | (UserSkill.next_review_date == None)
+        ).order_by(
+            UserSkill.next_review_date != None,
+            UserSkill.next_review_date.asc(),
+            UserSkill.id.asc()
+        ).limit(1)
+    )).scalar()
+
+
+def due_skills_page(db: Session, user_id: int, now: datetime, limit: int, after: Optional[Tuple] = None) -> List:
+    """
+    One page of due skills (id, name, category, schedule and health),
+    starting after the (next_review_date, id) keyset position `after`
+    """
+    stmt = lambda_stmt(
+        lambda: select(
+            UserSkill.id,
+            UserSkill.skill_name,
+            UserSkill.category,
+            UserSkill.next_review_date,
+            UserSkill.review_interval_days,
+            UserSkill.consecutive_correct,
+            UserSkill.health_score
+        ).where(
+            UserSkill.user_id == user_id,
+            (UserSkill.next_review_date <= now) | (UserSkill.next_review_date == None)
+        )
+    )
+    if after:
+        last_date, last_id = after
+        # NULL dates sort first, so a cursor on a NULL date still has every dated skill ahead of it
+        if last_date is None:
+            stmt += lambda s: s.where(or_(
+                and_(UserSkill.next_review_date == None, UserSkill.id > last_id),
+                UserSkill.next_review_date != None
+            ))
+        else:
+            stmt += lambda s: s.where(
+                tuple_(UserSkill.next_review_date, UserSkill.id) > tuple_(last_date, last_id)
+            )
+    stmt += lambda s: s.order_by(
+        UserSkill.next_review_date != None,
+        UserSkill.next_review_date.asc(),
+        UserSkill.id.asc()
+    ).limit(limit)
+    return db.execute(stmt).all()
+
+
+# ------------------------------
+# Startup warm-up
+# ------------------------------
+def warm_up() -> Dict:
+    """
+    Configure every mapper and run each hot-path statement once per engine
+    (with ids that match nothing), so the first real requests find the
+    lambda and compiled caches filled and a pooled connection open.
+    """
+    started = time.perf_counter()
+    configure_mappers()
+    now = datetime.utcnow()
+    factories = [SessionLocal] if read_engine is engine else [SessionLocal, ReadSessionLocal]
+    for factory in factories:
+        db = factory()
+        try:
+            current_user(db)
+            user_by_id(db, 0)
+            skill_for_user(db, 0, 0)
+            pet_for_user(db, 0)
+            count_due_skills(db, 0, now)
+            next_due_skill_id(db, 0, now)
+            due_skills_page(db, 0, now, 1)
+            due_skills_page(db, 0, now, 1, after=(None, 0))
+            due_skills_page(db, 0, now, 1, after=(now, 0))
+        finally:
+            db.close()
+    return {"engines": len(factories), "seconds": round(time.perf_counter() - started, 4)}
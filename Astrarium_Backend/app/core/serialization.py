@@ -0,0 +1,35 @@
+from typing import Dict
+
+from fastapi.responses import JSONResponse
+
+# orjson is optional - fall back to the stdlib encoder when it isn't installed
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    orjson = None
+    FastJSONResponse = JSONResponse
+
+
+def skill_row_to_dict(row) -> Dict:
+    """
+    Serialize a projected UserSkill row straight to the SkillResponse shape.
+
+    Skips building a Pydantic model per row; the spaced repetition fields
+    carry SkillResponse's defaults, matching what the list endpoints have
+    always returned.
+    """
+    return {
+        "id": row.id,
+        "skill_name": row.skill_name,
+        "category": row.category,
+        "proficiency_level": row.proficiency_level,
+        "health_score": row.health_score,
+        "star_power": row.star_power,
+        "last_practiced": row.last_practiced,
+        "created_at": row.created_at,
+        "next_review_date": None,
+        "review_interval_days": 1.0,
+        "ease_factor": 2.5,
+        "consecutive_correct": 0
+    }
@@ -0,0 +1,136 @@
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func, select, update, delete
+from sqlalchemy.orm import Session
+
+from app.database import engine, upsert
+from app.models.llm_usage import LLMUsageDaily, USAGE_BUCKET_KEY
+
+# Per-user daily token budget (prompt + completion). 0 disables enforcement.
+DAILY_TOKEN_BUDGET = int(os.getenv("LLM_DAILY_TOKEN_BUDGET", "50000"))
+
+
+def record_usage(
+    user_id: Optional[int],
+    skill_id: Optional[int],
+    endpoint: str,
+    operation: str,
+    usage
+):
+    """Fold one call's response.usage into today's accounting bucket"""
+    if usage is None:
+        return
+
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    today = datetime.utcnow().date()
+
+    usage_table = LLMUsageDaily.__table__
+    try:
+        # One atomic upsert: concurrent calls for the same bucket all add up
+        with engine.begin() as connection:
+            stmt = upsert(connection, usage_table).values(
+                day=today,
+                user_id=user_id,
+                skill_id=skill_id,
+                endpoint=endpoint,
+                operation=operation,
+                calls=1,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens
+            )
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=list(USAGE_BUCKET_KEY),
+                set_={
+                    "calls": usage_table.c.calls + 1,
+                    "prompt_tokens": usage_table.c.prompt_tokens + stmt.excluded.prompt_tokens,
+                    "completion_tokens": usage_table.c.completion_tokens + stmt.excluded.completion_tokens
+                }
+            ))
+    except Exception as e:
+        print(f"[WARNING] Failed to record token usage: {e}")
+
+
+def usage_recorder(user_id: Optional[int], skill_id: Optional[int], operation: str):
+    """An LLMRouter on_usage callback booking every completed call, hedge losers included"""
+    def on_usage(endpoint, response):
+        record_usage(user_id, skill_id, endpoint.name, operation, getattr(response, "usage", None))
+    return on_usage
+
+
+def merge_duplicate_buckets():
+    """
+    Fold rows that share a bucket key into the oldest one. Databases written
+    before the key index existed can hold such duplicates (NULL user or skill
+    ids slipped past the old unique constraint), and the index can't be built
+    over them. Run before ensure_indexes().
+    """
+    usage_table = LLMUsageDaily.__table__
+    key = [column.label(f"key_{i}") for i, column in enumerate(USAGE_BUCKET_KEY)]
+    with engine.begin() as connection:
+        groups = connection.execute(
+            select(
+                func.min(usage_table.c.id),
+                func.sum(usage_table.c.calls),
+                func.sum(usage_table.c.prompt_tokens),
+                func.sum(usage_table.c.completion_tokens),
+                *key
+            ).group_by(*USAGE_BUCKET_KEY).having(func.count() > 1)
+        ).all()
+        for keep_id, calls, prompt_tokens, completion_tokens, *values in groups:
+            connection.execute(
+                delete(usage_table).where(
+                    *[column == value for column, value in zip(USAGE_BUCKET_KEY, values)],
+                    usage_table.c.id != keep_id
+                )
+            )
+            connection.execute(
+                update(usage_table).where(usage_table.c.id == keep_id).values(
+                    calls=calls, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+                )
+            )
+
+
+def tokens_used_today(db: Session, user_id: int, operation: Optional[str] = None) -> int:
+    query = db.query(
+        func.coalesce(func.sum(LLMUsageDaily.prompt_tokens + LLMUsageDaily.completion_tokens), 0)
+    ).filter(
+        LLMUsageDaily.user_id == user_id,
+        LLMUsageDaily.day == datetime.utcnow().date()
+    )
+    if operation is not None:
+        query = query.filter(LLMUsageDaily.operation == operation)
+    return int(query.scalar() or 0)
+
+
+def over_budget(db: Session, user_id: int) -> bool:
+    if DAILY_TOKEN_BUDGET <= 0:
+        return False
+    return tokens_used_today(db, user_id) >= DAILY_TOKEN_BUDGET
+
+
+def usage_summary(db: Session, user_id: int) -> Dict:
+    """Today's spend for a user, broken down by operation and endpoint"""
+    rows = db.query(LLMUsageDaily).filter(
+        LLMUsageDaily.user_id == user_id,
+        LLMUsageDaily.day == datetime.utcnow().date()
+    ).all()
+
+    by_operation: Dict[str, int] = {}
+    by_endpoint: Dict[str, int] = {}
+    for row in rows:
+        tokens = row.prompt_tokens + row.completion_tokens
+        by_operation[row.operation] = by_operation.get(row.operation, 0) + tokens
+        by_endpoint[row.endpoint] = by_endpoint.get(row.endpoint, 0) + tokens
+
+    used = sum(by_operation.values())
+    return {
+        "tokens_used_today": used,
+        "daily_budget": DAILY_TOKEN_BUDGET or None,
+        "remaining": max(0, DAILY_TOKEN_BUDGET - used) if DAILY_TOKEN_BUDGET > 0 else None,
+        "calls_today": sum(row.calls for row in rows),
+        "by_operation": by_operation,
+        "by_endpoint": by_endpoint
+    }
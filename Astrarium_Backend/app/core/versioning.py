@@ -0,0 +1,134 @@
+import time
+import hashlib
+import threading
+from itertools import chain
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Set, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.alien_pet import AlienPet
+from app.models.skill import UserSkill
+from app.core.invalidation import bus, on_invalidation, publish_invalidation
+
+# Distinguishes ETags issued by this process from ones issued before a restart.
+# In multi-worker mode every worker shares the bus id, so tags match across workers.
+_BOOT_ID = bus.bus_id if bus else hashlib.blake2b(str(time.time_ns()).encode(), digest_size=4).hexdigest()
+
+
+class StateVersions:
+    """
+    Per-user version counters for cacheable state ("pet", "skills").
+
+    In multi-worker mode versions are invalidation-bus sequence numbers, and
+    keys this worker has not seen change start at the bus position at boot.
+    Sequence numbers are global and increasing, so a tag issued by any worker
+    before this one started can never match a newer state. Versions from
+    other workers arrive with the bus poll; CacheValidators catches up on the
+    log before answering 304, so a write is never hidden behind the poll delay.
+    """
+
+    def __init__(self, base_version: int = 0):
+        self._versions: Dict[Tuple[str, int], Tuple[int, float]] = {}
+        self._base_version = base_version
+        self._boot_time = time.time()
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, user_id: int) -> Tuple[int, float]:
+        """Return (version, last modified unix time)"""
+        return self._versions.get((kind, user_id), (self._base_version, self._boot_time))
+
+    def bump(self, kind: str, user_id: int):
+        seq = publish_invalidation("state_version", f"{kind}:{user_id}")
+        with self._lock:
+            version, _ = self.get(kind, user_id)
+            self._versions[(kind, user_id)] = (max(version + 1, seq or 0), time.time())
+
+    def apply_remote(self, kind: str, user_id: int, seq: int, modified_at: float):
+        """Adopt a version published by another worker"""
+        with self._lock:
+            version, _ = self.get(kind, user_id)
+            if seq > version:
+                self._versions[(kind, user_id)] = (seq, modified_at)
+
+
+state_versions = StateVersions(base_version=bus.max_seq() if bus else 0)
+
+
+@on_invalidation("state_version")
+def _apply_remote_version(key, payload, seq, created):
+    kind, user_id = key.split(":")
+    state_versions.apply_remote(kind, int(user_id), seq, created)
+
+
+# ------------------------------
+# Bump versions whenever pets or skills are committed
+# ------------------------------
+@event.listens_for(Session, "after_flush")
+def _collect_changed_state(session, flush_context):
+    # new/dirty/deleted still show the pre-flush state here
+    pending: Set[Tuple[str, int]] = session.info.setdefault("state_version_bumps", set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, AlienPet):
+            pending.add(("pet", obj.user_id))
+        elif isinstance(obj, UserSkill):
+            pending.add(("skills", obj.user_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_state(session):
+    for kind, user_id in session.info.pop("state_version_bumps", ()):
+        state_versions.bump(kind, user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_state(session):
+    session.info.pop("state_version_bumps", None)
+
+
+# ------------------------------
+# Conditional GET helpers
+# ------------------------------
+class CacheValidators:
+    """ETag / Last-Modified for one user's state, checked against the request's conditional headers"""
+
+    def __init__(self, request: Request, kind: str, user_id: int, variant: str = ""):
+        suffix = f"-{hashlib.blake2b(variant.encode(), digest_size=4).hexdigest()}" if variant else ""
+        modified_at = self._load(kind, user_id, suffix)
+        self.not_modified = self._matches(request, modified_at)
+        if self.not_modified and bus is not None and bus.catch_up():
+            # Another worker may have committed a change this one had not polled yet
+            modified_at = self._load(kind, user_id, suffix)
+            self.not_modified = self._matches(request, modified_at)
+
+    def _load(self, kind: str, user_id: int, suffix: str) -> float:
+        version, modified_at = state_versions.get(kind, user_id)
+        self.etag = f'W/"{kind}-{user_id}-{_BOOT_ID}-{version}{suffix}"'
+        self.last_modified = formatdate(modified_at, usegmt=True)
+        return modified_at
+
+    def _matches(self, request: Request, modified_at: float) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = {tag.strip() for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag in tags or self.etag[2:] in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(modified_at) <= since
+        return False
+
+    def headers(self) -> Dict[str, str]:
+        return {"ETag": self.etag, "Last-Modified": self.last_modified, "Cache-Control": "no-cache"}
+
+    def apply(self, response: Response):
+        response.headers.update(self.headers())
+
+    def not_modified_response(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
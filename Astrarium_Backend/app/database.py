@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -8,17 +9,101 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./astral_pet.db")
 
+# Optional read replica for server databases; GET routes read from it
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+READ_POOL_SIZE = int(os.getenv("READ_POOL_SIZE", str(max(4, (os.cpu_count() or 1) * 2))))
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+# In-memory databases live inside one connection, so they can't get a second engine
+IS_SQLITE_FILE = IS_SQLITE and ":memory:" not in DATABASE_URL and DATABASE_URL.rstrip("/") != "sqlite:"
+
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False} if IS_SQLITE else {}
 )
 
+if IS_SQLITE_FILE:
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # WAL lets readers run alongside the single writer instead of waiting on it
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+# ------------------------------
+# Read-only engine
+# ------------------------------
+
+if READ_DATABASE_URL:
+    read_engine = create_engine(READ_DATABASE_URL, pool_size=READ_POOL_SIZE, pool_pre_ping=True)
+elif IS_SQLITE_FILE:
+    read_engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=READ_POOL_SIZE,
+        max_overflow=READ_POOL_SIZE
+    )
+
+    @event.listens_for(read_engine, "connect")
+    def _query_only(dbapi_connection, connection_record):
+        # Any write through the read path fails loudly instead of taking the write lock
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+else:
+    read_engine = engine
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
 def get_db():
+    """Read-write session"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Read-only session for GET routes (separate pool, replica if configured)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def upsert(connection, table):
+    """INSERT ... ON CONFLICT for the connection's dialect (SQLite and PostgreSQL share the API)"""
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+def ensure_columns():
+    """Add nullable or server-defaulted columns declared on models to tables created before they existed"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                if column.nullable:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                elif column.server_default is not None:
+                    default = column.server_default.arg
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type} NOT NULL DEFAULT {default}'))
+
+def ensure_indexes():
+    """Create indexes declared on models that predate an existing table (create_all skips those)"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                # IF NOT EXISTS rather than checkfirst: reflection can't see expression indexes
+                conn.execute(CreateIndex(index, if_not_exists=True))
@@ -1,12 +1,58 @@
 from dotenv import load_dotenv
 load_dotenv()
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.api.routes import auth, skills, questions, pets
+from app.database import engine, Base, ensure_columns, ensure_indexes
+from app.api.routes import auth, skills, questions, pets, dashboard, stream, jobs, leaderboard, export
+from app.core.ai_service import llm_router
+from app.core.token_ledger import merge_duplicate_buckets
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from app.core import decay
+from app.core.jobs import JOB_WORKERS, job_pool, run_periodic
+from app.core.invalidation import bus
+from app.core.answer_log import EVENT_SOURCED_ANSWERS, run_projector
+from app.core.prefetch import prefetcher
+from app.core.repository import WARM_UP_ON_STARTUP, warm_up
+from app.core.serialization import FastJSONResponse
+
+logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+ensure_columns()
+merge_duplicate_buckets()
+ensure_indexes()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Uvicorn accepts connections only after startup, so the first requests skip cold caches
+    if WARM_UP_ON_STARTUP:
+        logger.debug("Warmed query caches: %s", warm_up())
+    # Background maintenance tasks
+    tasks = []
+    if JOB_WORKERS > 0:
+        job_pool.start()
+        tasks.append(asyncio.create_task(run_periodic("prune_jobs", 3600)))
+        if decay.SWEEP_ENABLED:
+            tasks.append(asyncio.create_task(run_periodic("decay_sweep", decay.SWEEP_INTERVAL_SECONDS)))
+    elif decay.SWEEP_ENABLED:
+        tasks.append(asyncio.create_task(decay.run_decay_sweeper()))
+    if EVENT_SOURCED_ANSWERS:
+        tasks.append(asyncio.create_task(run_projector()))
+    # Multi-worker mode: tail the shared change log for other workers' writes
+    if bus is not None:
+        bus.start()
+    yield
+    for task in tasks:
+        task.cancel()
+    prefetcher.cancel_all()
+    job_pool.stop()
+    if bus is not None:
+        bus.stop()
 
 app = FastAPI(
     title="🌌 Astrarium - Skill Retention Companion",
@@ -21,9 +67,18 @@ app = FastAPI(
 
     Don't let your hard-earned knowledge drift into the void!
     """,
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Opt-in request profiling (innermost, so throttled requests are never profiled)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Token-bucket throttling on generation routes (added first so CORS wraps its 429s)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware (for frontend later)
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +86,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers hide non-safelisted response headers from scripts unless exposed
+    expose_headers=["ETag", "Retry-After"],
 )
 
 # Include routers
@@ -38,6 +95,11 @@ app.include_router(auth.router)
 app.include_router(skills.router)
 app.include_router(questions.router)
 app.include_router(pets.router)
+app.include_router(dashboard.router)
+app.include_router(stream.router)
+app.include_router(jobs.router)
+app.include_router(leaderboard.router)
+app.include_router(export.router)
 
 @app.get("/")
 async def root():
@@ -55,4 +117,9 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "cosmic_energy": "optimal"}
\ No newline at end of file
+    return {"status": "healthy", "cosmic_energy": "optimal"}
+
+@app.get("/health/llm")
+async def llm_health():
+    """Rolling latency and error profile of each configured LLM endpoint"""
+    return {"endpoints": llm_router.stats()}
@@ -61,10 +61,15 @@ class AlienPet(Base):
     # Visual customization (unlocked through progression)
     color_hue = Column(Integer, default=240)  # 0-360 for HSL color
     particle_effect = Column(String, default="stars")  # stars, nebula, void, etc.
+
+    # Optimistic concurrency: every ORM update checks and bumps this (app/core/concurrency.py)
+    version = Column(Integer, nullable=False, server_default="0")
     
     # Relationships
     user = relationship("User", back_populates="alien_pet")
 
+    __mapper_args__ = {"version_id_col": version}
+
     def update_mood(self):
         """Update alien mood based on stats"""
         # Handle None values for new instances
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Index
+from datetime import datetime
+from app.database import Base
+
+class AnswerEvent(Base):
+    """One graded answer, appended once and never updated (event-sourced answer mode)"""
+    __tablename__ = "answer_events"
+    __table_args__ = (
+        Index("ix_answer_events_user_seq", "user_id", "id"),
+        Index("ix_answer_events_question", "question_id"),
+    )
+
+    id = Column(Integer, primary_key=True)  # Log sequence number
+    user_id = Column(Integer, nullable=False)
+    skill_id = Column(Integer, nullable=False)
+    question_id = Column(Integer, nullable=False)
+    user_answer = Column(String, nullable=False)
+    is_correct = Column(Boolean, nullable=False)
+    xp_earned = Column(Integer, nullable=False)
+    answer_quality = Column(Integer, nullable=False)
+    time_taken_seconds = Column(Integer, nullable=True)
+    occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class StateSnapshot(Base):
+    """A user's answer-derived state after folding every event up to `seq`"""
+    __tablename__ = "state_snapshots"
+    __table_args__ = (
+        Index("ix_state_snapshots_user_seq", "user_id", "seq"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    seq = Column(Integer, nullable=False)
+    state = Column(JSON, nullable=False)
+    taken_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class ProjectionCheckpoint(Base):
+    """Last event sequence number a projector has folded into the state tables"""
+    __tablename__ = "projection_checkpoints"
+
+    name = Column(String, primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from datetime import datetime
+from app.database import Base
+
+class BackgroundJob(Base):
+    """A unit of deferred work, claimed and run by the in-process worker pool"""
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        # Claim scan: oldest runnable job first
+        Index("ix_background_jobs_status_run_after", "status", "run_after", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    key = Column(String, nullable=True, unique=True)  # Idempotency key
+    payload = Column(JSON, nullable=True)
+    status = Column(String, nullable=False, default="pending")  # pending, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    locked_by = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)
+    last_error = Column(Text, nullable=True)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index, func, literal_column
+from datetime import datetime
+from app.database import Base
+
+class LLMUsageDaily(Base):
+    """Token spend rolled up per day, user, skill, endpoint and operation"""
+    __tablename__ = "llm_usage_daily"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, default=lambda: datetime.utcnow().date())
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    skill_id = Column(Integer, nullable=True)  # Not a FK so usage survives skill deletion
+    endpoint = Column(String, nullable=False)
+    operation = Column(String, nullable=False)  # question, evaluation, hint
+    calls = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+
+
+# One row per bucket. Calls without a user or skill store NULL, and NULLs never
+# collide in a plain unique constraint, so the key compares them as 0. The
+# literal 0 (not a bound parameter) lets ON CONFLICT name this index.
+_usage = LLMUsageDaily.__table__
+USAGE_BUCKET_KEY = (
+    _usage.c.day,
+    func.coalesce(_usage.c.user_id, literal_column("0")),
+    func.coalesce(_usage.c.skill_id, literal_column("0")),
+    _usage.c.endpoint,
+    _usage.c.operation,
+)
+Index("uq_llm_usage_bucket_key", *USAGE_BUCKET_KEY, unique=True)
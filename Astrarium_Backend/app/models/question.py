@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        # Per-skill question bank lookups (stored fallbacks, prefetch reservations)
+        Index("ix_questions_skill", "skill_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     skill_id = Column(Integer, ForeignKey("user_skills.id"), nullable=False)
@@ -22,6 +26,11 @@ class Question(Base):
 
 class UserAnswer(Base):
     __tablename__ = "user_answers"
+    __table_args__ = (
+        Index("ix_user_answers_question", "question_id"),
+        # A user's latest answer (next-question prediction)
+        Index("ix_user_answers_user", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from app.database import Base
+
+class QuestionStats(Base):
+    """Running answer statistics for one stored question (kept current by app/core/difficulty.py)"""
+    __tablename__ = "question_stats"
+
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    timed_attempts = Column(Integer, nullable=False, default=0)  # Answers that reported time_taken_seconds
+    median_time_seconds = Column(Float, nullable=True)  # Interpolated from question_time_buckets
+    last_answered_at = Column(DateTime, nullable=True)
+
+class QuestionTimeBucket(Base):
+    """How many answers to a question took a time within one histogram bucket"""
+    __tablename__ = "question_time_buckets"
+
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
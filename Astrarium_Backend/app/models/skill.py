@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -6,6 +6,24 @@ from app.database import Base
 
 class UserSkill(Base):
     __tablename__ = "user_skills"
+    __table_args__ = (
+        # Keyset pagination for /skills/my-skills and /skills/due-today
+        Index("ix_user_skills_user_health", "user_id", "health_score", "id"),
+        Index("ix_user_skills_user_next_review", "user_id", "next_review_date", "id"),
+        # Decay urgency ranking in /skills/decaying and /skills/recommendations
+        Index("ix_user_skills_user_last_practiced", "user_id", "last_practiced"),
+        # Cross-user outreach lookups on the materialized urgency tier
+        Index(
+            "ix_user_skills_tier_critical", "user_id",
+            sqlite_where=text("urgency_tier = 'critical'"),
+            postgresql_where=text("urgency_tier = 'critical'")
+        ),
+        Index(
+            "ix_user_skills_tier_high", "user_id",
+            sqlite_where=text("urgency_tier = 'high'"),
+            postgresql_where=text("urgency_tier = 'high'")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -26,10 +44,19 @@ class UserSkill(Base):
     consecutive_correct = Column(Integer, default=0)  # Streak of correct answers
     consecutive_wrong = Column(Integer, default=0)  # Streak of wrong answers (for pet health)
 
+    # Materialized decay urgency, kept current by the decay sweeper (app/core/decay.py)
+    urgency_tier = Column(String, nullable=True, default="critical")  # Never practiced = critical
+    days_idle_snapshot = Column(Integer, nullable=True)  # Days idle when the tier last changed
+
+    # Optimistic concurrency: every ORM update checks and bumps this (app/core/concurrency.py)
+    version = Column(Integer, nullable=False, server_default="0")
+
     user = relationship("User", back_populates="skills")
     practice_sessions = relationship("PracticeSession", back_populates="skill", cascade="all, delete-orphan")
 
-    def calculate_next_review(self, answer_quality: int):
+    __mapper_args__ = {"version_id_col": version}
+
+    def calculate_next_review(self, answer_quality: int, now: datetime = None):
         """
         Calculate next review date using spaced repetition (SM-2 algorithm like Anki)
 
@@ -38,9 +65,13 @@ class UserSkill(Base):
         2: Hard, but recalled
         3: Good
         4-5: Easy
+
+        now: when the answer happened (defaults to the current time; replays pass the event time)
         """
         from datetime import timedelta
 
+        now = now or datetime.utcnow()
+
         if answer_quality < 2:
             # Failed - reset to beginning
             self.review_interval_days = 1.0
@@ -67,13 +98,18 @@ class UserSkill(Base):
                 self.ease_factor = self.ease_factor + 0.1
 
         # Set next review date
-        self.next_review_date = datetime.utcnow() + timedelta(days=self.review_interval_days)
-        self.last_practiced = datetime.utcnow()
+        self.next_review_date = now + timedelta(days=self.review_interval_days)
+        self.last_practiced = now
+        self.urgency_tier = "maintenance"
+        self.days_idle_snapshot = 0
 
         return self.next_review_date
 
 class PracticeSession(Base):
     __tablename__ = "practice_sessions"
+    __table_args__ = (
+        Index("ix_practice_sessions_skill_date", "skill_id", "session_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     skill_id = Column(Integer, ForeignKey("user_skills.id"), nullable=False)
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, DateTime
+from app.database import Base
+
+class SweepCheckpoint(Base):
+    """When a background sweep last completed, so the next run only handles what changed since"""
+    __tablename__ = "sweep_checkpoints"
+
+    name = Column(String, primary_key=True)
+    last_run_at = Column(DateTime, nullable=False)
@@ -0,0 +1,84 @@
+"""
+Microbenchmark: serialization cost of the skill list per 1k skills.
+
+Compares the old path (a SkillResponse model per row, jsonable_encoder and
+the stdlib JSONResponse) with the fast path (projected row -> dict and
+orjson). Runs against an in-memory SQLite database, no server needed.
+
+    python bench_serialization.py [num_skills]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.database import Base
+from app.models.user import User
+from app.models.skill import UserSkill
+from app.api.routes.skills import SkillResponse, SKILL_LIST_COLUMNS
+from app.core.serialization import FastJSONResponse, skill_row_to_dict, orjson
+
+NUM_SKILLS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+ROUNDS = 20
+
+engine = create_engine("sqlite:///:memory:")
+Base.metadata.create_all(bind=engine)
+db = sessionmaker(bind=engine)()
+
+user = User(email="bench@example.com", username="bench", hashed_password="x")
+db.add(user)
+db.flush()
+now = datetime.utcnow()
+db.add_all([
+    UserSkill(
+        user_id=user.id,
+        skill_name=f"Skill {i}",
+        category="bench",
+        proficiency_level=5.0,
+        health_score=float(i % 100),
+        star_power=50.0,
+        last_practiced=now - timedelta(days=i % 200),
+        created_at=now
+    )
+    for i in range(NUM_SKILLS)
+])
+db.commit()
+
+rows = db.query(*SKILL_LIST_COLUMNS).filter(UserSkill.user_id == user.id).all()
+
+
+def old_path():
+    models = [SkillResponse(**row._mapping) for row in rows]
+    return JSONResponse(content=jsonable_encoder(models)).body
+
+
+def fast_path():
+    return FastJSONResponse([skill_row_to_dict(row) for row in rows]).body
+
+
+def bench(fn):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) / ROUNDS
+
+
+print("=" * 60)
+print(f"SKILL LIST SERIALIZATION ({NUM_SKILLS} skills, orjson={'yes' if orjson else 'no'})")
+print("=" * 60)
+
+old = bench(old_path)
+fast = bench(fast_path)
+per_1k = 1000 / NUM_SKILLS
+
+print(f"Pydantic + jsonable_encoder + json: {old * per_1k * 1000:8.2f} ms per 1k skills")
+print(f"Row dicts + orjson:                 {fast * per_1k * 1000:8.2f} ms per 1k skills")
+print(f"Speedup: {old / fast:.1f}x")
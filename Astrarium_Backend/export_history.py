@@ -0,0 +1,46 @@
+"""
+Practice history export: stream user_answers, practice_sessions and the
+skill review schedule to NDJSON or CSV, gzip-compressed on the fly, in
+constant memory however long the history is. Same stream as GET /export.
+
+    python export_history.py --user-id 1 -o history.ndjson.gz
+    python export_history.py --tables answers --format csv -o answers.csv.gz   # every user
+    python export_history.py --user-id 1 --no-gzip | head
+"""
+import sys
+import argparse
+
+from app.core.export import EXPORT_FORMATS, EXPORT_TABLES, parse_tables, stream_export, export_filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream practice history out of the database")
+    parser.add_argument("--user-id", type=int, default=None, help="one user's history (default: every user)")
+    parser.add_argument("--tables", default=",".join(EXPORT_TABLES), help=f"comma-separated: {', '.join(EXPORT_TABLES)}")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--no-gzip", action="store_true", help="write plain text instead of gzip")
+    parser.add_argument("-o", "--output", default=None, help="output file, '-' for stdout (default: a dated filename)")
+    args = parser.parse_args()
+
+    try:
+        tables = parse_tables(args.tables, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    compress = not args.no_gzip
+    output = args.output or export_filename(args.user_id, tables, args.format, compress)
+    written = 0
+    out = sys.stdout.buffer if output == "-" else open(output, "wb")
+    try:
+        for chunk in stream_export(args.user_id, tables, args.format, compress=compress):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    if output != "-":
+        print(f"[SUCCESS] Wrote {written:,} bytes to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Pet simulation: run AlienPet's feed / decay / level-up / evolution rules
+over a whole population at once with the NumPy engine in app/core/pet_sim.py.
+Use it to tune decay and XP constants and to size nightly jobs.
+
+    python simulate_pets.py --pets 100000 --days 365
+    python simulate_pets.py --validate        # compare against the ORM methods
+"""
+import os
+import sys
+import json
+import argparse
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from app.core.pet_sim import simulate, validate_against_orm
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized alien pet simulation")
+    parser.add_argument("--pets", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--answers-per-day", type=float, default=5.0, help="mean answers on an active day")
+    parser.add_argument("--p-correct", type=float, default=0.7)
+    parser.add_argument("--p-active", type=float, default=0.6, help="chance a pet's owner practices on a given day")
+    parser.add_argument("--xp", type=int, default=15, help="XP per correct answer")
+    parser.add_argument("--complexity", type=float, default=0.5, help="skill proficiency / 10 fed to the pet")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--validate", action="store_true", help="check the engine against AlienPet and exit")
+    parser.add_argument("--json", action="store_true", help="print the raw report as JSON")
+    args = parser.parse_args()
+
+    if args.validate:
+        report = validate_against_orm(seed=args.seed)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report["ok"] else 1)
+
+    report = simulate(
+        pets=args.pets,
+        days=args.days,
+        answers_per_day=args.answers_per_day,
+        p_correct=args.p_correct,
+        xp_per_answer=args.xp,
+        skill_complexity=args.complexity,
+        p_active=args.p_active,
+        seed=args.seed
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 60)
+    print(f"PET SIMULATION ({report['pets']} pets x {report['days']} days)")
+    print("=" * 60)
+    print(f"Answers simulated: {report['answers_simulated']:,}")
+    print(f"Throughput:        {report['pet_days_per_second']:,} pet-days/s")
+    for stat in ("level", "luminosity", "energy", "knowledge_hunger"):
+        dist = report[stat]
+        print(f"{stat:17s}  mean {dist['mean']:7.2f}  p5 {dist['p5']:7.2f}  p50 {dist['p50']:7.2f}  p95 {dist['p95']:7.2f}")
+    print("Evolution stages:")
+    for stage, count in report["evolution_stage"].items():
+        print(f"  {stage:10s} {count:>9,}  ({count / report['pets']:6.1%})")
+    print("Moods:")
+    for mood, count in report["mood"].items():
+        print(f"  {mood:10s} {count:>9,}  ({count / report['pets']:6.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Concurrency test: fire hundreds of answers in parallel at a multi-worker
+server and check the totals come out exact (no lost XP, streaks or pet
+experience).
+
+Starts its own uvicorn with several workers on a throwaway SQLite database
+and seeds the questions directly, so no running server or LLM key is needed.
+
+    python test_concurrent_answers.py [answers] [workers] [clients]
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+NUM_ANSWERS = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+NUM_WORKERS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+# More clients than this per worker mostly measures SQLite's single write lock
+PARALLEL_CLIENTS = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+# Answers land on many skills: a long run of correct answers on one skill grows
+# its review interval past what a datetime can hold
+ANSWERS_PER_SKILL = 10
+PORT = 8765
+BASE_URL = f"http://127.0.0.1:{PORT}"
+REWARD = 7  # Odd on purpose: wrong answers earn REWARD // 2
+
+tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/concurrency.db"
+os.environ.setdefault("OPENAI_API_KEY", "sk-not-used")
+# Every answer should reach the database; the rate limiter would turn most into 429s
+os.environ["RATE_LIMITS"] = '{"/questions/answer": {"user_per_minute": 1000000, "user_burst": 1000000}}'
+os.environ["DECAY_SWEEPER_ENABLED"] = "false"
+
+import app.main  # noqa: F401  Creates the schema before the workers race to
+from app.database import SessionLocal
+from app.models.user import User
+from app.models.skill import UserSkill, PracticeSession
+from app.models.question import Question, UserAnswer
+from app.models.alien_pet import AlienPet
+
+
+def start_server() -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--workers", str(NUM_WORKERS)],
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"{BASE_URL}/health")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    print("[ERROR] Server did not start")
+    sys.exit(1)
+
+
+def seed(client: httpx.Client, skills_per_kind: int):
+    """One user; half the skills are answered right every time, half wrong every time"""
+    client.post("/auth/register", json={"email": "race@example.com", "username": "race", "password": "race"}).raise_for_status()
+    skill_ids = {
+        kind: [client.post("/skills/add", json={"skill_name": f"{kind} {n}"}).json()["id"] for n in range(skills_per_kind)]
+        for kind in ("right", "wrong")
+    }
+
+    db = SessionLocal()
+    questions = {
+        kind: [
+            Question(skill_id=skill_id, question_text=f"Question for skill {skill_id}", question_type="multiple_choice",
+                     options={"A": "yes", "B": "no"}, correct_answer="A", explanation="", cosmic_reward=REWARD)
+            for skill_id in ids
+        ]
+        for kind, ids in skill_ids.items()
+    }
+    db.add_all(questions["right"] + questions["wrong"])
+    db.commit()
+    question_ids = {kind: [question.id for question in rows] for kind, rows in questions.items()}
+    db.close()
+    return skill_ids, question_ids
+
+
+def snapshot(skill_ids: dict) -> dict:
+    db = SessionLocal()
+    user = db.query(User).first()
+    right = db.query(UserSkill).filter(UserSkill.id.in_(skill_ids["right"])).all()
+    wrong = db.query(UserSkill).filter(UserSkill.id.in_(skill_ids["wrong"])).all()
+    pet = db.query(AlienPet).first()
+    state = {
+        "total_xp": user.total_xp or 0,
+        "answers": db.query(UserAnswer).count(),
+        "sessions": db.query(PracticeSession).count(),
+        "right_consecutive_correct": sum(skill.consecutive_correct or 0 for skill in right),
+        "right_star_power": sum(skill.star_power for skill in right),
+        "right_versions": sum(skill.version for skill in right),
+        "wrong_consecutive_wrong": sum(skill.consecutive_wrong or 0 for skill in wrong),
+        "wrong_health": sum(skill.health_score for skill in wrong),
+        "wrong_versions": sum(skill.version for skill in wrong),
+        "pet_level": pet.level or 1,
+        "pet_experience": pet.experience or 0,
+    }
+    db.close()
+    return state
+
+
+def main():
+    server = start_server()
+    try:
+        skills_per_kind = max(1, -(-NUM_ANSWERS // (2 * ANSWERS_PER_SKILL)))
+        with httpx.Client(base_url=BASE_URL, timeout=60) as client:
+            skill_ids, question_ids = seed(client, skills_per_kind)
+        before = snapshot(skill_ids)
+
+        # Alternate right / wrong answers, cycling through the skills, all in flight at once
+        submissions = []
+        for i in range(NUM_ANSWERS):
+            kind = "right" if i % 2 == 0 else "wrong"
+            question_id = question_ids[kind][(i // 2) % skills_per_kind]
+            submissions.append({"question_id": question_id, "user_answer": "A" if kind == "right" else "B"})
+        with httpx.Client(base_url=BASE_URL, timeout=60, limits=httpx.Limits(max_connections=PARALLEL_CLIENTS)) as client:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=PARALLEL_CLIENTS) as pool:
+                responses = list(pool.map(lambda body: client.post("/questions/answer", json=body), submissions))
+            elapsed = time.perf_counter() - start
+
+        statuses = {}
+        for response in responses:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        ok = [response.json() for response in responses if response.status_code == 200]
+        num_right = sum(1 for result in ok if result["is_correct"])
+        num_wrong = len(ok) - num_right
+        after = snapshot(skill_ids)
+
+        # Pet XP only comes from correct answers and levels are cumulative, so the final level is order-independent
+        pet = AlienPet(level=before["pet_level"], experience=before["pet_experience"])
+        pet.gain_experience(num_right * REWARD)
+
+        expected = {
+            "total_xp": before["total_xp"] + sum(result["xp_earned"] for result in ok),
+            "answers": before["answers"] + len(ok),
+            "sessions": before["sessions"] + len(ok),
+            "right_consecutive_correct": before["right_consecutive_correct"] + num_right,
+            # Each skill starts well away from the 0 / 100 clamps, so these sum exactly
+            "right_star_power": before["right_star_power"] + 3.0 * num_right,
+            "right_versions": before["right_versions"] + num_right,
+            "wrong_consecutive_wrong": before["wrong_consecutive_wrong"] + num_wrong,
+            "wrong_health": before["wrong_health"] - 2.0 * num_wrong,
+            "wrong_versions": before["wrong_versions"] + num_wrong,
+            "pet_level": pet.level,
+            "pet_experience": pet.experience,
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+    print("=" * 60)
+    print(f"CONCURRENT ANSWERS ({NUM_ANSWERS} answers, {NUM_WORKERS} workers, {PARALLEL_CLIENTS} clients)")
+    print("=" * 60)
+    print(f"Responses: {statuses}  in {elapsed:.2f}s ({NUM_ANSWERS / elapsed:.0f} answers/s)")
+    failures = 0
+    for field, want in expected.items():
+        got = after[field]
+        status = "OK" if got == want else "MISMATCH"
+        failures += status != "OK"
+        print(f"  {field:28s} expected {want!s:>8}  got {got!s:>8}  {status}")
+    if statuses.get(200) != NUM_ANSWERS:
+        failures += 1
+        print("[ERROR] Not every answer was accepted")
+    print("[SUCCESS] Totals are exact" if not failures else f"[ERROR] {failures} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
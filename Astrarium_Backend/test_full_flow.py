@@ -89,7 +89,7 @@ print("Step 4: Get my skills")
 get_skills_response = requests.get(f"{BASE_URL}/skills/my-skills")
 
 if get_skills_response.status_code == 200:
-    skills = get_skills_response.json()
+    skills = get_skills_response.json()["skills"]
     print(f"[SUCCESS] Found {len(skills)} skills")
 
     if len(skills) > 0:
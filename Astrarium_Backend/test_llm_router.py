@@ -0,0 +1,176 @@
+"""
+LLM router test: failover, cooldown, hedged requests and token accounting
+against local stub endpoints, so no API key or network is needed.
+
+Each stub is a tiny OpenAI-compatible server on localhost that answers
+/chat/completions quickly, slowly, or with a 500.
+
+    python test_llm_router.py
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Short timings so the run takes a few seconds; set before the router reads them
+os.environ["LLM_HEDGE_DEFAULT_DELAY"] = "0.2"
+os.environ["LLM_FAILURE_COOLDOWN"] = "1"
+os.environ["LLM_HEDGE_ENABLED"] = "true"
+# Usage is booked into a throwaway database
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/llm_router_test.db"
+
+from app.core.llm_router import LLMEndpoint, LLMRouter, FAILURES_BEFORE_COOLDOWN  # noqa: E402
+from app.core.token_ledger import usage_recorder  # noqa: E402
+from app.database import Base, engine  # noqa: E402
+from app.models.user import User  # noqa: E402,F401 - llm_usage_daily references users
+from app.models.llm_usage import LLMUsageDaily  # noqa: E402
+
+SLOW_SECONDS = 1.5
+failures = []
+
+
+def stub_handler(name: str, delay: float = 0.0, broken: bool = False, usage=(1, 1)):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if delay:
+                time.sleep(delay)
+            if broken:
+                self.send_response(500)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b'{"error": {"message": "stub failure"}}')
+                return
+            body = json.dumps({
+                "id": f"stub-{name}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "stub",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": name}}],
+                "usage": {"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage)}
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_stub(name: str, **behaviour) -> LLMEndpoint:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), stub_handler(name, **behaviour))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return LLMEndpoint(
+        name=name,
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+        api_key="stub",
+        model="stub",
+        timeout=10.0
+    )
+
+
+def check(label: str, condition: bool, detail: str = ""):
+    print(f"{'[OK]  ' if condition else '[FAIL]'} {label}{f' ({detail})' if detail else ''}")
+    if not condition:
+        failures.append(label)
+
+
+def ask(router: LLMRouter, hedge: bool = False, on_usage=None):
+    started = time.monotonic()
+    response, endpoint = router.chat(hedge=hedge, on_usage=on_usage, messages=[{"role": "user", "content": "ping"}], max_tokens=5)
+    return response.choices[0].message.content, endpoint, time.monotonic() - started
+
+
+# ------------------------------
+# Failover
+# ------------------------------
+print("Failover")
+broken = start_stub("broken", broken=True)
+healthy = start_stub("healthy")
+router = LLMRouter([broken, healthy])
+
+content, endpoint, _ = ask(router)
+check("a failing endpoint falls over to the next one", endpoint is healthy and content == "healthy", endpoint.name)
+check("the failure is recorded", broken.error_rate() == 1.0, f"error rate {broken.error_rate()}")
+print()
+
+# ------------------------------
+# Cooldown
+# ------------------------------
+print("Cooldown")
+for _ in range(FAILURES_BEFORE_COOLDOWN - 1):
+    # Keep the broken endpoint first so every call hits it before failing over
+    router.endpoints = [broken, healthy]
+    ask(router)
+check(f"{FAILURES_BEFORE_COOLDOWN} failures in a row start a cooldown", broken.cooling_down())
+check("a cooling endpoint is ranked last", router.ranked()[-1] is broken, str([e.name for e in router.ranked()]))
+
+calls_before = len(broken._outcomes)
+_, endpoint, _ = ask(router)
+check("a cooling endpoint is not tried while others are healthy", endpoint is healthy and len(broken._outcomes) == calls_before)
+
+time.sleep(float(os.environ["LLM_FAILURE_COOLDOWN"]) + 0.1)
+check("the cooldown expires", not broken.cooling_down())
+print()
+
+# ------------------------------
+# Hedged request
+# ------------------------------
+print("Hedging")
+slow = start_stub("slow", delay=SLOW_SECONDS)
+fast = start_stub("fast")
+# Neither has samples yet, so both score 0 and the slow one stays first
+router = LLMRouter([slow, fast])
+check("the slow endpoint is the primary", router.ranked()[0] is slow)
+
+content, endpoint, elapsed = ask(router, hedge=True)
+check("a slow primary is hedged and the backup answers", endpoint is fast and content == "fast", endpoint.name)
+check("the hedged call returns well before the slow endpoint", elapsed < SLOW_SECONDS, f"{elapsed:.2f}s")
+
+_, endpoint, elapsed = ask(LLMRouter([slow, fast]), hedge=False)
+check("without hedging the primary is awaited", endpoint is slow and elapsed >= SLOW_SECONDS, f"{elapsed:.2f}s")
+
+# The losing hedged request keeps running; once it lands its latency counts too
+time.sleep(SLOW_SECONDS)
+check("the losing request still feeds the latency stats", slow.sample_count() >= 1, f"{slow.sample_count()} samples")
+
+broken_primary = LLMRouter([start_stub("broken-primary", broken=True), start_stub("backup")])
+_, endpoint, elapsed = ask(broken_primary, hedge=True)
+check("a failing primary fires the backup without waiting for the hedge delay", endpoint.name == "backup" and elapsed < 0.2, f"{elapsed:.2f}s")
+print()
+
+# ------------------------------
+# Token accounting
+# ------------------------------
+print("Token accounting")
+Base.metadata.create_all(bind=engine, tables=[LLMUsageDaily.__table__])
+billed_slow = start_stub("billed-slow", delay=SLOW_SECONDS, usage=(100, 20))
+billed_fast = start_stub("billed-fast", usage=(7, 3))
+router = LLMRouter([billed_slow, billed_fast])
+_, endpoint, _ = ask(router, hedge=True, on_usage=usage_recorder(1, 1, "question"))
+check("the hedge is won by the fast endpoint", endpoint is billed_fast, endpoint.name)
+
+# The loser is still billed by its provider, so its tokens must land too
+time.sleep(SLOW_SECONDS)
+usage = LLMUsageDaily.__table__
+with engine.connect() as connection:
+    booked = {
+        row.endpoint: (row.calls, row.prompt_tokens, row.completion_tokens)
+        for row in connection.execute(usage.select().where(usage.c.user_id == 1, usage.c.operation == "question"))
+    }
+check("the winner's tokens are booked", booked.get("billed-fast") == (1, 7, 3), str(booked))
+check("the loser's tokens are booked", booked.get("billed-slow") == (1, 100, 20), str(booked))
+print()
+
+if failures:
+    print(f"[ERROR] {len(failures)} check(s) failed")
+    sys.exit(1)
+print("[SUCCESS] LLM router behaves as expected")
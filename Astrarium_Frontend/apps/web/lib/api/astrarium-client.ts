@@ -124,7 +124,17 @@ class AstrariumClient {
   }
 
   async getMySkills(): Promise<UserSkill[]> {
-    return this.request<UserSkill[]>("/skills/my-skills");
+    // The list is paginated: follow next_cursor until the last page
+    const skills: UserSkill[] = [];
+    let cursor: string | null = null;
+    do {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+      const page: { skills: UserSkill[]; next_cursor: string | null } =
+        await this.request(`/skills/my-skills${query}`);
+      skills.push(...page.skills);
+      cursor = page.next_cursor;
+    } while (cursor);
+    return skills;
   }
 
   async getSkill(skillId: number): Promise<UserSkill> {